@@ -0,0 +1,96 @@
+"""
+Per-call overhead of the hot repository lookups: the ``db.query(...).filter(...)``
+chain built and compiled on every call against the baked queries of
+``src/repository``, on an in-memory SQLite database with one user and a few contacts,
+so the SQL execution itself is a small part of the timing.
+
+Usage::
+
+    python benchmarks/bench_baked_queries.py --calls 20000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from seed import seed
+from src.database.model import Contact, User
+from src.repository import auth as auth_repo
+from src.repository import contacts as contact_repo
+
+
+def best_of(repeat: int, calls: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) / calls
+
+
+def cases(db, user: User, contact: Contact) -> dict:
+    return {
+        "user by email": (
+            lambda: db.query(User).filter(User.email == user.email).first(),
+            lambda: auth_repo.user_by_email(db).params(email=user.email).first(),
+        ),
+        "contact by id": (
+            lambda: db.query(Contact)
+            .filter(Contact.id == contact.id, Contact.user_id == user.id)
+            .first(),
+            lambda: contact_repo.contact_by_id(db)
+            .params(contact_id=contact.id, user_id=user.id)
+            .first(),
+        ),
+        "contacts by last name": (
+            lambda: db.query(Contact)
+            .filter(Contact.last_name == contact.last_name, Contact.user_id == user.id)
+            .all(),
+            lambda: contact_repo.contacts_by_last_name(db)
+            .params(value=contact.last_name, user_id=user.id)
+            .all(),
+        ),
+        "contacts by phone": (
+            lambda: db.query(Contact)
+            .filter(Contact.user_id == user.id, Contact.phone_e164 == contact.phone_e164)
+            .all(),
+            lambda: contact_repo.contacts_by_phone(db)
+            .params(value=contact.phone_e164, user_id=user.id)
+            .all(),
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--contacts", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, users=1, contacts=args.contacts)
+    db = sessionmaker(bind=engine)()
+    user = db.query(User).first()
+    contact = db.query(Contact).first()
+
+    print("query                   chain us  baked us  speedup")
+    for name, (chain, baked) in cases(db, user, contact).items():
+        assert chain() == baked()
+        chain_time = best_of(args.repeat, args.calls, chain)
+        baked_time = best_of(args.repeat, args.calls, baked)
+        print(
+            f"{name:<22} {chain_time * 1e6:>9.1f} {baked_time * 1e6:>9.1f}"
+            f"  {chain_time / baked_time:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
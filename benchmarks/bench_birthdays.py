@@ -0,0 +1,61 @@
+"""
+Upcoming birthdays: the loop of ``get_id_birthday_upcoming`` against the NumPy engine
+of ``upcoming_birthdays`` for random birth dates.
+
+Usage::
+
+    python benchmarks/bench_birthdays.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.services.added_features import get_id_birthday_upcoming
+from src.services.birthdays import upcoming_birthdays
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--window", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print("contacts      loop ms   numpy ms  speedup")
+    for size in args.sizes:
+        offsets = rng.integers(0, 365 * 80, size)
+        born_dates = [datetime(1940, 1, 1) + timedelta(days=int(d)) for d in offsets]
+        ids = np.arange(size)
+        months = np.fromiter((d.month for d in born_dates), dtype=np.int64, count=size)
+        days = np.fromiter((d.day for d in born_dates), dtype=np.int64, count=size)
+        tuples = list(zip(born_dates, ids.tolist()))
+
+        loop = best_of(args.repeat, get_id_birthday_upcoming, tuples, args.window)
+        vectorized = best_of(
+            args.repeat, upcoming_birthdays, ids, months, days, args.window, date.today()
+        )
+        print(
+            f"{size:>8}  {loop * 1000:>10.1f}  {vectorized * 1000:>9.1f}"
+            f"  {loop / vectorized:>6.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+CPU time against bytes saved by the content codings of ``CompressionMiddleware`` for
+JSON contact lists of growing size, generated like ``seed.py`` does.
+
+Usage::
+
+    python benchmarks/bench_compression.py --sizes 10 100 1000 10000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_response_formats import response_content
+from src.services.compression import ENCODINGS, compress, is_available
+from src.services.negotiation import NegotiatedResponse
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    encodings = [encoding for encoding in ENCODINGS if is_available(encoding)]
+    print("contacts  coding        bytes  compressed  saved    cpu ms  saved KiB/cpu ms")
+    for size in args.sizes:
+        body = NegotiatedResponse(response_content(size)).body
+        for encoding in encodings:
+            compressed = compress(body, encoding)
+            seconds = best_of(args.repeat, compress, body, encoding)
+            saved = len(body) - len(compressed)
+            print(
+                f"{size:>8}  {encoding:<6} {len(body):>12} {len(compressed):>11}"
+                f" {saved / len(body):>6.0%} {seconds * 1000:>9.2f}"
+                f" {saved / 1024 / (seconds * 1000):>17.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Memory per row and rows per second of the read-only contact paths: full ``Contact``
+ORM instances against the column rows of ``ROW_COLUMNS``, both loaded for one user and
+converted to ``ContactResponse`` like the routes do. The seeded contacts without a
+birth date, which ``ContactResponse`` rejects, are left out.
+
+Usage::
+
+    python benchmarks/bench_contact_rows.py --rows 100000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from seed import seed
+from src.database.model import Contact
+from src.repository.contacts import ROW_COLUMNS
+from src.schemas import ContactResponse
+
+
+FILTERS = (Contact.user_id == 1, Contact.born_date.isnot(None))
+
+
+def load_orm(db) -> list:
+    return db.query(Contact).filter(*FILTERS).all()
+
+
+def load_rows(db) -> list:
+    return db.query(*ROW_COLUMNS).filter(*FILTERS).all()
+
+
+def measure_memory(session_factory, load) -> float:
+    db = session_factory()
+    gc.collect()
+    tracemalloc.start()
+    rows = load(db)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    db.close()
+    return size / count
+
+
+def measure_speed(session_factory, load, repeat: int) -> tuple[float, float]:
+    load_times, response_times = [], []
+    for _ in range(repeat):
+        db = session_factory()
+        start = time.perf_counter()
+        rows = load(db)
+        loaded = time.perf_counter()
+        [ContactResponse.model_validate(row, from_attributes=True) for row in rows]
+        load_times.append(loaded - start)
+        response_times.append(time.perf_counter() - start)
+        db.close()
+    count = len(rows)
+    return count / min(load_times), count / min(response_times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    seed(engine, users=1, contacts=args.rows)
+    session_factory = sessionmaker(bind=engine)
+
+    print("path   bytes/row  rows/s loaded  rows/s responses")
+    for name, load in (("orm", load_orm), ("rows", load_rows)):
+        per_row = measure_memory(session_factory, load)
+        loaded, responses = measure_speed(session_factory, load, args.repeat)
+        print(f"{name:<6} {per_row:>9.0f} {loaded:>14.0f} {responses:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
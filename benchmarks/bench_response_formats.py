@@ -0,0 +1,67 @@
+"""
+Payload size and encode time of a ``ContactResponse`` list in the formats of the contact
+routes: JSON as rendered by ``JSONResponse``, MessagePack and, when cbor2 is installed,
+CBOR, each also gzip compressed. The contacts are generated like ``seed.py`` does.
+
+Usage::
+
+    python benchmarks/bench_response_formats.py --sizes 10 100 1000 10000
+"""
+
+import argparse
+import gzip
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from seed import generate_contacts
+from src.schemas import ContactResponse
+from src.services.negotiation import CBOR, JSON, MSGPACK, NegotiatedResponse, is_available
+
+
+def best_of(repeat: int, func, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def response_content(size: int) -> list:
+    rows = generate_contacts(1, size, random.Random(0))
+    for contact_id, row in enumerate(rows, 1):
+        row["id"] = contact_id
+        row["born_date"] = (row["born_date"] or row["updated_at"]).date()
+    # the same JSON compatible content the response model gives the response class
+    return [
+        ContactResponse.model_validate(row).model_dump(mode="json") for row in rows
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    formats = [media_type for media_type in (JSON, MSGPACK, CBOR) if is_available(media_type)]
+    print("contacts  format                 bytes   gzip bytes  encode ms")
+    for size in args.sizes:
+        content = response_content(size)
+        for media_type in formats:
+            body = NegotiatedResponse(content, media_type=media_type).body
+            seconds = best_of(
+                args.repeat, lambda: NegotiatedResponse(content, media_type=media_type)
+            )
+            print(
+                f"{size:>8}  {media_type:<20} {len(body):>8} {len(gzip.compress(body)):>12}"
+                f" {seconds * 1000:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Fixtures of the repository benchmarks: a SQLite database seeded by ``seed.py`` for
+every data size, built once per session.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from seed import seed
+
+
+USERS = 10
+# contacts of every user
+SIZES = [100, 1_000, 10_000]
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def engines(tmp_path_factory):
+    engines = {}
+    yield engines
+    for engine in engines.values():
+        engine.dispose()
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}_contacts")
+def db(request, engines, tmp_path_factory):
+    size = request.param
+    if size not in engines:
+        path = tmp_path_factory.mktemp("bench") / f"contacts_{size}.db"
+        engines[size] = create_engine(
+            f"sqlite:///{path}", connect_args={"check_same_thread": False}
+        )
+        seed(engines[size], USERS, size)
+    session = sessionmaker(bind=engines[size])()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
@@ -0,0 +1,271 @@
+"""
+In-process HTTP load test of the routes in ``src/routes``, driven through httpx's ASGI
+transport, so no server has to be deployed.
+
+Every virtual user runs the scripted scenario signup, email confirmation and login,
+followed by ``--iterations`` rounds of create, read, update, birthday, byfield, list and
+delete of contacts; all virtual users sign in before the contact rounds start.
+``--concurrency`` virtual users run at the same time against a fresh SQLite database.
+The report has the throughput and the p50/p95/p99 latencies of every step; with
+``--baseline`` the run fails when the throughput drops or a p95 latency grows by more
+than ``--tolerance`` against the committed baseline.
+
+Usage::
+
+    python benchmarks/loadtest.py --concurrency 16 --users 32 --iterations 10
+    python benchmarks/loadtest.py --baseline benchmarks/loadtest_baseline.json
+    python benchmarks/loadtest.py --save-baseline benchmarks/loadtest_baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PASSWORD = "loadtest-password"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class Recorder:
+    """
+    Collects the latency of every request by scenario step.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.failures: dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, client: httpx.AsyncClient, step: str, method: str, url: str,
+        expected: int = 200, **kwargs
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[step].append((time.perf_counter() - start) * 1000)
+        if response.status_code != expected:
+            self.failures[step] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        steps = {}
+        for step, values in self.latencies.items():
+            values = sorted(values)
+            steps[step] = {
+                "requests": len(values),
+                "failures": self.failures[step],
+                "p50_ms": round(percentile(values, 0.50), 2),
+                "p95_ms": round(percentile(values, 0.95), 2),
+                "p99_ms": round(percentile(values, 0.99), 2),
+            }
+        everything = sorted(v for values in self.latencies.values() for v in values)
+        return {
+            "requests": len(everything),
+            "failures": sum(self.failures.values()),
+            "seconds": round(elapsed, 2),
+            "throughput_rps": round(len(everything) / elapsed, 1),
+            "p50_ms": round(percentile(everything, 0.50), 2),
+            "p95_ms": round(percentile(everything, 0.95), 2),
+            "p99_ms": round(percentile(everything, 0.99), 2),
+            "steps": steps,
+        }
+
+
+async def sign_in(client: httpx.AsyncClient, recorder: Recorder, number: int) -> None:
+    from src.services.auth import auth_service
+
+    email = f"load{number}@example.com"
+    await recorder.request(
+        client, "signup", "POST", "/api/auth/signup",
+        expected=201, json={"email": email, "password": PASSWORD},
+    )
+    email_token = auth_service.create_token({"sub": email}, token_type="email_token")
+    await recorder.request(
+        client, "confirm_email", "GET", f"/api/auth/confirm_email/{email_token}"
+    )
+    response = await recorder.request(
+        client, "login", "POST", "/api/auth/login",
+        data={"username": email, "password": PASSWORD},
+    )
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+
+async def use_contacts(
+    client: httpx.AsyncClient, recorder: Recorder, number: int, iterations: int
+) -> None:
+    for i in range(iterations):
+        body = {
+            "first_name": f"first{i}",
+            "last_name": f"last{i % 5}",
+            "email": f"contact{i}@example.com",
+            "phone": f"600{number:03d}{i:03d}",
+            "born_date": f"19{50 + i % 50}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "additional": "load test",
+        }
+        response = await recorder.request(
+            client, "create", "POST", "/api/contacts/", expected=201, json=body
+        )
+        contact_id = response.json().get("id")
+        await recorder.request(client, "read", "GET", f"/api/contacts/{contact_id}")
+        body["additional"] = "updated"
+        await recorder.request(
+            client, "update", "PUT", f"/api/contacts/{contact_id}", json=body
+        )
+        await recorder.request(client, "birthday", "GET", "/api/contacts/birthday")
+        await recorder.request(
+            client, "byfield", "GET", "/api/contacts/byfield",
+            params={"field": "last_name", "value": body["last_name"]},
+        )
+        await recorder.request(client, "list", "GET", "/api/contacts/")
+        # every other contact stays, so the lists grow during the run
+        if i % 2:
+            await recorder.request(
+                client, "delete", "DELETE", f"/api/contacts/{contact_id}"
+            )
+
+
+def build_app(database_url: str):
+    from sqlalchemy import create_engine
+
+    import src.routes.auth
+    from main import create_app
+    from src.database.model import Base
+
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+
+    async def no_email(*args, **kwargs):
+        pass
+
+    # no confirmation emails under load, the scenario confirms with its own token
+    src.routes.auth.send_email = no_email
+    return create_app()
+
+
+async def run(args) -> dict:
+    app = build_app(os.environ["SQLALCHEMY_DATABASE_URL"])
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    transport = httpx.ASGITransport(app=app)
+    clients = [
+        httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+        for _ in range(args.users)
+    ]
+
+    async def limited(coroutine) -> None:
+        async with semaphore:
+            await coroutine
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # password hashing blocks the event loop, so all virtual users sign in before
+        # the contact steps start and the stalls do not land in their latencies
+        await asyncio.gather(
+            *(limited(sign_in(client, recorder, n)) for n, client in enumerate(clients))
+        )
+        await asyncio.gather(
+            *(
+                limited(use_contacts(client, recorder, n, args.iterations))
+                for n, client in enumerate(clients)
+            )
+        )
+    for client in clients:
+        await client.aclose()
+    return recorder.report(time.perf_counter() - start)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Returns the regressions of the report against the baseline, empty if there are none.
+    """
+    regressions = []
+    if report["failures"]:
+        regressions.append(f"{report['failures']} requests failed")
+    minimum = baseline["throughput_rps"] * (1 - tolerance)
+    if report["throughput_rps"] < minimum:
+        regressions.append(
+            f"throughput {report['throughput_rps']} req/s < {minimum:.1f} req/s"
+        )
+    for step, expected in baseline["steps"].items():
+        actual = report["steps"].get(step)
+        if actual is None:
+            regressions.append(f"step {step} missing")
+            continue
+        maximum = expected["p95_ms"] * (1 + tolerance)
+        if actual["p95_ms"] > maximum:
+            regressions.append(f"{step} p95 {actual['p95_ms']} ms > {maximum:.1f} ms")
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['requests']} requests in {report['seconds']} s, "
+        f"{report['throughput_rps']} req/s, {report['failures']} failed"
+    )
+    print("step            requests   p50 ms   p95 ms   p99 ms")
+    for step, stats in report["steps"].items():
+        print(
+            f"{step:<15} {stats['requests']:>8} {stats['p50_ms']:>8.2f}"
+            f" {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+    print(
+        f"{'all':<15} {report['requests']:>8} {report['p50_ms']:>8.2f}"
+        f" {report['p95_ms']:>8.2f} {report['p99_ms']:>8.2f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=32, help="virtual users in total")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--baseline", type=Path, help="fail on regressions against it")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--save-baseline", type=Path)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp_dir}/loadtest.db"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+    os.environ.setdefault("AVATAR_STORAGE", "local")
+
+    report = asyncio.run(run(args))
+    report["config"] = {
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "iterations": args.iterations,
+    }
+    print_report(report)
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != report["config"]:
+            sys.exit(f"Baseline was recorded with {baseline.get('config')}")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Synthetic data generator: fills a database with N users having M contacts each, with
+realistic names, emails, phone numbers and birth dates.
+
+Usage::
+
+    python benchmarks/seed.py --url sqlite:///./bench.db --users 100 --contacts 1000
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, func, select
+
+from src.database.model import Base, Contact, User
+from src.services.auth import auth_service
+
+
+FIRST_NAMES = [
+    "adam", "agnieszka", "aleksandra", "andrzej", "anna", "barbara", "bartosz",
+    "dawid", "dorota", "ewa", "filip", "grzegorz", "hanna", "jakub", "jan", "joanna",
+    "julia", "kamil", "karolina", "katarzyna", "krzysztof", "łukasz", "magdalena",
+    "maria", "marek", "marta", "mateusz", "michał", "monika", "natalia", "oliwia",
+    "paweł", "piotr", "rafał", "robert", "szymon", "tomasz", "wiktoria", "wojciech",
+    "zofia", "james", "mary", "john", "patricia", "robert", "jennifer", "michael",
+    "linda", "olena", "andriy", "iryna", "oleksandr",
+]
+LAST_NAMES = [
+    "nowak", "kowalski", "wiśniewski", "wójcik", "kowalczyk", "kamiński",
+    "lewandowski", "zieliński", "szymański", "woźniak", "dąbrowski", "kozłowski",
+    "jankowski", "mazur", "wojciechowski", "kwiatkowski", "krawczyk", "kaczmarek",
+    "piotrowski", "grabowski", "zając", "pawłowski", "michalski", "król", "wieczorek",
+    "jabłoński", "wróbel", "nowakowski", "majewski", "olszewski", "smith", "johnson",
+    "williams", "brown", "jones", "garcia", "miller", "davis", "shevchenko",
+    "bondarenko", "kovalenko", "tkachenko",
+]
+DOMAINS = ["gmail.com", "wp.pl", "onet.pl", "outlook.com", "yahoo.com", "example.com"]
+PHONE_FORMATS = ["{}", "+48{}", "+48 {} {} {}", "{}-{}-{}", "({}) {}-{}"]
+ASCII = str.maketrans("ąćęłńóśźż", "acelnoszz")
+PASSWORD = "password"
+
+
+def birth_date(rng: random.Random, today: datetime) -> datetime | None:
+    """
+    Returns a birth date with ages roughly normally distributed around 38 years,
+    every day of the year, February 29 included, being possible. About 10% of the
+    contacts have no birth date.
+    """
+    if rng.random() < 0.1:
+        return None
+    age = min(max(rng.gauss(38, 15), 1), 95)
+    return today - timedelta(days=int(age * 365.25) + rng.randrange(366))
+
+
+def phone_number(rng: random.Random) -> tuple[str, str]:
+    """
+    Returns a mobile phone number in one of the formats users type, and its E.164 form.
+    """
+    digits = str(rng.randrange(500_000_000, 900_000_000))
+    groups = (digits[:3], digits[3:6], digits[6:])
+    template = rng.choice(PHONE_FORMATS)
+    phone = template.format(digits) if template.count("{}") == 1 else template.format(*groups)
+    return phone, f"+48{digits}"
+
+
+def generate_users(
+    count: int, rng: random.Random, start: int = 1, password_hash: str = ""
+) -> list[dict]:
+    """
+    Generates rows of users with IDs from ``start``.
+
+    :param count: The number of users.
+    :type count: int
+    :param rng: The random generator.
+    :type rng: random.Random
+    :param start: The ID of the first user.
+    :type start: int
+    :param password_hash: The password hash shared by all users.
+    :type password_hash: str
+    :return: The rows of the ``users`` table.
+    :rtype: list[dict]
+    """
+    return [
+        {
+            "id": user_id,
+            "email": f"user{user_id}@{rng.choice(DOMAINS)}",
+            "password": password_hash,
+            "confirmed": rng.random() < 0.9,
+        }
+        for user_id in range(start, start + count)
+    ]
+
+
+def generate_contacts(user_id: int, count: int, rng: random.Random) -> list[dict]:
+    """
+    Generates rows of contacts of a user.
+
+    :param user_id: The ID of the owner.
+    :type user_id: int
+    :param count: The number of contacts.
+    :type count: int
+    :param rng: The random generator.
+    :type rng: random.Random
+    :return: The rows of the ``contacts`` table.
+    :rtype: list[dict]
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for _ in range(count):
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone, phone_e164 = phone_number(rng)
+        updated_at = today - timedelta(minutes=rng.randrange(525_600))
+        local = f"{first_name}.{last_name}".translate(ASCII)
+        rows.append(
+            {
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": f"{local}{rng.randrange(100)}@{rng.choice(DOMAINS)}",
+                "phone": phone,
+                "phone_e164": phone_e164,
+                "born_date": birth_date(rng, today),
+                "additional": "",
+                "user_id": user_id,
+                "updated_at": updated_at,
+                "created_at": updated_at,
+            }
+        )
+    return rows
+
+
+def seed(
+    engine, users: int, contacts: int, random_seed: int = 0, batch_size: int = 10_000
+) -> None:
+    """
+    Creates the tables if needed and inserts ``users`` users with ``contacts`` contacts
+    each, in batches of bulk inserts. All users have the password ``PASSWORD``.
+
+    :param engine: The database engine.
+    :type engine: Engine
+    :param users: The number of users.
+    :type users: int
+    :param contacts: The number of contacts of every user.
+    :type contacts: int
+    :param random_seed: The seed of the random generator, the same seed gives the same data.
+    :type random_seed: int
+    :param batch_size: The number of rows inserted at once.
+    :type batch_size: int
+    """
+    rng = random.Random(random_seed)
+    # hashed once, a hash per user would dominate the seeding time
+    password_hash = auth_service.get_password_hash(PASSWORD)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        start = (conn.execute(select([func.max(User.id)])).scalar() or 0) + 1
+        conn.execute(
+            User.__table__.insert(),
+            generate_users(users, rng, start, password_hash),
+        )
+        pending = []
+        for user_id in range(start, start + users):
+            pending += generate_contacts(user_id, contacts, rng)
+            if len(pending) >= batch_size:
+                conn.execute(Contact.__table__.insert(), pending)
+                pending = []
+        if pending:
+            conn.execute(Contact.__table__.insert(), pending)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="sqlite:///./bench.db")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--contacts", type=int, default=1000, help="contacts per user")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    seed(create_engine(args.url), args.users, args.contacts, args.seed)
+    print(f"Seeded {args.users} users with {args.contacts} contacts each")
+
+
+if __name__ == "__main__":
+    main()
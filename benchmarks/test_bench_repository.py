@@ -0,0 +1,154 @@
+"""
+Benchmarks of every function of ``src/repository/contacts.py`` and
+``src/repository/auth.py`` at the data sizes of ``conftest.SIZES``.
+
+Usage::
+
+    python -m pytest benchmarks --benchmark-storage=benchmarks/baselines \
+        --benchmark-compare=0001 --benchmark-compare-fail=median:50%
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database.model import Contact, User
+from src.repository import auth as auth_repo
+from src.repository import contacts as contact_repo
+from src.schemas import ContactBase, UserModel
+
+
+@pytest.fixture
+def user(db):
+    return db.query(User).filter(User.id == 1).first()
+
+
+@pytest.fixture
+def contact(db, user):
+    return (
+        db.query(Contact)
+        .filter(Contact.user_id == user.id, Contact.born_date.isnot(None))
+        .first()
+    )
+
+
+@pytest.fixture
+def run(benchmark, loop):
+    def run(func, *args, **kwargs):
+        return benchmark(lambda: loop.run_until_complete(func(*args, **kwargs)))
+
+    return run
+
+
+def contact_body(contact: Contact, **changes) -> ContactBase:
+    data = {
+        "first_name": contact.first_name,
+        "last_name": contact.last_name,
+        "email": contact.email,
+        "phone": contact.phone,
+        "born_date": contact.born_date.date(),
+        "additional": contact.additional,
+    }
+    return ContactBase(**{**data, **changes})
+
+
+def test_get_contacts(run, db, user):
+    assert run(contact_repo.get_contacts, db, user)
+
+
+def test_get_contact(run, db, user, contact):
+    assert run(contact_repo.get_contact, contact.id, db, user) is contact
+
+
+def test_get_contact_by_id(run, db, user, contact):
+    assert run(contact_repo.get_contact_by_id, str(contact.id), db, user)
+
+
+def test_get_contacts_by_first_name(run, db, user, contact):
+    assert run(contact_repo.get_contacts_by_first_name, contact.first_name, db, user)
+
+
+def test_get_contacts_by_last_name(run, db, user, contact):
+    assert run(contact_repo.get_contacts_by_last_name, contact.last_name, db, user)
+
+
+def test_get_contact_by_email(run, db, user, contact):
+    assert run(contact_repo.get_contact_by_email, contact.email, db, user)
+
+
+def test_get_contacts_by_phone(run, db, user, contact):
+    assert run(contact_repo.get_contacts_by_phone, contact.phone, db, user)
+
+
+def test_get_contacts_by(run, db, user, contact):
+    assert run(contact_repo.get_contacts_by, "last_name", contact.last_name, db, user)
+
+
+def test_get_changes(run, db, user):
+    since = datetime.now() - timedelta(days=7)
+    run(contact_repo.get_changes, since, db, user)
+
+
+def test_get_contacts_with_upcoming_birtday(run, db, user):
+    run(contact_repo.get_contacts_with_upcoming_birtday, db, user)
+
+
+def test_create_new_contact(run, db, user, contact):
+    assert run(contact_repo.create_new_contact, contact_body(contact), db, user)
+
+
+def test_update_contact(benchmark, loop, db, contact):
+    bodies = [contact_body(contact, additional=str(i)) for i in range(2)]
+    rounds = iter(range(10**9))
+
+    def update():
+        body = bodies[next(rounds) % 2]
+        return loop.run_until_complete(contact_repo.update_contact(contact, body, db))
+
+    assert benchmark(update) is contact
+
+
+def test_remove_contact(benchmark, loop, db, user, contact):
+    body = contact_body(contact)
+
+    def setup():
+        new_contact = loop.run_until_complete(
+            contact_repo.create_new_contact(body, db, user)
+        )
+        return (new_contact, db), {}
+
+    def remove(new_contact, db):
+        return loop.run_until_complete(contact_repo.remove_contact(new_contact, db))
+
+    benchmark.pedantic(remove, setup=setup, rounds=100)
+
+
+def test_get_user_by_email(run, db, user):
+    assert run(auth_repo.get_user_by_email, user.email, db) is user
+
+
+def test_get_user_by_id(run, db, user):
+    assert run(auth_repo.get_user_by_id, user.id, db) is user
+
+
+def test_create_user(benchmark, loop, db):
+    emails = (f"bench{i}@example.com" for i in range(10**9))
+
+    def create():
+        body = UserModel(email=next(emails), password="hash")
+        return loop.run_until_complete(auth_repo.create_user(body, db))
+
+    assert benchmark(create)
+
+
+def test_update_token(run, db, user):
+    run(auth_repo.update_token, user, "token", db)
+
+
+def test_confirm_email(run, db, user):
+    run(auth_repo.confirm_email, user.email, db)
+
+
+def test_update_avatar(run, db, user):
+    assert run(auth_repo.update_avatar, user.email, "https://example.com/a.png", db)
+
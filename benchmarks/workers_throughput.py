@@ -0,0 +1,133 @@
+"""
+Throughput of the contact routes served by ``server.py`` with 1 and N workers.
+
+Creates a SQLite database with one confirmed user and ``--contacts`` contacts, starts
+``server.py`` for every worker count with rate limiting disabled, and sends GET requests
+to the contact routes from ``--concurrency`` concurrent clients for ``--duration`` seconds.
+
+Usage::
+
+    python benchmarks/workers_throughput.py --workers 1 4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+ROUTES = [
+    "/api/contacts/",
+    "/api/contacts/birthday",
+    "/api/contacts/byfield?field=last_name&value=doe",
+]
+
+
+def seed(database_url: str, contacts: int) -> str:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from src.database.model import Base, Contact, User
+    from src.services.auth import auth_service
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email="bench@example.com", password="x", confirmed=True)
+    db.add(user)
+    db.commit()
+    db.add_all(
+        Contact(
+            first_name=f"john{i}",
+            last_name="doe" if i % 10 == 0 else f"smith{i}",
+            email=f"john{i}@example.com",
+            phone="123456789",
+            born_date=datetime(1990, 1 + i % 12, 1 + i % 28),
+            additional="none",
+            user_id=user.id,
+        )
+        for i in range(contacts)
+    )
+    db.commit()
+    db.close()
+    return auth_service.create_token(
+        {"sub": "bench@example.com"}, token_type="access_token"
+    )
+
+
+async def load(base_url: str, token: str, concurrency: int, duration: float) -> int:
+    done = 0
+    deadline = time.monotonic() + duration
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def client_loop(client: httpx.AsyncClient, offset: int):
+        nonlocal done
+        i = offset
+        while time.monotonic() < deadline:
+            response = await client.get(ROUTES[i % len(ROUTES)], headers=headers)
+            response.raise_for_status()
+            done += 1
+            i += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+    return done
+
+
+def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(base_url + "/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count()])
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    database_url = f"sqlite:///{tmp_dir}/bench.db"
+    os.environ["SQLALCHEMY_DATABASE_URL"] = database_url
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["LOAD_SHEDDING_ENABLED"] = "false"
+    token = seed(database_url, args.contacts)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    print(f"cpus={os.cpu_count()} contacts={args.contacts} concurrency={args.concurrency}")
+    print("workers  requests  req/s")
+    for workers in args.workers:
+        server = subprocess.Popen(
+            [sys.executable, "server.py", "--workers", str(workers), "--port", str(args.port)],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_up(base_url)
+            done = asyncio.run(load(base_url, token, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{workers:>7}  {done:>8}  {done / args.duration:>5.0f}")
+
+
+if __name__ == "__main__":
+    main()
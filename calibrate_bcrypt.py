@@ -0,0 +1,106 @@
+"""
+Calibrates the bcrypt cost for this host.
+
+Measures how long verifying a password takes at growing costs and writes the highest
+cost whose verification stays within the target time as ``BCRYPT_ROUNDS`` to the
+``.env`` file. Stored hashes of another cost are replaced on the next login of their
+users. Run it on the production hardware, with the usual load on the host.
+
+Usage::
+
+    python calibrate_bcrypt.py --target-ms 250
+    python calibrate_bcrypt.py --target-ms 250 --dry-run
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+PASSWORD = "calibration-password"
+
+
+def measure_verify_ms(rounds: int, samples: int = 3) -> float:
+    """
+    Returns the shortest time of ``samples`` verifications of a bcrypt hash of the
+    given cost, in ms.
+    """
+    from passlib.context import CryptContext
+
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def calibrate(
+    target_ms: float,
+    min_rounds: int = MIN_ROUNDS,
+    max_rounds: int = MAX_ROUNDS,
+    measure=measure_verify_ms,
+) -> tuple[int, float]:
+    """
+    Finds the highest cost whose verification takes at most ``target_ms``, measuring
+    the costs from ``min_rounds`` up until one is too slow; every round doubles the time.
+
+    :param target_ms: The target verification time in ms.
+    :type target_ms: float
+    :param min_rounds: The lowest cost returned, even if it is slower than the target.
+    :type min_rounds: int
+    :param max_rounds: The highest cost returned.
+    :type max_rounds: int
+    :param measure: Function returning the verification time in ms of a cost.
+    :type measure: Callable[[int], float]
+    :return: The cost and its verification time in ms.
+    :rtype: tuple[int, float]
+    """
+    rounds, elapsed = min_rounds, measure(min_rounds)
+    while rounds < max_rounds and elapsed <= target_ms:
+        next_elapsed = measure(rounds + 1)
+        if next_elapsed > target_ms:
+            break
+        rounds, elapsed = rounds + 1, next_elapsed
+    return rounds, elapsed
+
+
+def write_setting(path: Path, name: str, value) -> None:
+    """
+    Sets ``name=value`` in an env file, replacing the line of the setting if there is one.
+    """
+    lines = path.read_text().splitlines() if path.exists() else []
+    line = f"{name}={value}"
+    for i, existing in enumerate(lines):
+        if existing.split("=", 1)[0].strip().upper() == name:
+            lines[i] = line
+            break
+    else:
+        lines.append(line)
+    path.write_text("\n".join(lines) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--min-rounds", type=int, default=MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=MAX_ROUNDS)
+    parser.add_argument("--env-file", type=Path, default=Path(".env"))
+    parser.add_argument("--dry-run", action="store_true", help="print the cost only")
+    args = parser.parse_args()
+
+    rounds, elapsed = calibrate(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"bcrypt cost {rounds}: {elapsed:.0f} ms per verification")
+    if elapsed > args.target_ms:
+        print(f"The minimum cost {rounds} is slower than {args.target_ms:.0f} ms")
+    if not args.dry_run:
+        write_setting(args.env_file, "BCRYPT_ROUNDS", rounds)
+        print(f"BCRYPT_ROUNDS={rounds} written to {args.env_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,54 @@
+import asyncio
 import logging
-import uvicorn
-import redis.asyncio as redis
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Depends
-from fastapi_limiter import FastAPILimiter
-from fastapi_limiter.depends import RateLimiter
-from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.routes import contacts, auth, users
+from src.database import redis_pool
+from src.database.db import SessionLocal, get_engine
+from src.routes import contacts, auth, users, metrics
+from src.services.birthdays import run_daily_rebuild
+from src.services.compression import CompressionMiddleware
+from src.services.events import contact_events
+from src.services.profiling import ProfilingMiddleware
+from src.services.rate_limiter import TokenBucketLimiter
+from src.services.revocation import token_revocations
 
 
 logging.basicConfig(level=logging.ERROR)
 
-app = FastAPI()
-
 origins = ["*"]
 methods = ["*"]
 headers = ["*"]
 
 
-app.include_router(contacts.router, prefix="/api")
-app.include_router(auth.router, prefix="/api")
-app.include_router(users.router, prefix="/api")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=methods,
-    allow_headers=headers,
-)
-
-
-@app.on_event("startup")
-async def startup():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     """
-    Initializes the Redis connection and FastAPILimiter on application startup.
+    Creates the database engine and the shared Redis connection pool on application
+    startup, hands the pool to the services using Redis, starts listening to contact
+    events, starts synchronizing the revoked tokens and starts the daily rebuild of the
+    upcoming birthdays. Stops them and closes the pool on shutdown.
     """
-    r = await redis.Redis(
-        host="localhost", port=6379, db=0, encoding="utf-8", decode_responses=True
+    engine = get_engine()
+    r = await redis_pool.init_redis()
+    TokenBucketLimiter.init(r)
+    await contact_events.start(r)
+    await token_revocations.start(r)
+    birthdays_job = asyncio.create_task(
+        run_daily_rebuild(lambda: SessionLocal(bind=engine), r)
     )
-    await FastAPILimiter.init(r)
+    yield
+    birthdays_job.cancel()
+    with suppress(asyncio.CancelledError):
+        await birthdays_job
+    await contact_events.stop()
+    await token_revocations.stop()
+    TokenBucketLimiter.init(None)
+    await redis_pool.close_redis()
 
 
-@app.get(
-    "/",
-    description="No more than 10 requests per minute",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))],
-)
 def read_root():
     """
     Returns the name of application.
@@ -59,5 +60,42 @@ def read_root():
     return {"AppName": "Contacts"}
 
 
+def create_app() -> FastAPI:
+    """
+    Builds the application with its routers, middleware and lifespan handler.
+
+    :return: The application.
+    :rtype: FastAPI
+    """
+    app = FastAPI(lifespan=lifespan)
+
+    app.include_router(contacts.router, prefix="/api")
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(users.router, prefix="/api")
+    app.include_router(metrics.router, prefix="/api")
+    app.add_middleware(CompressionMiddleware)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=methods,
+        allow_headers=headers,
+    )
+    app.add_middleware(ProfilingMiddleware)
+
+    app.get(
+        "/",
+        description="No more than 10 requests per minute",
+        dependencies=[Depends(TokenBucketLimiter(times=10, seconds=60))],
+    )(read_root)
+
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="localhost", port=8000)
+    import uvicorn
+
+    uvicorn.run("main:create_app", factory=True, host="localhost", port=8000)
@@ -7,12 +7,12 @@ from alembic import context
 
 from src.database.model import Base
 
-from src.database.db import SQLALCHEMY_DATABASE_URL
+from src.conf.config import settings
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
+config.set_main_option("sqlalchemy.url", settings.sqlalchemy_database_url)
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
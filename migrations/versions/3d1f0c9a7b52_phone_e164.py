@@ -0,0 +1,65 @@
+"""phone_e164
+
+Revision ID: 3d1f0c9a7b52
+Revises: fafaf3915886
+Create Date: 2024-03-04 10:12:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.services.phones import to_e164
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d1f0c9a7b52'
+down_revision: Union[str, None] = 'fafaf3915886'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('phone_e164', sa.String(length=16), nullable=True))
+
+    # backfill in batches by primary key, so no batch holds the whole table
+    contacts = sa.table(
+        'contacts',
+        sa.column('id', sa.Integer),
+        sa.column('phone', sa.String),
+        sa.column('phone_e164', sa.String),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select([contacts.c.id, contacts.c.phone])
+            .where(contacts.c.id > last_id)
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        updates = [
+            {'contact_id': row.id, 'phone_e164': to_e164(row.phone)}
+            for row in rows
+        ]
+        connection.execute(
+            contacts.update()
+            .where(contacts.c.id == sa.bindparam('contact_id'))
+            .values(phone_e164=sa.bindparam('phone_e164')),
+            updates,
+        )
+        last_id = rows[-1].id
+
+    op.create_index(
+        'ix_contacts_user_id_phone_e164', 'contacts', ['user_id', 'phone_e164'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_phone_e164', table_name='contacts')
+    op.drop_column('contacts', 'phone_e164')
@@ -0,0 +1,50 @@
+"""contact changes
+
+Revision ID: 8a4e2b6c1d93
+Revises: 3d1f0c9a7b52
+Create Date: 2024-03-06 14:27:03.104857
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e2b6c1d93'
+down_revision: Union[str, None] = '3d1f0c9a7b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    contacts = sa.table('contacts', sa.column('updated_at', sa.DateTime))
+    op.execute(contacts.update().values(updated_at=datetime.utcnow()))
+    op.create_index(
+        'ix_contacts_user_id_updated_at', 'contacts', ['user_id', 'updated_at'], unique=False
+    )
+
+    op.create_table('contact_tombstones',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('contact_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_contact_tombstones_user_id_deleted_at',
+        'contact_tombstones',
+        ['user_id', 'deleted_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contact_tombstones_user_id_deleted_at', table_name='contact_tombstones')
+    op.drop_table('contact_tombstones')
+    op.drop_index('ix_contacts_user_id_updated_at', table_name='contacts')
+    op.drop_column('contacts', 'updated_at')
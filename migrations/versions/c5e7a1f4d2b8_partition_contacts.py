@@ -0,0 +1,86 @@
+"""partition contacts by user_id
+
+Revision ID: c5e7a1f4d2b8
+Revises: 8a4e2b6c1d93
+Create Date: 2024-03-08 09:31:17.662940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a1f4d2b8'
+down_revision: Union[str, None] = '8a4e2b6c1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+COLUMNS = (
+    "id, first_name, last_name, email, phone, born_date, additional, user_id, "
+    "phone_e164, updated_at"
+)
+
+
+def create_indexes() -> None:
+    op.execute(
+        "ALTER TABLE contacts ADD CONSTRAINT contacts_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.execute(
+        "CREATE INDEX ix_contacts_user_id_phone_e164 ON contacts (user_id, phone_e164)"
+    )
+    op.execute(
+        "CREATE INDEX ix_contacts_user_id_updated_at ON contacts (user_id, updated_at)"
+    )
+
+
+def upgrade() -> None:
+    # SQLite and other databases keep the plain table, the model works with both
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE contacts RENAME TO contacts_unpartitioned")
+    # a partition key must be part of the primary key, and may not be NULL in it;
+    # contacts without a user are not reachable by any query and are not copied
+    op.execute(
+        "CREATE TABLE contacts ("
+        "LIKE contacts_unpartitioned INCLUDING DEFAULTS, "
+        "PRIMARY KEY (id, user_id)"
+        ") PARTITION BY HASH (user_id)"
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE contacts_p{remainder} PARTITION OF contacts "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute(
+        f"INSERT INTO contacts ({COLUMNS}) SELECT {COLUMNS} "
+        "FROM contacts_unpartitioned WHERE user_id IS NOT NULL"
+    )
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.execute("DROP TABLE contacts_unpartitioned")
+    create_indexes()
+    op.execute("ANALYZE contacts")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE contacts RENAME TO contacts_partitioned")
+    op.execute(
+        "CREATE TABLE contacts ("
+        "LIKE contacts_partitioned INCLUDING DEFAULTS, "
+        "PRIMARY KEY (id)"
+        ")"
+    )
+    op.execute("ALTER TABLE contacts ALTER COLUMN user_id DROP NOT NULL")
+    op.execute(
+        f"INSERT INTO contacts ({COLUMNS}) SELECT {COLUMNS} FROM contacts_partitioned"
+    )
+    op.execute("ALTER SEQUENCE contacts_id_seq OWNED BY contacts.id")
+    op.execute("DROP TABLE contacts_partitioned")
+    create_indexes()
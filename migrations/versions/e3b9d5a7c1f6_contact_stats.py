@@ -0,0 +1,45 @@
+"""contact stats
+
+Revision ID: e3b9d5a7c1f6
+Revises: c5e7a1f4d2b8
+Create Date: 2024-03-11 10:02:45.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9d5a7c1f6'
+down_revision: Union[str, None] = 'c5e7a1f4d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('created_at', sa.DateTime(), nullable=True))
+    # the creation time of existing contacts is unknown, their last change is the
+    # closest value kept
+    contacts = sa.table(
+        'contacts',
+        sa.column('created_at', sa.DateTime),
+        sa.column('updated_at', sa.DateTime),
+    )
+    op.execute(contacts.update().values(created_at=contacts.c.updated_at))
+
+    # filled by ``python rebuild_contact_stats.py`` once the migration is applied
+    op.create_table('contact_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('bucket', sa.String(length=50), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'kind', 'bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('contact_stats')
+    op.drop_column('contacts', 'created_at')
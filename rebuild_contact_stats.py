@@ -0,0 +1,38 @@
+"""
+Rebuilds the contact statistics from the contacts.
+
+The counters served by ``/api/contacts/stats`` are updated by every contact write. Run
+this once after the ``e3b9d5a7c1f6`` migration, after bulk imports which bypass the
+repository, or whenever the counters are suspected to have drifted. Contacts created
+before the migration are counted in the week of their last change.
+
+Usage::
+
+    python rebuild_contact_stats.py
+    python rebuild_contact_stats.py --user-id 42
+"""
+
+import argparse
+import time
+
+from src.database.db import SessionLocal, get_engine
+from src.repository.contact_stats import rebuild_stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--user-id", type=int, help="rebuild the stats of one user only")
+    args = parser.parse_args()
+
+    db = SessionLocal(bind=get_engine())
+    try:
+        start = time.perf_counter()
+        counted = rebuild_stats(db, args.user_id)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"{counted} contacts counted in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
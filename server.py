@@ -0,0 +1,246 @@
+"""
+Production server entry point.
+
+The master process builds the application once, imports the modules loaded lazily on
+first use, freezes the garbage collector and forks the workers, so the loaded code is
+shared copy-on-write between them. The workers accept connections on one listening
+socket inherited from the master and serve them with uvicorn on uvloop and httptools.
+
+Signals handled by the master:
+
+- SIGHUP: graceful reload of the code, the master re-executes itself keeping the
+  listening socket, imports the application again and forks new workers, then stops
+  the old ones, all at once, which finish their in-flight requests and are killed if
+  still running after the graceful timeout; if the new master fails to start, the old
+  workers keep serving and have to be stopped by hand,
+- SIGTERM / SIGINT: graceful shutdown of all workers.
+
+Usage::
+
+    python server.py --workers 4 --host 0.0.0.0 --port 8000
+"""
+
+import argparse
+import gc
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from main import app
+
+
+# passed to the master re-executed by a reload
+LISTEN_FD_ENV = "SERVER_LISTEN_FD"
+OLD_WORKERS_ENV = "SERVER_OLD_WORKERS"
+
+PRELOADED_MODULES = [
+    "jose",
+    "passlib.context",
+    "passlib.handlers.bcrypt",
+    "redis.asyncio",
+    "fastapi_mail",
+    "cloudinary.uploader",
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the contacts API with N workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--log-level", default="warning")
+    return parser.parse_args()
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Opens the listening socket shared by all workers, or takes over the one of the
+    master which re-executed itself.
+    """
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        sock = socket.socket(fileno=int(fd))
+        sock.set_inheritable(True)
+        return sock
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload() -> None:
+    """
+    Imports the modules which the application loads lazily, so that the workers share
+    them instead of importing them each on the first request.
+    """
+    import importlib
+
+    for name in PRELOADED_MODULES:
+        importlib.import_module(name)
+
+
+class Master:
+    """
+    Forks the workers, restarts the ones which exit unexpectedly and handles signals.
+    """
+
+    def __init__(
+        self,
+        app,
+        sock: socket.socket,
+        args: argparse.Namespace,
+        old_workers: list[int] | None = None,
+    ) -> None:
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: set[int] = set()
+        # workers of the master before the reload, stopped once the new ones run
+        self.old_workers: set[int] = set(old_workers or [])
+        self.retire_deadline = math.inf
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            self.run_worker()
+        self.workers.add(pid)
+        return pid
+
+    def run_worker(self) -> None:
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app,
+            loop="uvloop",
+            http="httptools",
+            lifespan="on",
+            access_log=False,
+            log_level=self.args.log_level,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+        )
+        try:
+            uvicorn.Server(config).run(sockets=[self.sock])
+        finally:
+            os._exit(0)
+
+    def signal_worker(self, pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self.workers.discard(pid)
+            self.old_workers.discard(pid)
+
+    def reload(self) -> None:
+        """
+        Re-executes the master, which imports the current code, with the listening
+        socket and the running workers handed over in the environment.
+        """
+        logging.warning(f"Reloading, {len(self.workers)} workers handed over")
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(
+            str(pid) for pid in self.workers | self.old_workers
+        )
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def retire_old_workers(self) -> None:
+        """
+        Asks all the workers of the master before the reload to stop at once. They are
+        reaped by the main loop, which keeps serving signals and restarting new workers
+        meanwhile, and killed if still running after the graceful timeout.
+        """
+        if not self.old_workers:
+            return
+        logging.warning(f"Reloaded, stopping {len(self.old_workers)} old workers")
+        for pid in list(self.old_workers):
+            self.signal_worker(pid, signal.SIGTERM)
+        self.retire_deadline = time.monotonic() + self.args.graceful_timeout
+
+    def kill_old_workers(self) -> None:
+        if not self.old_workers or time.monotonic() < self.retire_deadline:
+            return
+        logging.warning(
+            f"{len(self.old_workers)} old workers still running after "
+            f"{self.args.graceful_timeout} s, killing them"
+        )
+        for pid in list(self.old_workers):
+            self.signal_worker(pid, signal.SIGKILL)
+        self.retire_deadline = math.inf
+
+    def reap(self) -> None:
+        while self.workers or self.old_workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                # none of the pids handed over is a child of this process
+                self.old_workers.clear()
+                return
+            if pid == 0:
+                return
+            self.old_workers.discard(pid)
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping and not self.reloading:
+                    logging.warning(f"Worker {pid} exited, starting a new one")
+                    self.spawn()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        self.retire_old_workers()
+
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+            self.reap()
+            self.kill_old_workers()
+            time.sleep(0.5)
+
+        deadline = time.monotonic() + self.args.graceful_timeout
+        for pid in list(self.workers):
+            self.signal_worker(pid, signal.SIGTERM)
+        while (self.workers or self.old_workers) and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.workers | self.old_workers):
+            self.signal_worker(pid, signal.SIGKILL)
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def handle_reload(self, signum, frame) -> None:
+        self.reloading = True
+
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper())
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    preload()
+    gc.collect()
+    gc.freeze()
+
+    old_workers = [
+        int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid
+    ]
+    Master(app, sock, args, old_workers).run()
+
+
+if __name__ == "__main__":
+    main()
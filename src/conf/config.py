@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
@@ -21,14 +23,62 @@ class Settings(BaseSettings):
 
     redis_host: str
     redis_port: int
+    redis_max_connections: int = 50
 
     cloud_name: str
     api_key: str
     api_secret: str
 
+    rate_limit_enabled: bool = True
+    load_shedding_enabled: bool = True
+
+    birthday_window_days: int = 7
+
+    sync_overlap_seconds: int = 60
+    tombstone_retention_days: int = 30
+
+    avatar_storage: str = "cloudinary"
+    avatar_dir: str = "avatars"
+
+    phone_region: str = "PL"
+
+    bcrypt_rounds: int = 12
+
+    admin_token: str = ""
+    profiling_sample_rate: float = 0.0
+    profiling_dir: str = "profiles"
+
+    slow_query_ms: float = 200.0
+    slow_query_explain: bool = True
+    slow_query_log: str = "slow_queries.log"
+
+    compression_minimum_size: int = 1024
+    compression_threadpool_size: int = 256 * 1024
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Reads the settings from the environment and the .env file on first use.
+
+    :return: The application settings.
+    :rtype: Settings
+    """
+    return Settings()
+
+
+class LazySettings:
+    """
+    Proxy to the application settings which reads them only when an attribute
+    is accessed for the first time, so importing a module does not parse the environment.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = LazySettings()
@@ -1,18 +1,35 @@
+from functools import lru_cache
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from src.conf.config import settings
+from src.database import slow_queries
+
 
+@lru_cache
+def get_engine():
+    """
+    Creates the database engine on first use, recording statements slower than
+    ``settings.slow_query_ms`` unless it is 0.
 
-SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
+    :return: The engine connected to ``settings.sqlalchemy_database_url``.
+    :rtype: Engine
+    """
+    url = settings.sqlalchemy_database_url
+    # sessions are opened in the threadpool and used on the event loop thread
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    if settings.slow_query_ms > 0:
+        slow_queries.install(engine)
+    return engine
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 
 def get_db():
 
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
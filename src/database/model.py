@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Boolean, Index
 from sqlalchemy.sql.sqltypes import DateTime
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -15,10 +17,44 @@ class Contact(Base):
     last_name = Column(String(50), nullable=False)
     email = Column(String(50), nullable=False)
     phone = Column(String(15), nullable=False)
+    phone_e164 = Column(String(16), nullable=True)
     born_date = Column(DateTime)
     additional = Column(String(200), nullable=True)
     user_id = Column(ForeignKey("users.id", ondelete="CASCADE"))
     user = relationship("User", backref="contacts")
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_contacts_user_id_phone_e164", "user_id", "phone_e164"),
+        Index("ix_contacts_user_id_updated_at", "user_id", "updated_at"),
+    )
+    # identity includes the partition key of the table on Postgres, so updates and
+    # deletes of a contact touch only the partition of its user
+    __mapper_args__ = {"primary_key": [id, user_id]}
+
+
+class ContactTombstone(Base):
+    __tablename__ = "contact_tombstones"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    contact_id = Column(Integer, nullable=False)
+    user_id = Column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_contact_tombstones_user_id_deleted_at", "user_id", "deleted_at"),
+    )
+
+
+class ContactStat(Base):
+    # one counter of the contacts of a user, kept up to date by the writes of contacts
+    __tablename__ = "contact_stats"
+    user_id = Column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, nullable=False
+    )
+    kind = Column(String(16), primary_key=True)
+    bucket = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 
 class User(Base):
@@ -0,0 +1,118 @@
+from collections import defaultdict
+from functools import lru_cache
+from time import perf_counter
+
+from src.conf.config import settings
+
+
+class CommandStats:
+    """
+    Count, total and maximum latency of the Redis commands sent by this process.
+    """
+
+    def __init__(self) -> None:
+        self.commands = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+
+    def record(self, command: str, elapsed: float) -> None:
+        stats = self.commands[command]
+        stats["count"] += 1
+        stats["total"] += elapsed
+        stats["max"] = max(stats["max"], elapsed)
+
+    def report(self) -> dict:
+        return {
+            command: {
+                "count": stats["count"],
+                "avg_ms": round(stats["total"] / stats["count"] * 1000, 3),
+                "max_ms": round(stats["max"] * 1000, 3),
+            }
+            for command, stats in self.commands.items()
+        }
+
+
+command_stats = CommandStats()
+
+
+@lru_cache
+def instrumented_redis_class():
+    """
+    Builds the Redis client class recording the latency of every command it executes.
+    The redis package is imported here, on first use, instead of at application import.
+
+    :return: Subclass of ``redis.asyncio.Redis``.
+    :rtype: type
+    """
+    import redis.asyncio as redis
+
+    class InstrumentedRedis(redis.Redis):
+        async def execute_command(self, *args, **options):
+            start = perf_counter()
+            try:
+                return await super().execute_command(*args, **options)
+            finally:
+                command_stats.record(str(args[0]).upper(), perf_counter() - start)
+
+    return InstrumentedRedis
+
+
+_client = None
+
+
+async def init_redis():
+    """
+    Creates the connection pool shared by the whole application.
+
+    :return: The Redis client using the shared pool.
+    :rtype: InstrumentedRedis
+    """
+    global _client
+    import redis.asyncio as redis
+
+    pool = redis.ConnectionPool(
+        host=settings.redis_host,
+        port=settings.redis_port,
+        db=0,
+        max_connections=settings.redis_max_connections,
+        encoding="utf-8",
+        decode_responses=True,
+    )
+    _client = instrumented_redis_class()(connection_pool=pool)
+    return _client
+
+
+async def close_redis() -> None:
+    """
+    Closes the shared client and disconnects all connections of its pool.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose(close_connection_pool=True)
+        _client = None
+
+
+def get_redis():
+    """
+    Dependency returning the shared Redis client, or None when it is not initialized.
+
+    :return: The shared Redis client.
+    :rtype: InstrumentedRedis | None
+    """
+    return _client
+
+
+def get_redis_stats() -> dict:
+    """
+    Reports the command latencies and the usage of the shared connection pool.
+
+    :return: Pool usage and per command statistics.
+    :rtype: dict
+    """
+    pool = _client.connection_pool if _client is not None else None
+    return {
+        "pool": {
+            "max_connections": pool.max_connections if pool else 0,
+            "in_use_connections": len(pool._in_use_connections) if pool else 0,
+            "available_connections": len(pool._available_connections) if pool else 0,
+        },
+        "commands": command_stats.report(),
+    }
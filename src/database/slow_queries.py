@@ -0,0 +1,235 @@
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import suppress
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+
+from src.conf.config import settings
+
+
+MAX_PARAMS_LENGTH = 500
+MAX_ENTRIES = 500
+# a statement is explained again after this many seconds at the earliest
+EXPLAIN_INTERVAL = 600
+
+logger = logging.getLogger("slow_queries")
+
+
+class SlowQueryLog:
+    """
+    Statements slower than ``settings.slow_query_ms``, aggregated by statement and
+    calling function, each with the plan captured when it was last explained.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple[str, str], dict] = {}
+        self.explained: dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def record(
+        self, statement: str, caller: str, elapsed_ms: float, params: str, plan: str | None
+    ) -> None:
+        with self.lock:
+            entry = self.entries.get((statement, caller))
+            if entry is None:
+                if len(self.entries) >= MAX_ENTRIES:
+                    smallest = min(self.entries, key=lambda k: self.entries[k]["total_ms"])
+                    del self.entries[smallest]
+                entry = self.entries[(statement, caller)] = {
+                    "statement": statement,
+                    "caller": caller,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "params": params,
+                    "plan": plan,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            if elapsed_ms >= entry["max_ms"]:
+                entry["max_ms"] = elapsed_ms
+                entry["params"] = params
+            if plan is not None:
+                entry["plan"] = plan
+
+    def should_explain(self, statement: str) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            if now - self.explained.get(statement, -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+                return False
+            self.explained[statement] = now
+            return True
+
+    def top(self, limit: int = 20) -> list[dict]:
+        """
+        Returns the statements with the largest total time.
+
+        :param limit: The number of statements.
+        :type limit: int
+        :return: The statements with their count, total, maximum and mean duration in ms,
+            the parameters of the slowest execution and the plan.
+        :rtype: list[dict]
+        """
+        with self.lock:
+            entries = sorted(
+                self.entries.values(), key=lambda e: e["total_ms"], reverse=True
+            )[:limit]
+            return [
+                {
+                    **entry,
+                    "total_ms": round(entry["total_ms"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 1),
+                }
+                for entry in entries
+            ]
+
+
+slow_query_log = SlowQueryLog()
+
+
+def configure_logger() -> None:
+    if logger.handlers:
+        return
+    handler = RotatingFileHandler(
+        settings.slow_query_log,
+        maxBytes=10 * 2**20,
+        backupCount=5,
+        encoding="utf-8",
+        delay=True,
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def find_caller() -> str:
+    """
+    Returns the innermost function of the repository, or of the application when the
+    statement was not issued by a repository, on the current call stack.
+    """
+    frame = sys._getframe(2)
+    fallback = "unknown"
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("src.repository"):
+            return f"{module}.{frame.f_code.co_name}"
+        if fallback == "unknown" and module.startswith("src.") and module != __name__:
+            fallback = f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+def describe_value(value) -> str:
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"{type(value).__name__}({len(value)})"
+    return type(value).__name__
+
+
+def format_params(parameters, executemany: bool = False) -> str:
+    """
+    Describes the bound parameters by their types, and the lengths of strings and
+    bytes, never by their values: they hold password hashes, tokens and contact data.
+    """
+    if executemany:
+        first = format_params(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        text = repr({key: describe_value(value) for key, value in parameters.items()})
+    else:
+        text = repr(tuple(describe_value(value) for value in parameters or ()))
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[:MAX_PARAMS_LENGTH] + "..."
+    return text
+
+
+def explain(conn, statement: str, parameters, executemany: bool) -> str | None:
+    """
+    Captures the plan of a statement with a raw cursor of the same connection, which
+    does not fire the engine events again. Only plain SELECT statements are run by
+    ``EXPLAIN ANALYZE``; other statements, including ``WITH`` queries which may modify
+    data, get the estimated plan. On Postgres the EXPLAIN runs in a savepoint, so a
+    failing one does not abort the transaction of the caller.
+    """
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    dialect = conn.dialect.name
+    is_select = statement.lstrip().upper().startswith("SELECT")
+    if dialect == "postgresql":
+        prefix = "EXPLAIN (ANALYZE, BUFFERS) " if is_select else "EXPLAIN "
+    elif dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    else:
+        return None
+
+    savepoint = dialect == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    except Exception as err:
+        if savepoint:
+            with suppress(Exception):
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        return f"plan not captured: {err}"
+    finally:
+        cursor.close()
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    if elapsed_ms < settings.slow_query_ms:
+        return
+    caller = find_caller()
+    params = format_params(parameters, executemany)
+    plan = None
+    if settings.slow_query_explain and slow_query_log.should_explain(statement):
+        plan = explain(conn, statement, parameters, executemany)
+    slow_query_log.record(statement, caller, elapsed_ms, params, plan)
+    logger.warning(
+        json.dumps(
+            {
+                "ms": round(elapsed_ms, 1),
+                "caller": caller,
+                "statement": statement,
+                "params": params,
+                "plan": plan,
+            }
+        )
+    )
+
+
+def handle_error(context) -> None:
+    # a failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+def install(engine) -> None:
+    """
+    Attaches the listeners recording slow statements to an engine.
+
+    :param engine: The engine.
+    :type engine: Engine
+    """
+    configure_logger()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine, "handle_error", handle_error)
@@ -1,3 +1,6 @@
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext import baked
 from sqlalchemy.orm import Session
 from src.database.model import User
 from src.schemas import UserModel
@@ -6,6 +9,15 @@ import logging
 
 logging.basicConfig(level=logging.ERROR)
 
+# hot queries are built and compiled once per process, calls only bind the parameters
+bakery = baked.bakery()
+
+user_by_email = bakery(lambda session: session.query(User))
+user_by_email += lambda query: query.filter(User.email == bindparam("email"))
+
+user_by_id = bakery(lambda session: session.query(User))
+user_by_id += lambda query: query.filter(User.id == bindparam("user_id"))
+
 
 async def get_user_by_email(email: str, db: Session) -> User:
     """
@@ -21,28 +33,70 @@ async def get_user_by_email(email: str, db: Session) -> User:
     ...
     logging.debug("in repo.auth.get_user_by_email")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = user_by_email(db).params(email=email).first()
     return user
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def get_user_by_id(user_id: int, db: Session) -> User:
+    """
+    Retrieves a user from the database by ID.
+
+    :param user_id: The ID of the user to retrieve.
+    :type user_id: int
+    :param db: The database session.
+    :type db: Session
+    :return: The user with the specified ID, or None if not found.
+    :rtype: User | None
+    """
+    logging.debug("in repo.auth.get_user_by_id")
+
+    return user_by_id(db).params(user_id=user_id).first()
+
+
+async def create_user(body: UserModel, db: Session) -> User | None:
     """
-    Creates a new user in the database.
+    Creates a new user in the database unless the email address is taken, with a single
+    statement: ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` on Postgres and
+    ``INSERT OR IGNORE`` on SQLite, so concurrent signups cannot both succeed.
+    ``OR IGNORE`` skips the row on any constraint violation, not only on the unique
+    email, so on SQLite every failed insert is reported as a taken email.
 
     :param body: The data for the new user.
     :type body: UserModel
     :param db: The database session.
     :type db: Session
-    :return: The newly created user.
-    :rtype: User
+    :return: The newly created user, or None if the email address is taken.
+    :rtype: User | None
     """
     logging.debug("in repo.auth.create_user")
 
-    new_user = User(**body.model_dump())
-    db.add(new_user)
+    values = body.model_dump()
+    table = User.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        statement = (
+            insert(table)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=[table.c.email])
+            .returning(table.c.id)
+        )
+        user_id = db.execute(statement).scalar()
+    elif dialect == "sqlite":
+        result = db.execute(table.insert().prefix_with("OR IGNORE").values(**values))
+        user_id = result.lastrowid if result.rowcount else None
+    else:
+        try:
+            result = db.execute(table.insert().values(**values))
+            user_id = result.inserted_primary_key[0]
+        except IntegrityError:
+            db.rollback()
+            return None
     db.commit()
-    db.refresh(new_user)
-    return new_user
+    if user_id is None:
+        return None
+    return User(id=user_id, confirmed=False, **values)
 
 
 async def update_token(user: User, token: str | None, db: Session) -> None:
@@ -61,19 +115,53 @@ async def update_token(user: User, token: str | None, db: Session) -> None:
     db.commit()
 
 
-async def confirm_email(email: str, db: Session) -> None:
+async def update_password(
+    user_id: int, old_hash: str, new_hash: str, db: Session
+) -> bool:
+    """
+    Replaces the password hash of a user if it is still the given one.
+
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :param old_hash: The hash expected in the database.
+    :type old_hash: str
+    :param new_hash: The new hash.
+    :type new_hash: str
+    :param db: The database session.
+    :type db: Session
+    :return: True if the hash was replaced.
+    :rtype: bool
     """
-    Confirms the email address of a user in the database.
+    logging.debug("in repo.auth.update_password")
+    updated = (
+        db.query(User)
+        .filter(User.id == user_id, User.password == old_hash)
+        .update({User.password: new_hash})
+    )
+    db.commit()
+    return bool(updated)
+
+
+async def confirm_email(email: str, db: Session) -> bool:
+    """
+    Confirms the email address of a user in the database with a single UPDATE.
 
     :param email: The email address to confirm.
     :type email: str
     :param db: The database session.
     :type db: Session
+    :return: True if the address was confirmed now, False if there is no such user or
+        it was confirmed before.
+    :rtype: bool
     """
     logging.debug("in repo.auth.confirmed_email")
-    user = await get_user_by_email(email, db)
-    user.confirmed = True
+    updated = (
+        db.query(User)
+        .filter(User.email == email, User.confirmed.isnot(True))
+        .update({User.confirmed: True})
+    )
     db.commit()
+    return bool(updated)
 
 
 async def update_avatar(email: str, url: str, db: Session) -> User:
@@ -0,0 +1,187 @@
+from collections import Counter
+from datetime import date, datetime
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.database.model import Contact, ContactStat, User
+
+import logging
+
+TOTAL = "total"
+DOMAIN = "domain"
+BIRTH_MONTH = "birth_month"
+ADDED_WEEK = "added_week"
+
+REBUILD_BATCH_SIZE = 10_000
+
+# one statement for Postgres and SQLite, which both support ON CONFLICT since 3.24;
+# the counter row is locked by the update until the contact write commits
+INCREMENT = text(
+    "INSERT INTO contact_stats (user_id, kind, bucket, count) "
+    "VALUES (:user_id, :kind, :bucket, :delta) "
+    "ON CONFLICT (user_id, kind, bucket) "
+    "DO UPDATE SET count = contact_stats.count + excluded.count"
+)
+
+
+# Postgres advisory lock of the counters of one user, held until the end of the
+# transaction: shared by the contact writes, exclusive for a rebuild of the user
+STATS_LOCK_CLASS = 5050
+SHARE_USER_STATS = text("SELECT pg_advisory_xact_lock_shared(:lock_class, :user_id)")
+LOCK_USER_STATS = text("SELECT pg_advisory_xact_lock(:lock_class, :user_id)")
+
+
+def contact_buckets(
+    email: str | None, born_date: date | None, created_at: datetime | None
+) -> list[tuple[str, str]]:
+    """
+    Lists the counters a contact is counted in: the total, the domain of its email,
+    the month of its birthday and the ISO week it was added in.
+
+    :param email: The email of the contact.
+    :type email: str | None
+    :param born_date: The birth date of the contact.
+    :type born_date: date | None
+    :param created_at: When the contact was added.
+    :type created_at: datetime | None
+    :return: The kinds and buckets of the counters.
+    :rtype: list[tuple[str, str]]
+    """
+    buckets = [(TOTAL, "")]
+    if email and "@" in email:
+        buckets.append((DOMAIN, email.rsplit("@", 1)[1].lower()[:50]))
+    if born_date is not None:
+        buckets.append((BIRTH_MONTH, f"{born_date.month:02d}"))
+    if created_at is not None:
+        year, week, _ = created_at.isocalendar()
+        buckets.append((ADDED_WEEK, f"{year}-W{week:02d}"))
+    return buckets
+
+
+def stat_deltas(
+    before: Iterable[tuple[str, str]] = (), after: Iterable[tuple[str, str]] = ()
+) -> Counter:
+    """
+    Computes the changes of the counters when a contact counted in ``before`` becomes
+    counted in ``after``; counters which do not change are left out.
+    """
+    deltas = Counter(after)
+    deltas.subtract(before)
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+
+def apply_deltas(db: Session, user_id: int, deltas: Counter) -> None:
+    """
+    Adds the deltas to the counters of a user in the transaction of the session, so
+    they are committed together with the contact write which caused them. The counters
+    are updated, and so locked, in the order of their kind and bucket: concurrent
+    writes moving contacts between the same buckets wait for each other instead of
+    deadlocking. On Postgres the write also shares the advisory lock of the user, so
+    it waits for a rebuild of the user running meanwhile.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the owner of the contacts.
+    :type user_id: int
+    :param deltas: The changes by kind and bucket.
+    :type deltas: Counter
+    """
+    if not deltas:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(
+            SHARE_USER_STATS, {"lock_class": STATS_LOCK_CLASS, "user_id": user_id}
+        )
+    db.execute(
+        INCREMENT,
+        [
+            {"user_id": user_id, "kind": kind, "bucket": bucket, "delta": delta}
+            for (kind, bucket), delta in sorted(deltas.items())
+        ],
+    )
+
+
+async def get_stats(db: Session, user: User) -> dict:
+    """
+    Retrieves the statistics of the contacts of a user from their counters, without
+    reading the contacts.
+
+    :param db: The database session.
+    :type db: Session
+    :param user: The user whose statistics are being retrieved.
+    :type user: User
+    :return: The total, and the counts by email domain, birthday month and week added.
+    :rtype: dict
+    """
+    logging.debug("in repo.get_stats function")
+    rows = (
+        db.query(ContactStat.kind, ContactStat.bucket, ContactStat.count)
+        .filter(ContactStat.user_id == user.id, ContactStat.count > 0)
+        .all()
+    )
+    counts = {TOTAL: {}, DOMAIN: {}, BIRTH_MONTH: {}, ADDED_WEEK: {}}
+    for kind, bucket, count in rows:
+        if kind in counts:
+            counts[kind][bucket] = count
+    return {
+        "total": counts[TOTAL].get("", 0),
+        "by_domain": dict(
+            sorted(counts[DOMAIN].items(), key=lambda item: (-item[1], item[0]))
+        ),
+        "birthdays_by_month": dict(sorted(counts[BIRTH_MONTH].items())),
+        "added_by_week": dict(sorted(counts[ADDED_WEEK].items())),
+    }
+
+
+def rebuild_stats(db: Session, user_id: int | None = None) -> int:
+    """
+    Recomputes the counters from the contacts, of one user or of all of them, and
+    replaces the stored ones in a single transaction. On Postgres the counters are
+    locked first, so contact writes running meanwhile wait and are counted once: the
+    whole table for all users, only the advisory lock of the user otherwise, which
+    leaves the writes of other users running.
+
+    :param db: The database session.
+    :type db: Session
+    :param user_id: The ID of the user, or None for all users.
+    :type user_id: int | None
+    :return: The number of contacts counted.
+    :rtype: int
+    """
+    logging.debug("in repo.rebuild_stats function")
+    if db.get_bind().dialect.name == "postgresql":
+        if user_id is None:
+            db.execute(text("LOCK TABLE contact_stats IN EXCLUSIVE MODE"))
+        else:
+            db.execute(
+                LOCK_USER_STATS, {"lock_class": STATS_LOCK_CLASS, "user_id": user_id}
+            )
+
+    contacts = db.query(
+        Contact.user_id, Contact.email, Contact.born_date, Contact.created_at
+    ).filter(Contact.user_id.isnot(None))
+    stats = db.query(ContactStat)
+    if user_id is not None:
+        contacts = contacts.filter(Contact.user_id == user_id)
+        stats = stats.filter(ContactStat.user_id == user_id)
+
+    counts = Counter()
+    counted = 0
+    for row in contacts.yield_per(REBUILD_BATCH_SIZE):
+        counted += 1
+        for kind, bucket in contact_buckets(row.email, row.born_date, row.created_at):
+            counts[row.user_id, kind, bucket] += 1
+
+    stats.delete(synchronize_session=False)
+    rows = [
+        {"user_id": owner, "kind": kind, "bucket": bucket, "count": count}
+        for (owner, kind, bucket), count in counts.items()
+    ]
+    for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+        db.execute(
+            ContactStat.__table__.insert(), rows[start : start + REBUILD_BATCH_SIZE]
+        )
+    db.commit()
+    return counted
@@ -1,16 +1,115 @@
+from datetime import datetime, timedelta, timezone
 from typing import List
 
+from sqlalchemy import bindparam
+from sqlalchemy.ext import baked
 from sqlalchemy.orm import Session
 
-from src.database.model import Contact, User
+from src.database.model import Contact, ContactTombstone, User
 from src.schemas import ContactBase
 
+from src.conf.config import settings
+from src.repository import contact_stats
+from src.services import birthdays
 from src.services.added_features import get_id_birthday_upcoming
+from src.services.events import contact_event, contact_events
+from src.services.phones import to_e164
 
 import logging
 
+# hot queries are built and compiled once per process, calls only bind the parameters
+bakery = baked.bakery()
+
+# the read-only paths load these columns as tuples with attribute access, without the
+# identity map and instance state of full Contact objects
+ROW_COLUMNS = (
+    Contact.id,
+    Contact.first_name,
+    Contact.last_name,
+    Contact.email,
+    Contact.phone,
+    Contact.phone_e164,
+    Contact.born_date,
+    Contact.additional,
+)
+
+contacts_of_user = bakery(lambda session: session.query(*ROW_COLUMNS))
+contacts_of_user += lambda query: query.filter(Contact.user_id == bindparam("user_id"))
+
+contact_by_id = bakery(lambda session: session.query(Contact))
+contact_by_id += lambda query: query.filter(
+    Contact.id == bindparam("contact_id"), Contact.user_id == bindparam("user_id")
+)
+
+contact_rows_by_id = bakery(lambda session: session.query(*ROW_COLUMNS))
+contact_rows_by_id += lambda query: query.filter(
+    Contact.id == bindparam("contact_id"), Contact.user_id == bindparam("user_id")
+)
+
+contacts_by_first_name = bakery(lambda session: session.query(*ROW_COLUMNS))
+contacts_by_first_name += lambda query: query.filter(
+    Contact.first_name == bindparam("value"), Contact.user_id == bindparam("user_id")
+)
+
+contacts_by_last_name = bakery(lambda session: session.query(*ROW_COLUMNS))
+contacts_by_last_name += lambda query: query.filter(
+    Contact.last_name == bindparam("value"), Contact.user_id == bindparam("user_id")
+)
+
+contacts_by_email = bakery(lambda session: session.query(*ROW_COLUMNS))
+contacts_by_email += lambda query: query.filter(
+    Contact.email == bindparam("value"), Contact.user_id == bindparam("user_id")
+)
+
+contacts_by_phone = bakery(lambda session: session.query(*ROW_COLUMNS))
+contacts_by_phone += lambda query: query.filter(
+    Contact.user_id == bindparam("user_id"), Contact.phone_e164 == bindparam("value")
+)
+
+
+def stat_buckets(contact: Contact) -> list[tuple[str, str]]:
+    return contact_stats.contact_buckets(
+        contact.email, contact.born_date, contact.created_at
+    )
+
 
-async def get_contacts(db: Session, user: User) -> List[Contact]:
+def lock_contact(contact: Contact, db: Session) -> Contact | None:
+    """
+    Re-reads a contact loaded earlier with its row locked until the end of the
+    transaction, so a write computes its statistics from the stored values: a
+    concurrent write of the same contact waits for this one to commit, and then finds
+    its changes, or no row when it was removed.
+
+    :param contact: The contact about to be written.
+    :type contact: Contact
+    :param db: The database session.
+    :type db: Session
+    :return: The refreshed contact, or None if it does not exist anymore.
+    :rtype: Contact | None
+    """
+    return (
+        db.query(Contact)
+        .filter(Contact.id == contact.id, Contact.user_id == contact.user_id)
+        .with_for_update()
+        .populate_existing()
+        .one_or_none()
+    )
+
+
+async def refresh_birthdays(
+    r, contact_id: int, user_id: int, born_date: datetime | None
+) -> None:
+    """
+    Updates the materialized upcoming birthdays after a contact write which is already
+    committed; a Redis error is logged and does not fail the write.
+    """
+    try:
+        await birthdays.refresh_contact(r, contact_id, user_id, born_date)
+    except Exception as err:
+        logging.error(f"Refreshing upcoming birthdays of user {user_id} failed: {err}")
+
+
+async def get_contacts(db: Session, user: User) -> List[tuple]:
     """
     Retrieves all contacts belonging to a specific user from the database.
 
@@ -18,12 +117,11 @@ async def get_contacts(db: Session, user: User) -> List[Contact]:
     :type db: Session
     :param user: The user whose contacts are being retrieved.
     :type user: User
-    :return: A list of contacts belonging to the user.
-    :rtype: List[Contact]
+    :return: A list of contacts belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
 
-    # return db.query(Contact).filter(Contact.user_id == user.id).first()
-    return db.query(Contact).filter(Contact.user_id == user.id).all()
+    return contacts_of_user(db).params(user_id=user.id).all()
 
 
 async def get_contact(contact_id: int, db: Session, user: User) -> Contact:
@@ -40,15 +138,11 @@ async def get_contact(contact_id: int, db: Session, user: User) -> Contact:
     :rtype: Contact
     """
     logging.debug("We are in repo.get_contact function")
-    contact = (
-        db.query(Contact)
-        .filter(Contact.id == contact_id, Contact.user_id == user.id)
-        .first()
-    )
+    contact = contact_by_id(db).params(contact_id=contact_id, user_id=user.id).first()
     return contact
 
 
-async def get_contact_by_id(contact_id: str, db: Session, user: User) -> List[Contact]:
+async def get_contact_by_id(contact_id: str, db: Session, user: User) -> List[tuple]:
     """
     Retrieves a contact by its ID belonging to a specific user from the database.
 
@@ -58,8 +152,8 @@ async def get_contact_by_id(contact_id: str, db: Session, user: User) -> List[Co
     :type db: Session
     :param user: The user whose contact is being retrieved.
     :type user: User
-    :return: A list containing the contact with the specified ID belonging to the user.
-    :rtype: List[Contact]
+    :return: A list containing the contact with the specified ID belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("We are in repo.get_contact_by_id function")
     try:
@@ -69,15 +163,13 @@ async def get_contact_by_id(contact_id: str, db: Session, user: User) -> List[Co
         return None
     else:
         return (
-            db.query(Contact)
-            .filter(Contact.id == contact_id, Contact.user_id == user.id)
-            .all()
+            contact_rows_by_id(db).params(contact_id=contact_id, user_id=user.id).all()
         )
 
 
 async def get_contacts_by_first_name(
     contact_first_name: str, db: Session, user: User
-) -> List[Contact]:
+) -> List[tuple]:
     """
     Retrieves contacts by their first name belonging to a specific user from the database.
 
@@ -87,13 +179,13 @@ async def get_contacts_by_first_name(
     :type db: Session
     :param user: The user whose contacts are being retrieved.
     :type user: User
-    :return: A list of contacts with the specified first name belonging to the user.
-    :rtype: List[Contact]
+    :return: A list of contacts with the specified first name belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("We are in repo.get_contact_by_first_name function")
     contacts = (
-        db.query(Contact)
-        .filter(Contact.first_name == contact_first_name, Contact.user_id == user.id)
+        contacts_by_first_name(db)
+        .params(value=contact_first_name, user_id=user.id)
         .all()
     )
     return contacts
@@ -101,7 +193,7 @@ async def get_contacts_by_first_name(
 
 async def get_contacts_by_last_name(
     contact_last_name: str, db: Session, user: User
-) -> List[Contact]:
+) -> List[tuple]:
     """
     Retrieves contacts by their last name belonging to a specific user from the database.
 
@@ -111,20 +203,18 @@ async def get_contacts_by_last_name(
     :type db: Session
     :param user: The user whose contacts are being retrieved.
     :type user: User
-    :return: A list of contacts with the specified last name belonging to the user.
-    :rtype: List[Contact]
+    :return: A list of contacts with the specified last name belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("We are in repo.get_contact_by_last_name function")
     return (
-        db.query(Contact)
-        .filter(Contact.last_name == contact_last_name, Contact.user_id == user.id)
-        .all()
+        contacts_by_last_name(db).params(value=contact_last_name, user_id=user.id).all()
     )
 
 
 async def get_contact_by_email(
     contact_email: str, db: Session, user: User
-) -> List[Contact]:
+) -> List[tuple]:
     """
     Retrieves a contact by its email address belonging to a specific user from the database.
 
@@ -134,24 +224,43 @@ async def get_contact_by_email(
     :type db: Session
     :param user: The user whose contact is being retrieved.
     :type user: User
-    :return: A list containing the contact with the specified email address belonging to the user.
-    :rtype: List[Contact]
+    :return: A list containing the contact with the specified email address belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("in repo.get_contact_by_email function")
-    return (
-        db.query(Contact)
-        .filter(Contact.email == contact_email, Contact.user_id == user.id)
-        .all()
-    )
+    return contacts_by_email(db).params(value=contact_email, user_id=user.id).all()
+
+
+async def get_contacts_by_phone(
+    contact_phone: str, db: Session, user: User
+) -> List[tuple]:
+    """
+    Retrieves contacts by their phone number belonging to a specific user from the database.
+    The number is normalized to E.164 first, so any formatting of the same number matches.
+
+    :param contact_phone: The phone number of the contacts to retrieve.
+    :type contact_phone: str
+    :param db: The database session.
+    :type db: Session
+    :param user: The user whose contacts are being retrieved.
+    :type user: User
+    :return: A list of contacts with the specified phone number belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
+    """
+    logging.debug("in repo.get_contacts_by_phone function")
+    phone_e164 = to_e164(contact_phone)
+    if phone_e164 is None:
+        return []
+    return contacts_by_phone(db).params(value=phone_e164, user_id=user.id).all()
 
 
 async def get_contacts_by(
     field: str, value: str, db: Session, user: User
-) -> List[Contact]:
+) -> List[tuple]:
     """
     Retrieves contacts by a specified field and value belonging to a specific user from the database.
 
-    :param field: The field to filter the contacts by (e.g., "id", "first_name", "last_name", "email").
+    :param field: The field to filter the contacts by (e.g., "id", "first_name", "last_name", "email", "phone").
     :type field: str
     :param value: The value to filter the contacts by.
     :type value: str
@@ -159,8 +268,8 @@ async def get_contacts_by(
     :type db: Session
     :param user: The user whose contacts are being retrieved.
     :type user: User
-    :return: A list of contacts filtered by the specified field and value belonging to the user.
-    :rtype: List[Contact]
+    :return: A list of contacts filtered by the specified field and value belonging to the user, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("in repo.get_contacts_by function")
 
@@ -169,6 +278,7 @@ async def get_contacts_by(
         "first_name": get_contacts_by_first_name,
         "last_name": get_contacts_by_last_name,
         "email": get_contact_by_email,
+        "phone": get_contacts_by_phone,
     }
 
     if field in fields.keys():
@@ -180,9 +290,12 @@ async def get_contacts_by(
     return contacts
 
 
-async def create_new_contact(body: ContactBase, db: Session, user: User) -> Contact:
+async def create_new_contact(
+    body: ContactBase, db: Session, user: User, r=None
+) -> Contact:
     """
-    Creates a new contact for a specific user in the database.
+    Creates a new contact for a specific user in the database, and counts it in the
+    statistics of the user in the same transaction.
 
     :param body: The data for the new contact.
     :type body: ContactBase
@@ -190,6 +303,8 @@ async def create_new_contact(body: ContactBase, db: Session, user: User) -> Cont
     :type db: Session
     :param user: The user for whom the contact is being created.
     :type user: User
+    :param r: The Redis client keeping the materialized upcoming birthdays.
+    :type r: redis.asyncio.Redis | None
     :return: The newly created contact.
     :rtype: Contact
     """
@@ -199,19 +314,30 @@ async def create_new_contact(body: ContactBase, db: Session, user: User) -> Cont
         last_name=body.last_name.lower(),
         email=body.email.lower(),
         phone=body.phone,
+        phone_e164=to_e164(body.phone),
         born_date=body.born_date,
         additional=body.additional.lower(),
         user_id=user.id,
+        created_at=datetime.utcnow(),
     )
     db.add(contact)
+    contact_stats.apply_deltas(
+        db, user.id, contact_stats.stat_deltas(after=stat_buckets(contact))
+    )
     db.commit()
     db.refresh(contact)
+    if r is not None:
+        await refresh_birthdays(r, contact.id, user.id, contact.born_date)
+    await contact_events.publish(user.id, contact_event("created", contact))
     return contact
 
 
-async def update_contact(contact: Contact, body: ContactBase, db: Session) -> Contact:
+async def update_contact(
+    contact: Contact, body: ContactBase, db: Session, r=None
+) -> Contact:
     """
-    Updates an existing contact in the database.
+    Updates an existing contact in the database, and moves it between the counters of
+    the statistics of its owner in the same transaction.
 
     :param contact: The contact to update.
     :type contact: Contact
@@ -219,57 +345,187 @@ async def update_contact(contact: Contact, body: ContactBase, db: Session) -> Co
     :type body: ContactBase
     :param db: The database session.
     :type db: Session
+    :param r: The Redis client keeping the materialized upcoming birthdays.
+    :type r: redis.asyncio.Redis | None
+    :return: The updated contact, or None if it was removed meanwhile.
+    :rtype: Contact | None
     """
     logging.debug("in repo.update_contact function")
 
     if contact:
+        if lock_contact(contact, db) is None:
+            return None
+        born_date_changed = (
+            contact.born_date is None or contact.born_date.date() != body.born_date
+        )
+        buckets_before = stat_buckets(contact)
         contact.first_name = body.first_name.lower()
         contact.last_name = body.last_name.lower()
         contact.email = body.email.lower()
         contact.phone = body.phone
+        contact.phone_e164 = to_e164(body.phone)
         contact.born_date = body.born_date
         contact.additional = body.additional.lower()
+        contact_stats.apply_deltas(
+            db,
+            contact.user_id,
+            contact_stats.stat_deltas(buckets_before, stat_buckets(contact)),
+        )
 
         db.commit()
+        if r is not None and born_date_changed:
+            await refresh_birthdays(r, contact.id, contact.user_id, contact.born_date)
+        await contact_events.publish(
+            contact.user_id, contact_event("updated", contact)
+        )
     return contact
 
 
-async def remove_contact(contact: Contact, db: Session) -> Contact:
+async def remove_contact(contact: Contact, db: Session, r=None) -> Contact:
     """
-    Removes an existing contact from the database.
+    Removes an existing contact from the database, and uncounts it from the statistics
+    of its owner in the same transaction.
 
     :param contact: The contact to remove.
     :type contact: Contact
     :param db: The database session.
     :type db: Session
+    :param r: The Redis client keeping the materialized upcoming birthdays.
+    :type r: redis.asyncio.Redis | None
+    :return: The removed contact, or None if it was removed meanwhile.
+    :rtype: Contact | None
     """
     logging.debug("in repo.remove_contact function")
     if contact:
+        if lock_contact(contact, db) is None:
+            return None
         db.delete(contact)
+        db.add(ContactTombstone(contact_id=contact.id, user_id=contact.user_id))
+        prune_tombstones(db, contact.user_id)
+        contact_stats.apply_deltas(
+            db, contact.user_id, contact_stats.stat_deltas(before=stat_buckets(contact))
+        )
         db.commit()
+        if r is not None:
+            await refresh_birthdays(r, contact.id, contact.user_id, None)
+        await contact_events.publish(
+            contact.user_id, contact_event("deleted", contact)
+        )
     return contact
 
 
-async def get_contacts_with_upcoming_birtday(db: Session, user: User) -> list[Contact]:
+async def get_changes(
+    since: datetime | None, db: Session, user: User
+) -> tuple[List[Contact], List[int], datetime | None, bool]:
+    """
+    Retrieves the contacts of a user changed and deleted after the given cursor.
+    Both lookups are range scans of the ``(user_id, updated_at)`` and
+    ``(user_id, deleted_at)`` indexes.
+
+    The timestamps are taken by the workers when a write is flushed, not when it
+    commits, so rows from ``settings.sync_overlap_seconds`` before the cursor are sent
+    again: a slow transaction or a worker clock behind the others cannot hide a change
+    from the next sync, and clients apply the changes idempotently. A cursor older than
+    the retention of the tombstones gets a full sync, as deletions may be missing.
+
+    :param since: The cursor returned by the previous sync, None for a full sync.
+    :type since: datetime | None
+    :param db: The database session.
+    :type db: Session
+    :param user: The user whose changes are being retrieved.
+    :type user: User
+    :return: Changed contacts, IDs of deleted contacts, the cursor for the next sync and whether this is a full sync replacing the contacts of the client.
+    :rtype: tuple[List[Contact], List[int], datetime | None, bool]
+    """
+    logging.debug("in repo.get_changes function")
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    retention_start = datetime.utcnow() - timedelta(
+        days=settings.tombstone_retention_days
+    )
+    if since is not None and since < retention_start:
+        since = None
+
+    changed_query = db.query(Contact).filter(Contact.user_id == user.id)
+    deleted_query = db.query(ContactTombstone).filter(
+        ContactTombstone.user_id == user.id
+    )
+    if since is not None:
+        window_start = since - timedelta(seconds=settings.sync_overlap_seconds)
+        changed_query = changed_query.filter(Contact.updated_at >= window_start)
+        deleted_query = deleted_query.filter(
+            ContactTombstone.deleted_at >= window_start
+        )
+    changed = changed_query.all()
+    tombstones = deleted_query.all()
+
+    # an ID can be reused by a contact created after the deletion
+    changed_ids = {contact.id for contact in changed}
+    deleted = sorted(
+        {t.contact_id for t in tombstones if t.contact_id not in changed_ids}
+    )
+
+    timestamps = [contact.updated_at for contact in changed if contact.updated_at]
+    timestamps += [tombstone.deleted_at for tombstone in tombstones]
+    if since is not None:
+        timestamps.append(since)
+    cursor = max(timestamps, default=None)
+    return changed, deleted, cursor, since is None
+
+
+def prune_tombstones(db: Session, user_id: int) -> None:
+    """
+    Deletes the tombstones of a user older than ``settings.tombstone_retention_days``,
+    in the transaction of the session; clients syncing from before then get a full sync.
+    """
+    retention_start = datetime.utcnow() - timedelta(
+        days=settings.tombstone_retention_days
+    )
+    db.query(ContactTombstone).filter(
+        ContactTombstone.user_id == user_id,
+        ContactTombstone.deleted_at < retention_start,
+    ).delete(synchronize_session=False)
+
+
+async def get_contacts_with_upcoming_birtday(
+    db: Session, user: User, r=None
+) -> List[tuple]:
     """
     Retrieves contacts with upcoming birthdays for a specific user from the database.
+    The IDs are read from the set materialized in Redis when it was built today,
+    otherwise they are computed from the birth dates of all contacts of the user.
 
     :param db: The database session.
     :type db: Session
     :param user: The user whose contacts are being retrieved.
     :type user: User
-    :return: A list of contacts with upcoming birthdays belonging to the user.
-    :rtype: List[Contact]
+    :param r: The Redis client keeping the materialized upcoming birthdays.
+    :type r: redis.asyncio.Redis | None
+    :return: A list of contacts with upcoming birthdays belonging to the user, the closest birthdays first when read from Redis, as rows of ``ROW_COLUMNS``.
+    :rtype: List[tuple]
     """
     logging.debug("in repo.get_contact_with_upcoming_birtday function")
 
-    born_dates = db.query(Contact).values(Contact.born_date, Contact.id)
+    id_list = None
+    if r is not None:
+        try:
+            id_list = await birthdays.get_upcoming_ids(r, user.id)
+        except Exception as err:
+            logging.error(f"Reading upcoming birthdays from Redis failed: {err}")
+    if id_list is None:
+        born_dates = (
+            db.query(Contact)
+            .filter(Contact.user_id == user.id, Contact.born_date.isnot(None))
+            .values(Contact.born_date, Contact.id)
+        )
+        id_list = get_id_birthday_upcoming(born_dates, settings.birthday_window_days)
 
-    id_list = get_id_birthday_upcoming(born_dates)
     contacts = (
-        db.query(Contact)
+        db.query(*ROW_COLUMNS)
         .filter(Contact.id.in_(id_list), Contact.user_id == user.id)
         .all()
     )
+    order = {contact_id: i for i, contact_id in enumerate(id_list)}
+    contacts.sort(key=lambda contact: order.get(contact.id, 0))
 
     return contacts
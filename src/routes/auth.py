@@ -9,6 +9,7 @@ from fastapi import (
     BackgroundTasks,
     Request,
 )
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import (
     OAuth2PasswordRequestForm,
     HTTPAuthorizationCredentials,
@@ -18,17 +19,26 @@ from src.services.email import send_email
 from sqlalchemy.orm import Session
 
 from src.database.db import get_db
+from src.database.model import User
 from src.schemas import UserModel, UserResponse, TokenModel, RequestEmail
 from src.repository import auth as repository_users
 from src.services.auth import auth_service
+from src.services.load_shedding import ConcurrencyLimiter
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer()
+# bcrypt runs in the threadpool, a few hashes at a time keep threads for other requests
+password_limiter = ConcurrencyLimiter(
+    "password_hashing", limit=4, queue=16, timeout=5.0, retry_after=2
+)
 
 
 @router.post(
-    "/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED
+    "/signup",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(password_limiter)],
 )
 async def signup(
     body: UserModel,
@@ -51,26 +61,34 @@ async def signup(
     :rtype: dict
     """
     print("We are in routes.auth.signup")
-    exist_user = await repository_users.get_user_by_email(body.email, db)
-    if exist_user:
+    body.password = await run_in_threadpool(
+        auth_service.get_password_hash, body.password
+    )
+    new_user = await repository_users.create_user(body, db)
+    if new_user is None:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail="Account already exists"
         )
-    body.password = auth_service.get_password_hash(body.password)
-    new_user = await repository_users.create_user(body, db)
     background_tasks.add_task(
         send_email, new_user.email, new_user.email, request.base_url
     )
     return {"user": new_user, "detail": "User successfully created"}
 
 
-@router.post("/login", response_model=TokenModel)
+@router.post(
+    "/login", response_model=TokenModel, dependencies=[Depends(password_limiter)]
+)
 async def login(
-    body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    body: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db),
 ) -> dict:
     """
-    Endpoint for user authentication and login.
+    Endpoint for user authentication and login. A password hash of another cost than
+    the configured one is replaced in the background.
 
+    :param background_tasks: Background tasks to execute.
+    :type background_tasks: BackgroundTasks
     :param body: The login credentials.
     :type body: OAuth2PasswordRequestForm
     :param db: The database session.
@@ -88,10 +106,16 @@ async def login(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed"
         )
-    if not auth_service.verify_password(body.password, user.password):
+    if not await run_in_threadpool(
+        auth_service.verify_password, body.password, user.password
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password"
         )
+    if auth_service.needs_rehash(user.password):
+        background_tasks.add_task(
+            auth_service.rehash_password, user.id, user.password, body.password
+        )
 
     access_token = auth_service.create_token(
         data={"sub": user.email}, token_type="access_token"
@@ -107,6 +131,32 @@ async def login(
     }
 
 
+@router.post("/logout")
+async def logout(
+    token: str = Depends(auth_service.oauth2_scheme),
+    current_user: User = Depends(auth_service.get_current_user),
+    db: Session = Depends(get_db),
+) -> dict:
+    """
+    Endpoint for logging out: revokes the access token of the request and the refresh
+    token of the user.
+
+    :param token: The access token of the request.
+    :type token: str
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :param db: The database session.
+    :type db: Session
+    :return: Confirmation message.
+    :rtype: dict
+    """
+    print("We are in routes.auth.logout")
+    # the refresh token is cleared even if storing the revocation fails
+    await repository_users.update_token(current_user, None, db)
+    await auth_service.revoke_token(token)
+    return {"message": "Logged out"}
+
+
 @router.get("/refresh_token", response_model=TokenModel)
 async def refresh_token(
     credentials: HTTPAuthorizationCredentials = Security(security),
@@ -160,15 +210,15 @@ async def confirm_email(token: str, db: Session = Depends(get_db)) -> dict:
     """
     print("We are in routes.auth.confirm_email")
     email = await auth_service.get_email_from_token(token)
+    if await repository_users.confirm_email(email, db):
+        return {"message": "Email confirmed"}
+    # nothing was updated: the user does not exist or confirmed before
     user = await repository_users.get_user_by_email(email, db)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Verification error"
         )
-    if user.confirmed:
-        return {"message": "Your email is already confirmed"}
-    await repository_users.confirm_email(email, db)
-    return {"message": "Email confirmed"}
+    return {"message": "Your email is already confirmed"}
 
 
 @router.post("/request_email")
@@ -1,25 +1,54 @@
+from datetime import datetime
 from typing import List
 
 from fastapi import Depends, APIRouter, status
-from fastapi_limiter.depends import RateLimiter
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from src.database.db import get_db
-from src.schemas import ContactBase, ContactResponse
+from src.database.redis_pool import get_redis
+from src.schemas import (
+    ContactBase,
+    ContactChanges,
+    ContactResponse,
+    ContactStats,
+    DuplicateGroup,
+)
 from src.services.added_features import get_no_contacts_exception
+from src.services.duplicates import find_duplicates
+from src.services.events import event_stream
+from src.services.load_shedding import ConcurrencyLimiter
+from src.services.negotiation import NegotiatedResponse, NegotiatedRoute
 from src.services.auth import auth_service
+from src.services.rate_limiter import UserTokenBucketLimiter
 from src.database.model import User, Contact
 
 import src.repository.contacts as contact_repo
+import src.repository.contact_stats as stats_repo
 
 
-router = APIRouter(prefix="/contacts", tags=["contacts"])
+# responses are sent as JSON, MessagePack or CBOR depending on the Accept header
+router = APIRouter(
+    prefix="/contacts",
+    tags=["contacts"],
+    route_class=NegotiatedRoute,
+    default_response_class=NegotiatedResponse,
+)
+# routes reading all contacts of a user
+scan_limiter = ConcurrencyLimiter("contacts_scan", limit=8, queue=16, timeout=2.0)
+duplicates_limiter = ConcurrencyLimiter(
+    "contacts_duplicates", limit=2, queue=4, timeout=5.0, retry_after=5
+)
 
 
 @router.get(
     "/",
     response_model=List[ContactResponse],
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[
+        Depends(UserTokenBucketLimiter(times=10, seconds=60)),
+        Depends(scan_limiter),
+    ],
 )
 async def display_all_contacts(
     db: Session = Depends(get_db),
@@ -44,12 +73,16 @@ async def display_all_contacts(
 @router.get(
     "/birthday",
     response_model=List[ContactResponse],
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[
+        Depends(UserTokenBucketLimiter(times=10, seconds=60)),
+        Depends(scan_limiter),
+    ],
 )
 async def display_contacts_with_upcoming_birthay(
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user),
+    r=Depends(get_redis),
 ) -> list[Contact]:
     """
     Retrieve contacts with upcoming birthdays.
@@ -58,11 +91,15 @@ async def display_contacts_with_upcoming_birthay(
     :type db: Session
     :param current_user: The current user making the request.
     :type current_user: User
+    :param r: The shared Redis client, if available.
+    :type r: redis.asyncio.Redis | None
     :return: List of contacts.
     :rtype: List[Contact]
     """
     print("We are in routes.display_contacts_with_upcoming_birthay function")
-    contacts = await contact_repo.get_contacts_with_upcoming_birtday(db, current_user)
+    contacts = await contact_repo.get_contacts_with_upcoming_birtday(
+        db, current_user, r
+    )
     print(contacts)
     return contacts
 
@@ -70,8 +107,8 @@ async def display_contacts_with_upcoming_birthay(
 @router.get(
     "/byfield",
     response_model=List[ContactResponse],
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
 )
 async def display_choosen_contacts(
     field: str,
@@ -99,11 +136,155 @@ async def display_choosen_contacts(
     return contacts
 
 
+@router.get(
+    "/byphone",
+    response_model=List[ContactResponse],
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
+)
+async def display_contacts_by_phone(
+    phone: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+) -> list[Contact]:
+    """
+    Retrieve contacts by phone number, in any formatting of the number.
+
+    :param phone: The phone number to look up.
+    :type phone: str
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :return: List of contacts.
+    :rtype: List[Contact]
+    """
+    print("We are in routes.display_contacts_by_phone function")
+    contacts = await contact_repo.get_contacts_by_phone(phone, db, current_user)
+    get_no_contacts_exception(contacts)
+    return contacts
+
+
+@router.get(
+    "/changes",
+    response_model=ContactChanges,
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
+)
+async def display_contact_changes(
+    since: datetime | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+) -> dict:
+    """
+    Retrieve contacts changed and deleted since the previous sync.
+
+    :param since: The cursor returned by the previous sync, omitted for a full sync.
+    :type since: datetime | None
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :return: Changed contacts, IDs of deleted contacts, the next cursor and whether the client has to replace its contacts with the changed ones.
+    :rtype: ContactChanges
+    """
+    print("We are in routes.display_contact_changes function")
+    changed, deleted, cursor, full_sync = await contact_repo.get_changes(
+        since, db, current_user
+    )
+    return {
+        "changed": changed,
+        "deleted": deleted,
+        "cursor": cursor,
+        "full_sync": full_sync,
+    }
+
+
+@router.get(
+    "/events",
+    response_class=StreamingResponse,
+    description="No more than 5 connections per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=5, seconds=60))],
+)
+async def stream_contact_events(
+    current_user: User = Depends(auth_service.get_current_user),
+) -> StreamingResponse:
+    """
+    Stream server-sent events about contacts of the current user being created,
+    updated or deleted, from any worker.
+
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :return: The ``text/event-stream`` response.
+    :rtype: StreamingResponse
+    """
+    print("We are in routes.stream_contact_events function")
+    return StreamingResponse(
+        event_stream(current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/duplicates",
+    response_model=List[DuplicateGroup],
+    description="No more than 5 requests per minute",
+    dependencies=[
+        Depends(UserTokenBucketLimiter(times=5, seconds=60)),
+        Depends(duplicates_limiter),
+    ],
+)
+async def display_duplicate_contacts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+) -> list[dict]:
+    """
+    Retrieve groups of contacts which are likely duplicates of each other.
+
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :return: Groups of duplicates, the most certain first.
+    :rtype: List[DuplicateGroup]
+    """
+    print("We are in routes.display_duplicate_contacts function")
+    contacts = await contact_repo.get_contacts(db, current_user)
+    groups = await run_in_threadpool(find_duplicates, contacts)
+    return [{"score": score, "contacts": group} for score, group in groups]
+
+
+@router.get(
+    "/stats",
+    response_model=ContactStats,
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
+)
+async def display_contact_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user),
+) -> dict:
+    """
+    Retrieve the statistics of the contacts of the current user, read from counters
+    kept up to date by every contact write instead of a scan of the contacts.
+
+    :param db: The database session.
+    :type db: Session
+    :param current_user: The current user making the request.
+    :type current_user: User
+    :return: The total, and the counts by email domain, birthday month and week added.
+    :rtype: ContactStats
+    """
+    print("We are in routes.display_contact_stats function")
+    return await stats_repo.get_stats(db, current_user)
+
+
 @router.get(
     "/{contact_id}",
     response_model=ContactResponse,
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
 )
 async def display_choosen_contact_by_id(
     contact_id: int,
@@ -132,13 +313,14 @@ async def display_choosen_contact_by_id(
     "/",
     response_model=ContactResponse,
     status_code=status.HTTP_201_CREATED,
-    # description="No more than 5 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=5, seconds=60))],
+    description="No more than 5 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=5, seconds=60))],
 )
 async def add_new_contact(
     body: ContactBase,
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user),
+    r=Depends(get_redis),
 ) -> Contact:
     """
     Add a new contact.
@@ -149,25 +331,28 @@ async def add_new_contact(
     :type db: Session
     :param current_user: The current user making the request.
     :type current_user: User
+    :param r: The shared Redis client, if available.
+    :type r: redis.asyncio.Redis | None
     :return: The newly created contact.
     :rtype: Contact
     """
     print("We are in routes.add_new_contact function")
-    new_contact = await contact_repo.create_new_contact(body, db, current_user)
+    new_contact = await contact_repo.create_new_contact(body, db, current_user, r)
     return new_contact
 
 
 @router.put(
     "/{contact_id}",
     response_model=ContactResponse,
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
 )
 async def update_choosen_contact(
     contact_id: int,
     body: ContactBase,
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user),
+    r=Depends(get_redis),
 ) -> Contact:
     """
     Update a contact.
@@ -180,6 +365,8 @@ async def update_choosen_contact(
     :type db: Session
     :param current_user: The current user making the request.
     :type current_user: User
+    :param r: The shared Redis client, if available.
+    :type r: redis.asyncio.Redis | None
     :return: The updated contact.
     :rtype: Contact
     """
@@ -187,20 +374,22 @@ async def update_choosen_contact(
     contact = await contact_repo.get_contact(contact_id, db, current_user)
     get_no_contacts_exception(contact)
     print(f"contact_to_update = {contact}")
-    updated_contact = await contact_repo.update_contact(contact, body, db)
+    updated_contact = await contact_repo.update_contact(contact, body, db, r)
+    get_no_contacts_exception(updated_contact)
     return updated_contact
 
 
 @router.delete(
     "/{contact_id}",
     response_model=ContactResponse,
-    # description="No more than 10 requests per minute",
-    # dependencies=[Depends(RateLimiter(times=10, seconds=60))],
+    description="No more than 10 requests per minute",
+    dependencies=[Depends(UserTokenBucketLimiter(times=10, seconds=60))],
 )
 async def remove_choosen_contact(
     contact_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user),
+    r=Depends(get_redis),
 ) -> Contact:
     """
     Remove a contact.
@@ -211,11 +400,14 @@ async def remove_choosen_contact(
     :type db: Session
     :param current_user: The current user making the request.
     :type current_user: User
+    :param r: The shared Redis client, if available.
+    :type r: redis.asyncio.Redis | None
     :return: The removed contact.
     :rtype: Contact
     """
     print("We are in routes.remove_choosen_contact function")
     contact = await contact_repo.get_contact(contact_id, db, current_user)
     get_no_contacts_exception(contact)
-    removed_contact = await contact_repo.remove_contact(contact, db)
+    removed_contact = await contact_repo.remove_contact(contact, db, r)
+    get_no_contacts_exception(removed_contact)
     return removed_contact
@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from src.database.redis_pool import get_redis_stats
+from src.database.slow_queries import slow_query_log
+from src.services.auth import auth_service
+from src.services.load_shedding import get_load_shedding_stats
+from src.services.profiling import artifact_path
+
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/redis", dependencies=[Depends(auth_service.require_admin)])
+async def read_redis_metrics() -> dict:
+    """
+    Report the Redis command latencies and the usage of the shared connection pool.
+
+    :return: Pool usage and per command statistics.
+    :rtype: dict
+    """
+    print("in routes.metrics.read_redis_metrics")
+    return get_redis_stats()
+
+
+@router.get("/load_shedding", dependencies=[Depends(auth_service.require_admin)])
+async def read_load_shedding_metrics() -> list[dict]:
+    """
+    Report the concurrency limits of the expensive routes and the numbers of admitted,
+    queued and shed requests of this worker.
+
+    :return: The counters of every concurrency limiter.
+    :rtype: list[dict]
+    """
+    print("in routes.metrics.read_load_shedding_metrics")
+    return get_load_shedding_stats()
+
+
+@router.get("/slow_queries", dependencies=[Depends(auth_service.require_admin)])
+async def read_slow_queries(limit: int = 20) -> list[dict]:
+    """
+    Report the slow statements of this worker with the largest total time, with the
+    calling repository function, the parameters of the slowest execution and the plan.
+
+    :param limit: The number of statements.
+    :type limit: int
+    :return: The slow statements.
+    :rtype: list[dict]
+    """
+    print("in routes.metrics.read_slow_queries")
+    return slow_query_log.top(limit)
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(auth_service.require_admin)])
+async def read_profile(profile_id: str) -> FileResponse:
+    """
+    Download the profile of a request, an HTML flame chart or a pstats file.
+
+    :param profile_id: The ID returned in the ``X-Profile-ID`` header of the profiled request.
+    :type profile_id: str
+    :return: The profile.
+    :rtype: FileResponse
+    """
+    print("in routes.metrics.read_profile")
+    path = artifact_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return FileResponse(path, filename=path.name)
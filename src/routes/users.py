@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Request, status
+from fastapi.responses import RedirectResponse, Response
 from sqlalchemy.orm import Session
-import cloudinary
-import cloudinary.uploader
 
 from src.database.db import get_db
 from src.database.model import User
 from src.repository import auth as repository_users
 from src.services.auth import auth_service
-from src.conf.config import settings
+from src.services.load_shedding import ConcurrencyLimiter
+from src.services.storage import (
+    AvatarStorage,
+    avatar_file_response,
+    get_avatar_storage,
+    image_suffix,
+)
 from src.schemas import UserDb, UserAvatar
 
 router = APIRouter(prefix="/users", tags=["users"])
+avatar_limiter = ConcurrencyLimiter("avatar_upload", limit=4, queue=8, timeout=5.0)
 
 
 @router.get("/me/", response_model=UserDb)
@@ -29,11 +35,14 @@ async def read_users_me(
     return current_user
 
 
-@router.patch("/avatar", response_model=UserAvatar)
+@router.patch(
+    "/avatar", response_model=UserAvatar, dependencies=[Depends(avatar_limiter)]
+)
 async def update_avatar_user(
     file: UploadFile = File(),
     current_user: User = Depends(auth_service.get_current_user),
     db: Session = Depends(get_db),
+    storage: AvatarStorage = Depends(get_avatar_storage),
 ) -> User:
     """
     Update the current user's avatar.
@@ -44,22 +53,52 @@ async def update_avatar_user(
     :type current_user: User
     :param db: The database session.
     :type db: Session
+    :param storage: The storage where the avatar is kept.
+    :type storage: AvatarStorage
     :return: Updated current user's avatar.
     :rtype: User
     """
     print("in routes.users.update_avatar_user")
-    cloudinary.config(
-        cloud_name=settings.cloud_name,
-        api_key=settings.api_key,
-        api_secret=settings.api_secret,
-        secure=True,
-    )
-
-    r = cloudinary.uploader.upload(
-        file.file, public_id=f"ContactsApp/{current_user.email}", overwrite=True
-    )
-    src_url = cloudinary.CloudinaryImage(f"ContactsApp/{current_user.email}").build_url(
-        width=250, height=250, crop="fill", version=r.get("version")
-    )
+    if image_suffix(file) is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Avatar must be a PNG, JPEG, GIF or WebP image",
+        )
+    src_url = await storage.save(current_user, file)
     user = await repository_users.update_avatar(current_user.email, src_url, db)
     return user
+
+
+@router.get("/{user_id}/avatar")
+async def read_avatar(
+    user_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    storage: AvatarStorage = Depends(get_avatar_storage),
+) -> Response:
+    """
+    Serve the avatar of a user. Locally stored avatars are sent straight from disk
+    with caching and Range support, other ones are redirected to their URL.
+
+    :param user_id: The ID of the avatar owner.
+    :type user_id: int
+    :param request: The request object.
+    :type request: Request
+    :param db: The database session.
+    :type db: Session
+    :param storage: The storage where the avatar is kept.
+    :type storage: AvatarStorage
+    :return: The avatar file or a redirect to it.
+    :rtype: Response
+    """
+    print("in routes.users.read_avatar")
+    path = storage.get_path(user_id)
+    if path is not None:
+        return avatar_file_response(path, request)
+
+    user = await repository_users.get_user_by_id(user_id, db)
+    if user is None or not user.avatar or not user.avatar.startswith("http"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found"
+        )
+    return RedirectResponse(user.avatar)
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Dict, List
+
 from pydantic import BaseModel, Field, PastDate
 
 
@@ -31,14 +34,63 @@ class ContactResponse(ContactBase):
 
     Attributes:
         id (int): The ID of the contact.
+        phone_e164 (str | None): The phone number in the E.164 format, if it is valid.
     """
 
     id: int
+    phone_e164: str | None = None
 
     class Config:
         orm_mode = True
 
 
+class DuplicateGroup(BaseModel):
+    """
+    Schema representing a group of contacts which are likely duplicates.
+
+    Attributes:
+        score (float): The highest similarity score of a pair of contacts in the group.
+        contacts (List[ContactResponse]): The contacts of the group.
+    """
+
+    score: float
+    contacts: List[ContactResponse]
+
+
+class ContactStats(BaseModel):
+    """
+    Schema representing the statistics of the contacts of a user.
+
+    Attributes:
+        total (int): The number of contacts.
+        by_domain (Dict[str, int]): The number of contacts by email domain, the most common first.
+        birthdays_by_month (Dict[str, int]): The number of birthdays by month, from "01" to "12".
+        added_by_week (Dict[str, int]): The number of contacts added by ISO week, as "2024-W10".
+    """
+
+    total: int
+    by_domain: Dict[str, int]
+    birthdays_by_month: Dict[str, int]
+    added_by_week: Dict[str, int]
+
+
+class ContactChanges(BaseModel):
+    """
+    Schema representing the changes of contacts since the previous sync.
+
+    Attributes:
+        changed (List[ContactResponse]): The contacts created or updated since the cursor.
+        deleted (List[int]): The IDs of the contacts deleted since the cursor.
+        cursor (datetime | None): The cursor to send as ``since`` in the next sync.
+        full_sync (bool): Whether ``changed`` holds all contacts, which replace the ones of the client.
+    """
+
+    changed: List[ContactResponse]
+    deleted: List[int]
+    cursor: datetime | None
+    full_sync: bool
+
+
 class UserModel(BaseModel):
     """
     Schema representing the structure of a user model.
@@ -1,18 +1,23 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from fastapi import status, HTTPException
 
 from ..database.model import Contact
+from .birthdays import days_until_birthday
 
 
-def get_id_birthday_upcoming(dates_id_list: list[tuple[datetime, int]]) -> list[int]:
+def get_id_birthday_upcoming(
+    dates_id_list: list[tuple[datetime, int]], window: int = 7
+) -> list[int]:
     """
-    Retrieves IDs of contacts whose birthdays are upcoming within the next 7 days.
+    Retrieves IDs of contacts whose birthdays are upcoming within the next days.
 
     :param dates_id_list: A list of tuples where each tuple contains a datetime object representing the contact's birthday and an integer representing the contact's ID.
     :type dates_id_list: List[tuple[datetime, int]]
+    :param window: The number of days to look ahead.
+    :type window: int
 
-    :return: A list of contact IDs whose birthdays are upcoming within the next 7 days.
+    :return: A list of contact IDs whose birthdays are upcoming within the next days.
     :rtype: List[int]
     """
 
@@ -21,25 +26,12 @@ def get_id_birthday_upcoming(dates_id_list: list[tuple[datetime, int]]) -> list[
     id_list = []
 
     today = datetime.now().date()
-    this_year = today.year
-    days = timedelta(days=7)
 
     for date_tuple in dates_id_list:
         born_date = date_tuple[0].date()
         contact_id = date_tuple[1]
-        born_day = born_date.day
-        born_month = born_date.month
 
-        closest_birthday = datetime(
-            year=this_year, month=born_month, day=born_day
-        ).date()
-
-        if closest_birthday < today:
-            closest_birthday = datetime(
-                year=this_year + 1, month=born_month, day=born_day
-            ).date()
-
-        if closest_birthday - today <= days:
+        if days_until_birthday(born_date, today) <= window:
             id_list.append(contact_id)
 
     return id_list
@@ -1,23 +1,38 @@
-from jose import JWTError, jwt
-from fastapi import HTTPException, status, Depends
+import secrets
+import uuid
+
+from fastapi import HTTPException, status, Depends, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from functools import cached_property
 from sqlalchemy.orm import Session
 
-from src.database.db import get_db
+from src.database.db import SessionLocal, get_db, get_engine
 from src.repository import auth as repository_users
 from src.conf.config import settings
-
-import redis
+from src.services.revocation import token_revocations
 
 
 class Auth:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    SECRET_KEY = settings.secret_key
-    ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0)
+
+    @cached_property
+    def pwd_context(self):
+        from passlib.context import CryptContext
+
+        # bcrypt_rounds is calibrated for the host with calibrate_bcrypt.py
+        return CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds
+        )
+
+    @property
+    def SECRET_KEY(self) -> str:
+        return settings.secret_key
+
+    @property
+    def ALGORITHM(self) -> str:
+        return settings.algorithm
 
     def verify_password(self, plain_password, hashed_password):
         print("We are in Auth.verify_password")
@@ -28,8 +43,47 @@ class Auth:
 
         return self.pwd_context.hash(password)
 
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Tells whether a password hash was made with another cost than the configured
+        ``bcrypt_rounds``.
+
+        :param hashed_password: The stored hash.
+        :type hashed_password: str
+        :return: True if the hash should be replaced.
+        :rtype: bool
+        """
+        return self.pwd_context.needs_update(hashed_password)
+
+    async def rehash_password(
+        self, user_id: int, hashed_password: str, password: str
+    ) -> None:
+        """
+        Replaces the hash of a user's password with one of the configured cost. Runs as a
+        background task after the login which verified the password, with its own
+        database session; the hash is kept if the password changed in the meantime.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param hashed_password: The stored hash the password was verified against.
+        :type hashed_password: str
+        :param password: The verified plain password.
+        :type password: str
+        """
+        print("We are in Auth.rehash_password")
+        new_hash = await run_in_threadpool(self.get_password_hash, password)
+        db = SessionLocal(bind=get_engine())
+        try:
+            await repository_users.update_password(
+                user_id, hashed_password, new_hash, db
+            )
+        finally:
+            db.close()
+
     def create_token(self, data: dict, token_type: str):
         print("We are in Auth.create_token")
+        from jose import jwt
+
         to_encode = data.copy()
 
         if token_type == "access_token":
@@ -39,13 +93,22 @@ class Auth:
         else:
             raise NameError("Given token_type is not available")
 
-        to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": token_type})
+        to_encode.update(
+            {
+                "iat": datetime.utcnow(),
+                "exp": expire,
+                "scope": token_type,
+                "jti": uuid.uuid4().hex,
+            }
+        )
 
         encoded_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_token
 
     async def decode_refresh_token(self, refresh_token: str):
         print("We are in Auth.decode_refresh_token")
+        from jose import JWTError, jwt
+
         try:
             payload = jwt.decode(
                 refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM]
@@ -67,6 +130,8 @@ class Auth:
         self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
     ):
         print("We are in Auth.get_current_user")
+        from jose import JWTError, jwt
+
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -84,13 +149,41 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
+        # tokens issued before revocation was introduced have no jti
+        jti = payload.get("jti")
+        if jti is not None and await token_revocations.is_revoked(jti):
+            raise credentials_exception
+
         user = await repository_users.get_user_by_email(email, db)
         if user is None:
             raise credentials_exception
         return user
 
+    async def revoke_token(self, token: str) -> None:
+        """
+        Revokes a token until it expires, so it is not accepted by ``get_current_user``
+        anymore.
+
+        :param token: The token.
+        :type token: str
+        """
+        print("We are in Auth.revoke_token")
+        from jose import JWTError, jwt
+
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+            )
+        if "jti" in payload:
+            await token_revocations.revoke(payload["jti"], payload["exp"])
+
     async def get_email_from_token(self, token: str):
         print("We are in Auth.get_email_from_token")
+        from jose import JWTError, jwt
+
         try:
             payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
             email = payload["sub"]
@@ -102,5 +195,22 @@ class Auth:
                 detail="Invalid token for email verification",
             )
 
+    async def require_admin(self, x_admin_token: str | None = Header(None)) -> None:
+        """
+        Dependency admitting only requests with the ``X-Admin-Token`` header set to the
+        configured admin token. Without a configured token nobody is admitted.
+
+        :param x_admin_token: The value of the ``X-Admin-Token`` header.
+        :type x_admin_token: str | None
+        """
+        print("We are in Auth.require_admin")
+        token = settings.admin_token
+        if not token or x_admin_token is None or not secrets.compare_digest(
+            x_admin_token.encode(), token.encode()
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required"
+            )
+
 
 auth_service = Auth()
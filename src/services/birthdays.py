@@ -0,0 +1,257 @@
+import asyncio
+import logging
+from calendar import isleap
+from contextlib import suppress
+from datetime import date, datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+from src.database.model import Contact
+
+
+# member marking that the set of a user was built, also when no birthday is upcoming
+BUILT_MARKER = "built"
+KEY_TTL = 2 * 24 * 3600
+LOCK_TTL = 3600
+
+# removes the contact from the set and adds it back with score ARGV[2], if given,
+# when the set was already built
+REFRESH_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+if ARGV[2] ~= '' and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+end
+return 0
+"""
+
+
+def birthday_key(user_id: int, day: date) -> str:
+    """
+    Returns the Redis key of the sorted set with the upcoming birthdays of a user,
+    computed on the given day.
+
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :param day: The day for which the set is computed.
+    :type day: date
+    :return: The Redis key.
+    :rtype: str
+    """
+    return f"birthdays:{day.isoformat()}:{user_id}"
+
+
+def days_until_birthday(born_date: date, today: date) -> int:
+    """
+    Returns the number of days from today to the next birthday.
+
+    :param born_date: The birth date.
+    :type born_date: date
+    :param today: The reference day.
+    :type today: date
+    :return: Days until the birthday, 0 if it is today. Birthdays on February 29 fall on
+        February 28 in non-leap years.
+    :rtype: int
+    """
+    closest_birthday = birthday_in_year(born_date, today.year)
+    if closest_birthday < today:
+        closest_birthday = birthday_in_year(born_date, today.year + 1)
+    return (closest_birthday - today).days
+
+
+def birthday_in_year(born_date: date, year: int) -> date:
+    if born_date.month == 2 and born_date.day == 29 and not isleap(year):
+        return date(year, 2, 28)
+    return born_date.replace(year=year)
+
+
+def days_until_birthdays(months, days, today: date | None = None):
+    """
+    Vectorized variant of ``days_until_birthday`` for many birth dates at once.
+    Birthdays on February 29 fall on February 28 in non-leap years.
+
+    :param months: Months of the birth dates (1-12).
+    :type months: array_like[int]
+    :param days: Days of month of the birth dates (1-31).
+    :type days: array_like[int]
+    :param today: The reference day, today if not given.
+    :type today: date | None
+    :return: Days until the next birthday for every birth date, 0 if it is today.
+    :rtype: numpy.ndarray[int64]
+    """
+    import numpy as np
+
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    today = today or date.today()
+    reference = np.datetime64(today, "D")
+
+    def birthdays_in_year(year: int):
+        first_days = np.datetime64(f"{year:04d}-01", "M") + (months - 1)
+        leap_day = (months == 2) & (days == 29)
+        day_of_month = np.where(leap_day & (not isleap(year)), 28, days)
+        return first_days.astype("datetime64[D]") + (day_of_month - 1)
+
+    until = (birthdays_in_year(today.year) - reference).astype(np.int64)
+    passed = until < 0
+    if passed.any():
+        next_year = birthdays_in_year(today.year + 1) - reference
+        until = np.where(passed, next_year.astype(np.int64), until)
+    return until
+
+
+def upcoming_birthdays(ids, months, days, window: int, today: date | None = None):
+    """
+    Selects the birth dates whose next birthday is within ``window`` days and orders
+    them from the closest one.
+
+    :param ids: IDs of the contacts.
+    :type ids: array_like[int]
+    :param months: Months of the birth dates (1-12).
+    :type months: array_like[int]
+    :param days: Days of month of the birth dates (1-31).
+    :type days: array_like[int]
+    :param window: The number of days to look ahead.
+    :type window: int
+    :param today: The reference day, today if not given.
+    :type today: date | None
+    :return: IDs of the selected contacts and days until their birthdays.
+    :rtype: tuple[numpy.ndarray, numpy.ndarray]
+    """
+    import numpy as np
+
+    ids = np.asarray(ids)
+    until = days_until_birthdays(months, days, today)
+    selected = np.flatnonzero(until <= window)
+    order = selected[np.argsort(until[selected], kind="stable")]
+    return ids[order], until[order]
+
+
+async def get_upcoming_ids(r, user_id: int) -> list[int] | None:
+    """
+    Reads the materialized upcoming birthdays of a user with one Redis command.
+
+    :param r: The Redis client.
+    :type r: redis.asyncio.Redis
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :return: IDs of the contacts ordered by the days until birthday, or None if the set
+        was not built today.
+    :rtype: list[int] | None
+    """
+    members = await r.zrange(birthday_key(user_id, date.today()), 0, -1)
+    if not members:
+        return None
+    return [int(member) for member in members if member != BUILT_MARKER]
+
+
+async def refresh_contact(
+    r, contact_id: int, user_id: int, born_date: datetime | None
+) -> None:
+    """
+    Updates today's materialized set of a user after a contact was created, changed or
+    removed. Sets which were not built are left for the daily job.
+
+    :param r: The Redis client.
+    :type r: redis.asyncio.Redis
+    :param contact_id: The ID of the contact.
+    :type contact_id: int
+    :param user_id: The ID of the contact owner.
+    :type user_id: int
+    :param born_date: The new birth date, or None if the contact was removed.
+    :type born_date: datetime | None
+    """
+    today = date.today()
+    score = ""
+    if born_date is not None:
+        days = days_until_birthday(born_date.date(), today)
+        if days <= settings.birthday_window_days:
+            score = days
+    await r.eval(REFRESH_SCRIPT, 1, birthday_key(user_id, today), contact_id, score)
+
+
+def load_birth_dates(db) -> list[tuple[int, int, datetime]]:
+    return (
+        db.query(Contact.user_id, Contact.id, Contact.born_date)
+        .filter(Contact.born_date.isnot(None))
+        .order_by(Contact.user_id)
+        .all()
+    )
+
+
+async def rebuild_all(db, r, today: date) -> int:
+    """
+    Computes the upcoming birthdays of every user and replaces their sets for the day.
+
+    :param db: The database session.
+    :type db: Session
+    :param r: The Redis client.
+    :type r: redis.asyncio.Redis
+    :param today: The day for which the sets are computed.
+    :type today: date
+    :return: The number of users whose sets were written.
+    :rtype: int
+    """
+    import numpy as np
+
+    rows = await run_in_threadpool(load_birth_dates, db)
+    count = len(rows)
+    user_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    contact_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=count)
+    months = np.fromiter((row[2].month for row in rows), dtype=np.int64, count=count)
+    days = np.fromiter((row[2].day for row in rows), dtype=np.int64, count=count)
+    until = days_until_birthdays(months, days, today)
+    upcoming = until <= settings.birthday_window_days
+
+    users = 0
+    async with r.pipeline(transaction=False) as pipe:
+        # rows are ordered by user, so each user is one slice of the arrays
+        starts = np.flatnonzero(np.diff(user_ids, prepend=-1))
+        for start, end in zip(starts, np.append(starts[1:], count)):
+            mapping = {BUILT_MARKER: -1}
+            selected = np.flatnonzero(upcoming[start:end]) + start
+            mapping.update(
+                zip(contact_ids[selected].tolist(), until[selected].tolist())
+            )
+            key = birthday_key(int(user_ids[start]), today)
+            tmp_key = f"{key}:tmp"
+            pipe.delete(tmp_key)
+            pipe.zadd(tmp_key, mapping)
+            pipe.expire(tmp_key, KEY_TTL)
+            pipe.rename(tmp_key, key)
+            users += 1
+            if users % 500 == 0:
+                await pipe.execute()
+        await pipe.execute()
+    return users
+
+
+async def run_daily_rebuild(session_factory, r) -> None:
+    """
+    Background job rebuilding the materialized birthdays once a day, shortly after
+    midnight. A Redis lock makes only one worker do it.
+
+    :param session_factory: Callable returning a new database session.
+    :type session_factory: Callable[[], Session]
+    :param r: The Redis client.
+    :type r: redis.asyncio.Redis
+    """
+    while True:
+        today = date.today()
+        lock_key = f"birthdays:lock:{today}"
+        try:
+            if await r.set(lock_key, 1, nx=True, ex=LOCK_TTL):
+                db = session_factory()
+                try:
+                    users = await rebuild_all(db, r, today)
+                finally:
+                    db.close()
+                logging.info(f"Upcoming birthdays rebuilt for {users} users")
+        except Exception as err:
+            logging.error(f"Upcoming birthdays rebuild failed: {err}")
+            with suppress(Exception):
+                await r.delete(lock_key)
+            await asyncio.sleep(60)
+            continue
+        tomorrow = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        await asyncio.sleep((tomorrow - datetime.now()).total_seconds() + 1)
@@ -0,0 +1,244 @@
+import gzip
+import importlib.util
+import zlib
+from functools import lru_cache
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.conf.config import settings
+
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+# the preferred encoding first, when the client accepts several with the same quality
+ENCODINGS = ("zstd", "br", "gzip")
+MODULES = {"zstd": "zstandard", "br": "brotli"}
+# already compressed, or events which must reach the client as soon as they are sent
+SKIPPED_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "text/event-stream",
+)
+
+
+@lru_cache
+def is_available(encoding: str) -> bool:
+    module = MODULES.get(encoding)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Chooses the content coding of a response from the ``Accept-Encoding`` header: the
+    installed coding with the highest quality, zstd before brotli before gzip on a tie.
+
+    :param accept_encoding: The value of the ``Accept-Encoding`` header.
+    :type accept_encoding: str
+    :return: ``zstd``, ``br``, ``gzip``, or None to send the body as it is.
+    :rtype: str | None
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality and is_available(encoding):
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compresses a whole body.
+    """
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "br":
+        import brotli
+
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """
+    Compresses a body sent in chunks; every chunk is flushed so the client can decode
+    it before the response ends.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "zstd":
+            import zstandard
+
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self.flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        elif encoding == "br":
+            import brotli
+
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # gzip container, as zlib writes it with 16 added to the window bits
+            self.compressor = zlib.compressobj(
+                GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def chunk(self, data: bytes) -> bytes:
+        compressor = self.compressor
+        if self.encoding == "zstd":
+            return compressor.compress(data) + compressor.flush(self.flush_mode)
+        if self.encoding == "br":
+            return compressor.process(data) + compressor.flush()
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def weaken_etag(headers: MutableHeaders) -> None:
+    # the compressed body is not byte-identical to the one the strong tag names
+    etag = headers.get("etag")
+    if etag is not None and not etag.startswith("W/"):
+        headers["ETag"] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with zstd, brotli or gzip, as accepted by the
+    client. Bodies sent at once are compressed when they have at least
+    ``compression_minimum_size`` bytes, in the threadpool from
+    ``compression_threadpool_size`` bytes; streamed bodies are compressed chunk by
+    chunk. Images, archives, event streams, partial content, responses which already
+    have a ``Content-Encoding`` and bodies sent by other messages than
+    ``http.response.body``, like the ``http.response.pathsend`` of file responses, are
+    sent as they are. A strong ``ETag`` of a compressed response is made weak.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.configured = False
+        self.minimum_size = 0
+        self.threadpool_size = 0
+
+    def configure(self) -> None:
+        # settings are read on the first request, not when the application is built
+        self.minimum_size = settings.compression_minimum_size
+        self.threadpool_size = settings.compression_threadpool_size
+        self.configured = True
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self.configured:
+            self.configure()
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                encoding = choose_encoding(value.decode("latin-1"))
+                break
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(self, encoding, send)(scope, receive)
+
+
+class CompressionResponder:
+    """
+    The ``send`` of one compressed response. The start message is held back until the
+    first body message shows whether the body is sent at once, streamed, or by another
+    message type which is not compressed.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.skip = False
+        self.stream: StreamCompressor | None = None
+
+    async def __call__(self, scope, receive) -> None:
+        await self.middleware.app(scope, receive, self.send_compressed)
+
+    async def send_start(self, message) -> None:
+        self.start_message = None
+        await self.send(message)
+
+    async def send_compressed(self, message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            content_type = headers.get("content-type", "")
+            self.skip = (
+                message["status"] == 206
+                or "content-encoding" in headers
+                or content_type.startswith(SKIPPED_TYPES)
+            )
+            if self.skip:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+        if self.skip:
+            await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            if self.start_message is not None:
+                # e.g. a file sent by the server itself, the body is not seen here
+                self.skip = True
+                await self.send_start(self.start_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.stream is not None:
+            data = self.stream.chunk(body) if body else b""
+            if not more_body:
+                data += self.stream.finish()
+            await self.send({**message, "body": data})
+            return
+
+        headers = MutableHeaders(raw=list(self.start_message.get("headers", [])))
+        headers.add_vary_header("Accept-Encoding")
+        if not more_body:
+            if len(body) < self.middleware.minimum_size:
+                await self.send_start({**self.start_message, "headers": headers.raw})
+                await self.send(message)
+                return
+            if len(body) >= self.middleware.threadpool_size:
+                body = await run_in_threadpool(compress, body, self.encoding)
+            else:
+                body = compress(body, self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+            weaken_etag(headers)
+            await self.send_start({**self.start_message, "headers": headers.raw})
+            await self.send({**message, "body": body})
+            return
+
+        self.stream = StreamCompressor(self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        del headers["Content-Length"]
+        weaken_etag(headers)
+        await self.send_start({**self.start_message, "headers": headers.raw})
+        await self.send({**message, "body": self.stream.chunk(body) if body else b""})
@@ -0,0 +1,279 @@
+import logging
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from src.database.model import Contact
+
+
+# blocks larger than this are too unspecific to compare all their pairs, they are split
+# by the secondary keys first
+MAX_BLOCK_SIZE = 100
+DUPLICATE_THRESHOLD = 0.5
+
+EMAIL_WEIGHT = 0.35
+PHONE_WEIGHT = 0.35
+NAME_WEIGHT = 0.3
+BORN_DATE_WEIGHT = 0.2
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+NOT_LETTERS = re.compile(r"[^a-z]")
+NOT_DIGITS = re.compile(r"\D")
+
+
+def normalize_email(email: str) -> str:
+    """
+    Lowercases the email and drops the ``+tag`` of the local part, and the dots of
+    the local part for Gmail addresses.
+
+    :param email: The email address.
+    :type email: str
+    :return: The normalized email address.
+    :rtype: str
+    """
+    local, _, domain = email.strip().lower().partition("@")
+    local = local.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Keeps the last 9 digits of the phone number, ignoring formatting and country codes.
+
+    :param phone: The phone number.
+    :type phone: str
+    :return: The normalized phone number, empty if it has fewer than 7 digits.
+    :rtype: str
+    """
+    digits = NOT_DIGITS.sub("", phone)
+    return digits[-9:] if len(digits) >= 7 else ""
+
+
+def soundex(name: str) -> str:
+    """
+    Returns the Soundex phonetic key of a name.
+
+    :param name: The name.
+    :type name: str
+    :return: The 4 character Soundex key, empty for a name without letters.
+    :rtype: str
+    """
+    letters = NOT_LETTERS.sub("", name.lower())
+    if not letters:
+        return ""
+    key = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for letter in letters[1:]:
+        code = SOUNDEX_CODES.get(letter, "")
+        if code and code != previous:
+            key += code
+        if letter not in "hw":
+            previous = code
+    return (key + "000")[:4]
+
+
+class ContactKeys:
+    """
+    Normalized values of a contact, computed once and reused for every pair the contact
+    is scored in.
+    """
+
+    __slots__ = (
+        "email",
+        "phone",
+        "born_date",
+        "name",
+        "swapped_name",
+        "soundex",
+        "initials",
+    )
+
+    def __init__(self, contact: Contact):
+        self.email = normalize_email(contact.email)
+        self.phone = normalize_phone(contact.phone)
+        self.born_date = contact.born_date
+        first, last = contact.first_name.lower(), contact.last_name.lower()
+        self.name = f"{first} {last}"
+        self.swapped_name = f"{last} {first}"
+        self.soundex = (soundex(first), soundex(last))
+        # in any order, so swapped first and last names stay in one part of a block
+        self.initials = ":".join(sorted((first[:2], last[:2])))
+
+
+def birth_year(keys: ContactKeys) -> str:
+    return str(keys.born_date.year) if keys.born_date is not None else ""
+
+
+# applied in turn to the blocks larger than MAX_BLOCK_SIZE: the first two letters of
+# the names, which typos rarely change, then the birth year
+SECONDARY_KEYS = [lambda keys: keys.initials, birth_year]
+
+
+def blocking_keys(keys: ContactKeys) -> set[str]:
+    """
+    Returns the keys of the blocks a contact belongs to. Only contacts sharing a block
+    are compared with each other.
+
+    :param keys: The normalized values of the contact.
+    :type keys: ContactKeys
+    :return: Normalized email, normalized phone and phonetic name keys.
+    :rtype: set[str]
+    """
+    blocks = {f"email:{keys.email}"}
+    if keys.phone:
+        blocks.add(f"phone:{keys.phone}")
+    first, last = keys.soundex
+    if first and last:
+        # both orders, so swapped first and last names meet in one block
+        blocks.add(f"name:{last}:{first}")
+        blocks.add(f"name:{first}:{last}")
+    return blocks
+
+
+def split_block(
+    key: str, members: list[int], keys: list[ContactKeys], depth: int = 0
+) -> list[tuple[str, list[int]]]:
+    """
+    Splits a block larger than ``MAX_BLOCK_SIZE`` by the secondary keys in turn, until
+    its parts are small enough to compare all their pairs.
+
+    :param key: The blocking key of the block.
+    :type key: str
+    :param members: The indexes of the contacts in the block.
+    :type members: list[int]
+    :param keys: The normalized values of all contacts.
+    :type keys: list[ContactKeys]
+    :param depth: The number of secondary keys already applied.
+    :type depth: int
+    :return: The keys and members of the parts, the ones larger than
+        ``MAX_BLOCK_SIZE`` once all secondary keys are applied included.
+    :rtype: list[tuple[str, list[int]]]
+    """
+    if len(members) <= MAX_BLOCK_SIZE or depth == len(SECONDARY_KEYS):
+        return [(key, members)]
+    parts = defaultdict(list)
+    for index in members:
+        parts[SECONDARY_KEYS[depth](keys[index])].append(index)
+    return [
+        split
+        for value, part in parts.items()
+        for split in split_block(f"{key}|{value}", part, keys, depth + 1)
+    ]
+
+
+def name_similarity(a: ContactKeys, b: ContactKeys, needed: float) -> float:
+    """
+    Returns the similarity of the full names, also with first and last name of the
+    second contact swapped, or 0 when it is certainly lower than ``needed``.
+    """
+    best = 0.0
+    for name_b in (b.name, b.swapped_name):
+        matcher = SequenceMatcher(None, a.name, name_b)
+        # cheap upper bounds first, the exact ratio is by far the slowest part
+        if matcher.real_quick_ratio() < needed or matcher.quick_ratio() < needed:
+            continue
+        best = max(best, matcher.ratio())
+    return best
+
+
+def score_pair(a: ContactKeys, b: ContactKeys) -> float:
+    """
+    Scores how likely two contacts describe the same person.
+
+    :param a: The normalized values of the first contact.
+    :type a: ContactKeys
+    :param b: The normalized values of the second contact.
+    :type b: ContactKeys
+    :return: The score, duplicates score at least ``DUPLICATE_THRESHOLD``.
+    :rtype: float
+    """
+    score = 0.0
+    if a.email == b.email:
+        score += EMAIL_WEIGHT
+    if a.phone and a.phone == b.phone:
+        score += PHONE_WEIGHT
+    if a.born_date is not None and a.born_date == b.born_date:
+        score += BORN_DATE_WEIGHT
+    needed = (DUPLICATE_THRESHOLD - score) / NAME_WEIGHT
+    if needed > 1:
+        return score
+    return score + NAME_WEIGHT * name_similarity(a, b, needed)
+
+
+def find_duplicates(contacts: list[Contact]) -> list[tuple[float, list[Contact]]]:
+    """
+    Groups contacts which are likely duplicates of each other. Contacts are put into
+    blocks by their blocking keys and pairs are scored only within a block, so the work
+    grows with the size of the blocks instead of the square of the number of contacts.
+    Blocks larger than ``MAX_BLOCK_SIZE`` are split by the secondary keys; the parts
+    still too large are not compared and logged.
+
+    :param contacts: The contacts of one user.
+    :type contacts: list[Contact]
+    :return: Groups of duplicates with the highest score of a pair in the group,
+        the most certain groups first.
+    :rtype: list[tuple[float, list[Contact]]]
+    """
+    keys = [ContactKeys(contact) for contact in contacts]
+    blocks = defaultdict(list)
+    for index, contact_keys in enumerate(keys):
+        for key in blocking_keys(contact_keys):
+            blocks[key].append(index)
+
+    parent = list(range(len(contacts)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    compared = set()
+    best_score = {}
+    skipped = []
+    for key, block in blocks.items():
+        for _, members in split_block(key, block, keys):
+            if len(members) > MAX_BLOCK_SIZE:
+                skipped.append(len(members))
+                continue
+            for a, b in combinations(members, 2):
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                score = score_pair(keys[a], keys[b])
+                if score >= DUPLICATE_THRESHOLD:
+                    root_a, root_b = find(a), find(b)
+                    parent[root_b] = root_a
+                    best_score[a] = max(best_score.get(a, 0.0), score)
+                    best_score[b] = max(best_score.get(b, 0.0), score)
+
+    if skipped:
+        logging.warning(
+            f"Duplicates: {len(skipped)} blocks still larger than {MAX_BLOCK_SIZE} "
+            f"contacts once split were not compared, the largest has {max(skipped)}"
+        )
+
+    groups = defaultdict(list)
+    for index in best_score:
+        groups[find(index)].append(index)
+
+    result = [
+        (
+            round(max(best_score[index] for index in members), 3),
+            [contacts[index] for index in sorted(members)],
+        )
+        for members in groups.values()
+    ]
+    result.sort(key=lambda group: group[0], reverse=True)
+    return result
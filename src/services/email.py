@@ -1,29 +1,34 @@
+from functools import lru_cache
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
-
 from src.services.auth import auth_service
 from src.conf.config import settings
 
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=settings.mail_username,
-    MAIL_PASSWORD=settings.mail_password,
-    MAIL_FROM=settings.mail_from,
-    MAIL_PORT=settings.mail_port,
-    MAIL_SERVER=settings.mail_server,
-    MAIL_FROM_NAME="Your contacts application",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
-    TEMPLATE_FOLDER=Path(__file__).parent / "templates",
-)
+@lru_cache
+def get_mail_config():
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=settings.mail_username,
+        MAIL_PASSWORD=settings.mail_password,
+        MAIL_FROM=settings.mail_from,
+        MAIL_PORT=settings.mail_port,
+        MAIL_SERVER=settings.mail_server,
+        MAIL_FROM_NAME="Your contacts application",
+        MAIL_STARTTLS=False,
+        MAIL_SSL_TLS=True,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True,
+        TEMPLATE_FOLDER=Path(__file__).parent / "templates",
+    )
 
 
 async def send_email(email: str, username: str, host: str):
     print("in services.email.send_email")
+    from fastapi_mail import FastMail, MessageSchema, MessageType
+    from fastapi_mail.errors import ConnectionErrors
+
     try:
         print("email_toked is creating...")
         token_verification = auth_service.create_token(
@@ -46,7 +51,7 @@ async def send_email(email: str, username: str, host: str):
         with open("email.txt", "w") as fh:
             print(f"message = {message}\n", f"link = {link}", file=fh)
 
-        fm = FastMail(conf)
+        fm = FastMail(get_mail_config())
         await fm.send_message(message, template_name="email_template.html")
     except ConnectionErrors as err:
         print(err)
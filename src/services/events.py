@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager, suppress
+
+from fastapi.encoders import jsonable_encoder
+
+from src.database.model import Contact
+
+
+CHANNEL_PREFIX = "contacts:"
+QUEUE_SIZE = 100
+RECONNECT_DELAY = 5.0
+HEARTBEAT_INTERVAL = 15
+
+EVENT_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "email",
+    "phone",
+    "phone_e164",
+    "born_date",
+    "additional",
+)
+
+
+def contact_event(event_type: str, contact: Contact) -> dict:
+    """
+    Builds the event describing a change of a contact.
+
+    :param event_type: One of ``created``, ``updated`` or ``deleted``.
+    :type event_type: str
+    :param contact: The changed contact.
+    :type contact: Contact
+    :return: The event, a deleted contact is described by its ID only.
+    :rtype: dict
+    """
+    if event_type == "deleted":
+        return {"type": event_type, "contact": {"id": contact.id}}
+    data = {field: getattr(contact, field) for field in EVENT_FIELDS}
+    return {"type": event_type, "contact": jsonable_encoder(data)}
+
+
+def format_sse(event: dict) -> str:
+    """
+    Formats an event as a server-sent events message.
+
+    :param event: The event.
+    :type event: dict
+    :return: The message with the event type and the JSON data.
+    :rtype: str
+    """
+    return f"event: {event['type']}\ndata: {json.dumps(event['contact'])}\n\n"
+
+
+class ContactEventBroker:
+    """
+    Delivers contact events to the event streams open in this worker.
+
+    Events are published to the Redis channel of the user and every worker receives them
+    through one pattern subscription, whatever the number of streams it serves. Without
+    Redis the events are delivered to the streams of this worker only.
+    """
+
+    def __init__(self) -> None:
+        self.redis = None
+        self.queues: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, redis) -> None:
+        """
+        Starts listening to the contact channels of all users.
+
+        :param redis: The shared Redis client, or None to deliver events locally.
+        :type redis: redis.asyncio.Redis | None
+        """
+        self.redis = redis
+        if redis is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Stops the listener and forgets the Redis client.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._listener
+            self._listener = None
+        self.redis = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                async for message in pubsub.listen():
+                    user_id = int(message["channel"][len(CHANNEL_PREFIX) :])
+                    self.dispatch(user_id, json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                logging.error(f"Contact events subscription failed: {err}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                with suppress(Exception):
+                    await pubsub.aclose()
+
+    def dispatch(self, user_id: int, event: dict) -> None:
+        """
+        Puts an event into the queues of the streams of a user open in this worker.
+        A stream too slow to keep up loses its oldest events.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param event: The event.
+        :type event: dict
+        """
+        for queue in self.queues.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def publish(self, user_id: int, event: dict) -> None:
+        """
+        Publishes an event to the streams of a user in all workers.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :param event: The event.
+        :type event: dict
+        """
+        if self.redis is None:
+            self.dispatch(user_id, event)
+            return
+        try:
+            await self.redis.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+        except Exception as err:
+            logging.error(f"Contact event not published: {err}")
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        """
+        Opens a queue receiving the events of a user until the context is left.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: The queue of events.
+        :rtype: asyncio.Queue
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.queues[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self.queues[user_id].discard(queue)
+            if not self.queues[user_id]:
+                del self.queues[user_id]
+
+
+contact_events = ContactEventBroker()
+
+
+async def event_stream(user_id: int):
+    """
+    Yields the server-sent events messages of a user, with a comment every
+    ``HEARTBEAT_INTERVAL`` seconds keeping idle connections open through proxies.
+
+    :param user_id: The ID of the user.
+    :type user_id: int
+    :return: The messages.
+    :rtype: AsyncIterator[str]
+    """
+    async with contact_events.subscribe(user_id) as queue:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield format_sse(event)
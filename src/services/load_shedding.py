@@ -0,0 +1,119 @@
+import asyncio
+from collections import deque
+
+from fastapi import HTTPException, status
+
+from src.conf.config import settings
+
+
+class ConcurrencyLimiter:
+    """
+    Dependency letting at most ``limit`` requests of the routes sharing it run at the
+    same time in a worker. Up to ``queue`` more requests wait for a free slot, each for
+    ``timeout`` seconds at most, in arrival order; requests finding the queue full or
+    waiting longer are shed with 503 and ``Retry-After``. The slot is held until the
+    route returns.
+    """
+
+    limiters: list["ConcurrencyLimiter"] = []
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue: int = 0,
+        timeout: float = 1.0,
+        retry_after: int = 1,
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        ConcurrencyLimiter.limiters.append(self)
+
+    async def __call__(self):
+        if not settings.load_shedding_enabled:
+            yield
+            return
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self) -> None:
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self.waiters) >= self.queue:
+            self.reject()
+
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self.discard(waiter)
+            self.reject()
+        except asyncio.CancelledError:
+            # the client went away, a slot handed over in the meantime is passed on
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self.discard(waiter)
+            raise
+        # the releasing request handed its slot over, ``active`` stays the same
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def reject(self) -> None:
+        self.shed += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again later",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "queue": self.queue,
+            "active": self.active,
+            "waiting": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+        }
+
+
+def get_load_shedding_stats() -> list[dict]:
+    """
+    Returns the counters of all concurrency limiters of this worker.
+
+    :return: The limits, the requests running and waiting now, and the numbers of
+        admitted, queued and shed requests since the start.
+    :rtype: list[dict]
+    """
+    return [limiter.stats() for limiter in ConcurrencyLimiter.limiters]
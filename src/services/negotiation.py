@@ -0,0 +1,120 @@
+import importlib.util
+from contextvars import ContextVar
+from functools import lru_cache
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "*/*": JSON,
+    "application/*": JSON,
+}
+# binary formats are offered only when their encoder is installed
+MODULES = {MSGPACK: "msgpack", CBOR: "cbor2"}
+
+response_media_type: ContextVar[str] = ContextVar("response_media_type", default=JSON)
+
+
+@lru_cache
+def is_available(media_type: str) -> bool:
+    module = MODULES.get(media_type)
+    return module is None or importlib.util.find_spec(module) is not None
+
+
+def negotiate(accept: str | None) -> str:
+    """
+    Chooses the format of a response from the ``Accept`` header of the request: the
+    supported media type with the highest quality, the first of them on a tie, and JSON
+    when the header asks for no binary format.
+
+    :param accept: The value of the ``Accept`` header.
+    :type accept: str | None
+    :return: ``application/json``, ``application/msgpack`` or ``application/cbor``.
+    :rtype: str
+    """
+    if not accept or ("msgpack" not in accept and "cbor" not in accept):
+        return JSON
+    best, best_quality = JSON, 0.0
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        media_type = media_type.strip().lower()
+        media_type = ALIASES.get(media_type, media_type)
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if (
+            media_type in (JSON, MSGPACK, CBOR)
+            and quality > best_quality
+            and is_available(media_type)
+        ):
+            best, best_quality = media_type, quality
+    return best
+
+
+def encode(content, media_type: str) -> bytes:
+    """
+    Encodes JSON compatible content as MessagePack or CBOR.
+    """
+    if media_type == MSGPACK:
+        import msgpack
+
+        return msgpack.packb(content, use_bin_type=True)
+    import cbor2
+
+    return cbor2.dumps(content)
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSONResponse sent as MessagePack or CBOR when the route negotiated a binary format,
+    from the same content the response model produced for JSON.
+    """
+
+    def __init__(
+        self, content, status_code=200, headers=None, media_type=None, background=None
+    ) -> None:
+        super().__init__(
+            content,
+            status_code,
+            headers,
+            media_type or response_media_type.get(),
+            background,
+        )
+
+    def render(self, content) -> bytes:
+        if self.media_type == JSON:
+            return super().render(content)
+        return encode(content, self.media_type)
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route choosing the format of its ``NegotiatedResponse`` from the ``Accept`` header.
+    Responses carry ``Vary: Accept`` for caches.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request):
+            token = response_media_type.set(negotiate(request.headers.get("accept")))
+            try:
+                response = await handler(request)
+            finally:
+                response_media_type.reset(token)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_handler
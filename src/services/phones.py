@@ -0,0 +1,24 @@
+from src.conf.config import settings
+
+
+def to_e164(phone: str, region: str | None = None) -> str | None:
+    """
+    Normalizes a free-form phone number to the E.164 format, e.g. ``+48600100200``.
+    Numbers without a country code are read as numbers of ``region``.
+
+    :param phone: The phone number as entered by the user.
+    :type phone: str
+    :param region: Two letter code of the default region, ``settings.phone_region`` if not given.
+    :type region: str | None
+    :return: The number in the E.164 format, or None if it is not a possible phone number.
+    :rtype: str | None
+    """
+    import phonenumbers
+
+    try:
+        number = phonenumbers.parse(phone, region or settings.phone_region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_possible_number(number):
+        return None
+    return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
@@ -0,0 +1,161 @@
+import logging
+import random
+import re
+import secrets
+import time
+import uuid
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+
+from src.conf.config import settings
+
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+REQUEST_ID_HEADER = b"x-request-id"
+VALID_PROFILE_ID = re.compile(r"[0-9a-f]{32}")
+PROFILER_INTERVAL = 0.001
+
+
+def artifact_path(profile_id: str) -> Path | None:
+    """
+    Returns the stored profile of a request, a pyinstrument HTML report or cProfile
+    pstats file.
+
+    :param profile_id: The ID of the profile.
+    :type profile_id: str
+    :return: The path of the artifact, or None if there is none.
+    :rtype: Path | None
+    """
+    if not VALID_PROFILE_ID.fullmatch(profile_id):
+        return None
+    for suffix in (".html", ".pstats"):
+        path = Path(settings.profiling_dir) / f"{profile_id}{suffix}"
+        if path.is_file():
+            return path
+    return None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling single requests: those with the ``X-Profile`` header set
+    to the admin token, and a ``profiling_sample_rate`` fraction of all requests.
+
+    pyinstrument, when installed, samples the call stacks of the request only and the
+    report is stored as an HTML flame chart, otherwise cProfile stores pstats. The
+    artifact is named after a new random ID, returned in the ``X-Profile-ID`` response
+    header; the ``X-Request-ID`` of the client is only logged with it, so a request
+    cannot overwrite another profile. One request per worker is profiled at a time.
+    When profiling is not configured a request costs one attribute check.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.configured = False
+        self.token = b""
+        self.sample_rate = 0.0
+        self.busy = False
+
+    def configure(self) -> None:
+        # settings are read on the first request, not when the application is built
+        self.token = (settings.admin_token or "").encode()
+        self.sample_rate = settings.profiling_sample_rate
+        self.configured = True
+
+    def requested(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return secrets.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self.configured:
+            self.configure()
+        if (
+            scope["type"] != "http"
+            or not (self.token or self.sample_rate)
+            or self.busy
+            or not self.requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+
+        async def send_with_id(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self.busy = True
+        profiler = start_profiler()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            profiler.stop()
+            self.busy = False
+            await run_in_threadpool(save_profile, profiler, profile_id)
+            logging.info(
+                f"Profiled {scope['method']} {scope['path']} in {elapsed * 1000:.1f} ms"
+                f" as {profile_id}, request ID {request_id[:64]!r}"
+            )
+
+
+class CProfileProfiler:
+    """
+    Fallback when pyinstrument is not installed. cProfile traces every call, of the
+    other requests running at the same time too, and is much slower than sampling.
+    """
+
+    def __init__(self) -> None:
+        import cProfile
+
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def save(self, path: Path) -> Path:
+        path = path.with_suffix(".pstats")
+        self.profile.dump_stats(path)
+        return path
+
+
+class PyinstrumentProfiler:
+    def __init__(self, profiler_class) -> None:
+        self.profiler = profiler_class(interval=PROFILER_INTERVAL, async_mode="enabled")
+        self.profiler.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+
+    def save(self, path: Path) -> Path:
+        path = path.with_suffix(".html")
+        path.write_text(self.profiler.output_html())
+        return path
+
+
+def start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return CProfileProfiler()
+    return PyinstrumentProfiler(Profiler)
+
+
+def save_profile(profiler, profile_id: str) -> Path | None:
+    directory = Path(settings.profiling_dir)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        return profiler.save(directory / profile_id)
+    except OSError as err:
+        logging.error(f"Profile {profile_id} not saved: {err}")
+        return None
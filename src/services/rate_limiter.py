@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import math
+from time import monotonic
+
+from fastapi import Depends, HTTPException, Request, status
+
+from src.conf.config import settings
+from src.database.model import User
+from src.services.auth import auth_service
+
+
+SYNC_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local result = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[3 * i - 2])
+    local rate = tonumber(ARGV[3 * i - 1])
+    local consumed = tonumber(ARGV[3 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    tokens = math.max(tokens - consumed, 0)
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    result[i] = tostring(tokens)
+end
+return result
+"""
+
+
+class TokenBucket:
+    """
+    Process-local token bucket. ``consumed`` counts the tokens taken since the
+    last synchronization with Redis, ``taken`` is when the last token was taken.
+    """
+
+    __slots__ = ("tokens", "updated", "consumed", "taken")
+
+    def __init__(self, capacity: float, now: float) -> None:
+        self.tokens = capacity
+        self.updated = now
+        self.consumed = 0
+        self.taken = now
+
+    def refill(self, capacity: float, rate: float, now: float) -> None:
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class TokenBucketLimiter:
+    """
+    Rate limiting dependency allowing ``times`` requests per ``seconds`` for each client.
+
+    Requests are admitted from token buckets kept in process memory, so checking the limit
+    never waits for Redis. Every ``sync_interval`` seconds the tokens consumed locally are
+    sent to Redis in one atomic Lua script call covering all buckets of all limiters, and
+    the local buckets are set to the global state returned by it. Between synchronizations
+    each worker may overshoot the limit by the tokens it has taken locally, so the global
+    limit is approximate. The buckets of clients idle for a whole refill period are
+    dropped every ``sync_interval`` seconds, whether Redis is configured or not.
+    """
+
+    redis = None
+    prefix = "rate_limit"
+    sync_interval = 1.0
+    limiters: list["TokenBucketLimiter"] = []
+    _last_sync = 0.0
+    _last_prune = 0.0
+    _sync_task: asyncio.Task | None = None
+    _script = None
+
+    def __init__(self, times: int, seconds: int) -> None:
+        self.capacity = float(times)
+        self.rate = times / seconds
+        self.buckets: dict[str, TokenBucket] = {}
+        TokenBucketLimiter.limiters.append(self)
+
+    @classmethod
+    def init(cls, redis, prefix: str = "rate_limit", sync_interval: float = 1.0):
+        """
+        Enables synchronization of the buckets through Redis.
+
+        :param redis: The asynchronous Redis client, or None to keep limits per process.
+        :type redis: redis.asyncio.Redis | None
+        :param prefix: Prefix of the Redis keys.
+        :type prefix: str
+        :param sync_interval: Seconds between synchronizations.
+        :type sync_interval: float
+        """
+        cls.redis = redis
+        cls.prefix = prefix
+        cls.sync_interval = sync_interval
+        cls._script = redis.register_script(SYNC_SCRIPT) if redis else None
+
+    async def identify(self, request: Request) -> str:
+        return request.client.host if request.client else "unknown"
+
+    async def __call__(self, request: Request) -> None:
+        await self.check(request, await self.identify(request))
+
+    async def check(self, request: Request, identifier: str) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        route = request.scope.get("route")
+        path = route.path if route is not None else request.url.path
+        key = f"{self.prefix}:{request.method}:{path}:{identifier}"
+
+        now = monotonic()
+        self.schedule_prune(now)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.capacity, now)
+        else:
+            bucket.refill(self.capacity, self.rate, now)
+
+        self.schedule_sync(now)
+
+        if bucket.tokens < 1:
+            retry_after = math.ceil((1 - bucket.tokens) / self.rate)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(retry_after)},
+            )
+        bucket.tokens -= 1
+        bucket.consumed += 1
+        bucket.taken = now
+
+    @staticmethod
+    def schedule_prune(now: float) -> None:
+        shared = TokenBucketLimiter
+        if now - shared._last_prune < shared.sync_interval:
+            return
+        shared._last_prune = now
+        shared.prune(now)
+
+    @classmethod
+    def prune(cls, now: float) -> None:
+        """
+        Drops the buckets of all limiters from which no token was taken for the time
+        they need to refill completely. Their state is the one of a new bucket, and
+        the tokens consumed before do not count in Redis anymore either, so the
+        buckets of clients which stopped sending requests do not stay in memory.
+        """
+        for limiter in cls.limiters:
+            idle_after = limiter.capacity / limiter.rate
+            for key, bucket in list(limiter.buckets.items()):
+                if now - bucket.taken >= idle_after:
+                    del limiter.buckets[key]
+
+    @staticmethod
+    def schedule_sync(now: float) -> None:
+        shared = TokenBucketLimiter
+        if shared.redis is None or now - shared._last_sync < shared.sync_interval:
+            return
+        if shared._sync_task is not None and not shared._sync_task.done():
+            return
+        shared._last_sync = now
+        shared._sync_task = asyncio.create_task(shared.sync())
+
+    @classmethod
+    async def sync(cls) -> None:
+        """
+        Sends the locally consumed tokens of all buckets to Redis and applies the global
+        state to the local buckets. Buckets which have refilled without taking tokens
+        are left out.
+        """
+        now = monotonic()
+        entries = []
+        for limiter in cls.limiters:
+            for key, bucket in list(limiter.buckets.items()):
+                bucket.refill(limiter.capacity, limiter.rate, now)
+                if bucket.consumed or bucket.tokens < limiter.capacity:
+                    entries.append((limiter, key, bucket, bucket.consumed))
+        if not entries:
+            return
+
+        args = []
+        for limiter, _, _, consumed in entries:
+            args.extend((limiter.capacity, limiter.rate, consumed))
+        try:
+            result = await cls._script(keys=[key for _, key, _, _ in entries], args=args)
+        except Exception as err:
+            logging.error(f"Rate limiter sync failed: {err}")
+            return
+
+        now = monotonic()
+        for (limiter, _, bucket, consumed), tokens in zip(entries, result):
+            bucket.consumed -= consumed
+            bucket.tokens = float(tokens) - bucket.consumed
+            bucket.updated = now
+
+
+class UserTokenBucketLimiter(TokenBucketLimiter):
+    """
+    TokenBucketLimiter keeping separate buckets for every authenticated user.
+    """
+
+    async def __call__(
+        self,
+        request: Request,
+        current_user: User = Depends(auth_service.get_current_user),
+    ) -> None:
+        await self.check(request, f"user:{current_user.id}")
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from contextlib import suppress
+
+
+KEY_PREFIX = "revoked:"
+INDEX_KEY = "revoked_tokens"
+SYNC_INTERVAL = 5.0
+FALSE_POSITIVE_RATE = 0.01
+MIN_CAPACITY = 10_000
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership with false positives at about ``error_rate``
+    while it holds at most ``capacity`` items, and never with false negatives.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = FALSE_POSITIVE_RATE) -> None:
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.size = max(8, math.ceil(bits))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        # double hashing, the k positions are derived from two 64-bit hashes
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(item)
+        )
+
+
+class TokenRevocations:
+    """
+    Revoked tokens, identified by their ``jti`` claim.
+
+    A revoked token is stored in Redis as a key expiring with the token, and indexed by
+    its expiry in a sorted set from which every worker rebuilds an in-process Bloom
+    filter every ``SYNC_INTERVAL`` seconds. A token which is not in the filter, the
+    common case, is known not to be revoked without a Redis call; only filter hits are
+    checked in Redis. A token revoked in another worker is rejected here after the next
+    synchronization at the latest. Without Redis, or while it cannot be written, the
+    revocations are kept in this worker, and stored in Redis by a later sync.
+    """
+
+    def __init__(self) -> None:
+        self.redis = None
+        self.filter = BloomFilter(MIN_CAPACITY)
+        # jti -> expiry timestamp, the revocations of this worker not stored in Redis
+        self.local: dict[str, float] = {}
+        # revoked in this worker since the last sync, maybe not read back from Redis yet
+        self.pending: set[str] = set()
+        self._sync_task: asyncio.Task | None = None
+
+    async def start(self, redis) -> None:
+        """
+        Loads the revoked tokens and keeps synchronizing them with Redis.
+
+        :param redis: The shared Redis client, or None to keep revocations locally.
+        :type redis: redis.asyncio.Redis | None
+        """
+        self.redis = redis
+        if redis is not None:
+            await self.sync()
+            self._sync_task = asyncio.create_task(self._sync_periodically())
+
+    async def stop(self) -> None:
+        """
+        Stops the synchronization and forgets the Redis client.
+        """
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sync_task
+            self._sync_task = None
+        self.redis = None
+
+    async def _sync_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            await self.sync()
+
+    async def sync(self) -> None:
+        """
+        Stores the revocations kept locally while Redis was failing, rebuilds the filter
+        from the tokens revoked in all workers which have not expired yet, and drops the
+        expired ones from the index.
+        """
+        if self.local:
+            try:
+                await self.store(self.local)
+                self.local = {}
+            except Exception as err:
+                logging.error(f"Storing token revocations failed: {err}")
+        now = time.time()
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zremrangebyscore(INDEX_KEY, "-inf", now)
+                pipe.zrangebyscore(INDEX_KEY, now, "+inf")
+                _, revoked = await pipe.execute()
+        except Exception as err:
+            logging.error(f"Token revocations sync failed: {err}")
+            return
+        revoked_filter = BloomFilter(max(MIN_CAPACITY, 2 * len(revoked)))
+        for jti in revoked:
+            revoked_filter.add(jti)
+        for jti in self.pending:
+            revoked_filter.add(jti)
+        for jti in self.local:
+            revoked_filter.add(jti)
+        self.pending.clear()
+        self.filter = revoked_filter
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        """
+        Revokes a token until it expires.
+
+        :param jti: The ID of the token.
+        :type jti: str
+        :param expires_at: The expiry of the token as a Unix timestamp.
+        :type expires_at: float
+        """
+        ttl = math.ceil(expires_at - time.time())
+        if ttl <= 0:
+            return
+        self.filter.add(jti)
+        if self.redis is None:
+            self.keep_locally(jti, expires_at)
+            return
+        self.pending.add(jti)
+        try:
+            await self.store({jti: expires_at})
+        except Exception as err:
+            # rejected by this worker now, by the others once a sync stores it
+            logging.error(f"Storing a token revocation failed: {err}")
+            self.keep_locally(jti, expires_at)
+
+    def keep_locally(self, jti: str, expires_at: float) -> None:
+        now = time.time()
+        self.local = {t: e for t, e in self.local.items() if e > now}
+        self.local[jti] = expires_at
+
+    async def store(self, revocations: dict[str, float]) -> None:
+        now = time.time()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for jti, expires_at in revocations.items():
+                ttl = math.ceil(expires_at - now)
+                if ttl > 0:
+                    pipe.set(f"{KEY_PREFIX}{jti}", 1, ex=ttl)
+                    pipe.zadd(INDEX_KEY, {jti: expires_at})
+            await pipe.execute()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """
+        Tells whether a token was revoked.
+
+        :param jti: The ID of the token.
+        :type jti: str
+        :return: True if the token was revoked.
+        :rtype: bool
+        """
+        if jti not in self.filter:
+            return False
+        expires_at = self.local.get(jti)
+        if expires_at is not None and expires_at > time.time():
+            return True
+        if self.redis is None:
+            return False
+        try:
+            return bool(await self.redis.exists(f"{KEY_PREFIX}{jti}"))
+        except Exception as err:
+            # a filter hit is most likely a revoked token, rejecting it is the safe side
+            logging.error(f"Token revocation check failed: {err}")
+            return True
+
+
+token_revocations = TokenRevocations()
@@ -0,0 +1,277 @@
+import os
+import re
+import shutil
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from src.conf.config import settings
+from src.database.model import User
+
+
+AVATAR_CACHE_CONTROL = "public, max-age=86400"
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+# accepted avatar formats by their leading bytes; the file suffix the client sends is
+# never used, so an HTML or SVG upload cannot be served back as a page of this origin
+IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+IMAGE_SUFFIXES = (".png", ".jpg", ".gif", ".webp")
+
+
+def image_suffix(file: UploadFile) -> str | None:
+    """
+    Recognizes a PNG, JPEG, GIF or WebP image by its first bytes.
+
+    :param file: The uploaded file, read from the start afterwards again.
+    :type file: UploadFile
+    :return: The file suffix of the image format, or None if it is not one of them.
+    :rtype: str | None
+    """
+    head = file.file.read(12)
+    file.file.seek(0)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for signature, suffix in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return suffix
+    return None
+
+
+class AvatarStorage(ABC):
+    """
+    Interface of the place where user avatars are kept.
+    """
+
+    @abstractmethod
+    async def save(self, user: User, file: UploadFile) -> str:
+        """
+        Stores the uploaded avatar of a user.
+
+        :param user: The owner of the avatar.
+        :type user: User
+        :param file: The uploaded image.
+        :type file: UploadFile
+        :return: The URL under which the avatar is available.
+        :rtype: str
+        """
+
+    def get_path(self, user_id: int) -> Path | None:
+        """
+        Returns the local file of the avatar, if the storage keeps one.
+
+        :param user_id: The ID of the avatar owner.
+        :type user_id: int
+        :return: Path to the avatar file, or None if it is not stored locally.
+        :rtype: Path | None
+        """
+        return None
+
+
+class CloudinaryStorage(AvatarStorage):
+    """
+    Keeps avatars in Cloudinary and returns resized CDN URLs.
+    """
+
+    def __init__(self) -> None:
+        import cloudinary
+
+        cloudinary.config(
+            cloud_name=settings.cloud_name,
+            api_key=settings.api_key,
+            api_secret=settings.api_secret,
+            secure=True,
+        )
+
+    async def save(self, user: User, file: UploadFile) -> str:
+        import cloudinary
+        import cloudinary.uploader
+
+        public_id = f"ContactsApp/{user.email}"
+        r = await run_in_threadpool(
+            cloudinary.uploader.upload, file.file, public_id=public_id, overwrite=True
+        )
+        return cloudinary.CloudinaryImage(public_id).build_url(
+            width=250, height=250, crop="fill", version=r.get("version")
+        )
+
+
+class LocalStorage(AvatarStorage):
+    """
+    Keeps avatars as files in a local directory, one file per user.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, user_id: int, suffix: str, source) -> Path:
+        tmp_path = self.directory / f".{user_id}.{uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as fh:
+            shutil.copyfileobj(source, fh)
+        path = self.directory / f"{user_id}{suffix}"
+        os.replace(tmp_path, path)
+        # the avatar in another format is removed only once the new one is in place
+        for old_path in self.directory.glob(f"{user_id}.*"):
+            if old_path != path:
+                old_path.unlink(missing_ok=True)
+        return path
+
+    async def save(self, user: User, file: UploadFile) -> str:
+        suffix = image_suffix(file)
+        if suffix is None:
+            raise ValueError("The avatar is not a PNG, JPEG, GIF or WebP image")
+        path = await run_in_threadpool(self._write, user.id, suffix, file.file)
+        return f"/api/users/{user.id}/avatar?v={path.stat().st_mtime_ns}"
+
+    def get_path(self, user_id: int) -> Path | None:
+        for suffix in IMAGE_SUFFIXES:
+            path = self.directory / f"{user_id}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+
+@lru_cache
+def get_avatar_storage() -> AvatarStorage:
+    """
+    Returns the avatar storage chosen by the ``avatar_storage`` setting.
+
+    :return: The configured avatar storage.
+    :rtype: AvatarStorage
+    """
+    if settings.avatar_storage == "local":
+        return LocalStorage(settings.avatar_dir)
+    return CloudinaryStorage()
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parses a single ``bytes=`` range of the Range header.
+
+    :param header: The value of the Range header.
+    :type header: str
+    :param size: The size of the file in bytes.
+    :type size: int
+    :return: Inclusive (start, end) offsets, or None if the range cannot be satisfied.
+    :rtype: tuple[int, int] | None
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if start == "":
+        if end == "" or int(end) == 0:
+            return None
+        return max(size - int(end), 0), size - 1
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse sending only the ``start``-``end`` slice of the file with status 206.
+    Uses the ASGI zero-copy send extension when the server provides it.
+    """
+
+    def __init__(self, path: Path, start: int, end: int, **kwargs) -> None:
+        super().__init__(path, status_code=status.HTTP_206_PARTIAL_CONTENT, **kwargs)
+        self.start = start
+        self.end = end
+        size = self.stat_result.st_size
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        count = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send(
+                    {
+                        "type": "http.response.zerocopysend",
+                        "file": file.fileno(),
+                        "offset": self.start,
+                        "count": count,
+                        "more_body": False,
+                    }
+                )
+        else:
+            with open(self.path, "rb") as file:
+                file.seek(self.start)
+                while count > 0:
+                    chunk = await run_in_threadpool(
+                        file.read, min(self.chunk_size, count)
+                    )
+                    count -= len(chunk)
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": chunk,
+                            "more_body": count > 0 and bool(chunk),
+                        }
+                    )
+                    if not chunk:
+                        break
+
+
+def avatar_file_response(path: Path, request: Request) -> Response:
+    """
+    Builds the response serving a local avatar file, honoring conditional
+    (If-None-Match) and Range requests.
+
+    :param path: The avatar file.
+    :type path: Path
+    :param request: The request object.
+    :type request: Request
+    :return: Full (200), partial (206), not modified (304) or unsatisfiable range (416) response.
+    :rtype: Response
+    """
+    stat_result = path.stat()
+    headers = {
+        "cache-control": AVATAR_CACHE_CONTROL,
+        "accept-ranges": "bytes",
+        "x-content-type-options": "nosniff",
+    }
+    response = FileResponse(path, stat_result=stat_result, headers=headers)
+    etag = response.headers["etag"]
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"etag": etag, "cache-control": AVATAR_CACHE_CONTROL},
+        )
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is None or (if_range is not None and if_range != etag):
+        return response
+
+    byte_range = parse_range(range_header, stat_result.st_size)
+    if byte_range is None:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"content-range": f"bytes */{stat_result.st_size}"},
+        )
+    return RangeFileResponse(
+        path, *byte_range, stat_result=stat_result, headers=headers
+    )
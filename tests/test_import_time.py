@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules which must be imported on first use only, not when the application starts.
+LAZY_MODULES = [
+    "cloudinary", "fastapi_mail", "passlib", "bcrypt", "jose", "redis", "phonenumbers",
+    "msgpack", "cbor2", "brotli", "zstandard",
+]
+
+# Import time of the application's own modules (everything under ``main`` except FastAPI).
+IMPORT_TIME_BUDGET_MS = float(os.environ.get("IMPORT_TIME_BUDGET_MS", 600))
+
+SCRIPT = """
+import json, sys
+import main
+from src.conf.config import get_settings
+from src.database.db import get_engine
+print(json.dumps({
+    "modules": [name for name in sys.modules if name.split(".")[0] in %r],
+    "settings_built": get_settings.cache_info().currsize,
+    "engine_built": get_engine.cache_info().currsize,
+}))
+""" % (LAZY_MODULES,)
+
+
+def import_main() -> tuple[dict, dict[str, int]]:
+    # no settings in the environment: importing must not need them
+    env = {"PATH": os.environ.get("PATH", ""), "PYTHONPATH": str(ROOT)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    return json.loads(result.stdout.splitlines()[-1]), cumulative
+
+
+def test_import_main_is_lazy():
+    report, _ = import_main()
+
+    assert report["modules"] == []
+    assert report["settings_built"] == 0
+    assert report["engine_built"] == 0
+
+
+def test_import_main_time_budget():
+    _, cumulative = import_main()
+
+    own_ms = (cumulative["main"] - cumulative.get("fastapi", 0)) / 1000
+    assert own_ms <= IMPORT_TIME_BUDGET_MS, f"importing main took {own_ms:.0f} ms"
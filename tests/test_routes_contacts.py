@@ -1,10 +1,9 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 from datetime import datetime, timedelta
 
 import pytest
 
 from src.database.model import User, Contact
-from src.services.auth import auth_service
 
 
 @pytest.fixture()
@@ -45,140 +44,196 @@ def contact_updated(contact):
 
 def test_add_new_contact(client, token, contact):
 
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.post(
-            "/api/contacts",
-            json=contact,
-            headers={"Authorization": f"Bearer {token}"},
-        )
-        assert response.status_code == 201, response.text
-        data = response.json()
+    response = client.post(
+        "/api/contacts",
+        json=contact,
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201, response.text
+    data = response.json()
 
-        assert "id" in data
-        for key, value in contact.items():
-            assert data[key] == value
+    assert "id" in data
+    for key, value in contact.items():
+        assert data[key] == value
 
 
 def get_all_contats(client, token, list_len):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.get(
-            "/api/contacts",
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.get(
+        "/api/contacts",
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        data = response.json()
+    data = response.json()
 
-        assert response.status_code == 200
-        assert isinstance(data, list)
-        assert len(data) == list_len
+    assert response.status_code == 200
+    assert isinstance(data, list)
+    assert len(data) == list_len
 
 
 def test_get_all_contacts(client, token):
     get_all_contats(client, token, list_len=1)
 
 
+def test_get_all_contacts_msgpack(client, token):
+    import msgpack
+
+    headers = {"Authorization": f"Bearer {token}"}
+    json_response = client.get("/api/contacts/", headers=headers)
+    response = client.get(
+        "/api/contacts/", headers={**headers, "Accept": "application/msgpack"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"]
+    assert msgpack.unpackb(response.content) == json_response.json()
+
+
 def test_get_contacts_by_field_example(client, token):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.get(
-            "/api/contacts/byfield?field=id&value=1",
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.get(
+        "/api/contacts/byfield?field=id&value=1",
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        data = response.json()
+    data = response.json()
 
-        assert response.status_code == 200
-        assert isinstance(data, list)
-        assert len(data) == 1
+    assert response.status_code == 200
+    assert isinstance(data, list)
+    assert len(data) == 1
 
 
 def test_get_contacts_by_field_example_not_found(client, token):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.get(
-            "/api/contacts/byfield?field=id&value=2",
-            headers={"Authorization": f"Bearer {token}"},
-        )
-        assert response.status_code == 404
+    response = client.get(
+        "/api/contacts/byfield?field=id&value=2",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 404
 
 
 def test_get_contact(client, token, contact):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.get(
-            "/api/contacts/1",
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.get(
+        "/api/contacts/1",
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        data = response.json()
+    data = response.json()
 
-        assert response.status_code == 200
-        for key, value in contact.items():
-            assert data[key] == value
+    assert response.status_code == 200
+    for key, value in contact.items():
+        assert data[key] == value
 
 
 def test_get_contacts_with_birthday_upcoming(client, token):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.get(
-            "/api/contacts/birthday",
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.get(
+        "/api/contacts/birthday",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    data = response.json()
+
+    assert response.status_code == 200
+    assert isinstance(data, list)
+
+
+def test_get_contacts_by_phone_not_found(client, token):
+    response = client.get(
+        "/api/contacts/byphone?phone=600100200",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 404
+
+
+def test_get_duplicate_contacts(client, token):
+    response = client.get(
+        "/api/contacts/duplicates",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == []
+
 
-        data = response.json()
+def test_get_contact_stats(client, token):
+    response = client.get(
+        "/api/contacts/stats",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    data = response.json()
 
-        assert response.status_code == 200
-        assert isinstance(data, list)
+    assert response.status_code == 200
+    assert data["total"] == 1
+    assert data["by_domain"] == {"aa.com": 1}
+    assert data["birthdays_by_month"] == {"12": 1}
+    assert list(data["added_by_week"].values()) == [1]
 
 
 def test_update_contact(client, token, contact_updated):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.put(
-            "/api/contacts/1",
-            json=contact_updated,
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.put(
+        "/api/contacts/1",
+        json=contact_updated,
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        data = response.json()
-        for key, value in contact_updated.items():
-            assert data[key] == value
+    data = response.json()
+    for key, value in contact_updated.items():
+        assert data[key] == value
 
 
 def test_update_contact_not_found(client, token, contact_updated):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.put(
-            "/api/contacts/2",
-            json=contact_updated,
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.put(
+        "/api/contacts/2",
+        json=contact_updated,
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        assert response.status_code == 404
+    assert response.status_code == 404
 
 
 def test_delete_contact_not_found(client, token):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.delete(
-            "/api/contacts/2",
-            headers={"Authorization": f"Bearer {token}"},
-        )
+    response = client.delete(
+        "/api/contacts/2",
+        headers={"Authorization": f"Bearer {token}"},
+    )
 
-        assert response.status_code == 404
+    assert response.status_code == 404
 
 
 def test_delete_contact(client, token, contact_updated):
-    with patch.object(auth_service, "r") as redis_mock:
-        redis_mock.get.return_value = None
-        response = client.delete(
-            "/api/contacts/1",
-            headers={"Authorization": f"Bearer {token}"},
-        )
-
-        data = response.json()
-        for key, value in contact_updated.items():
-            assert data[key] == value
-        get_all_contats(client, token, list_len=0)
+    response = client.delete(
+        "/api/contacts/1",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    data = response.json()
+    for key, value in contact_updated.items():
+        assert data[key] == value
+    get_all_contats(client, token, list_len=0)
+
+
+def test_get_contact_changes(client, token):
+    response = client.get(
+        "/api/contacts/changes",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["changed"] == []
+    assert data["deleted"] == [1]
+    assert data["full_sync"] is True
+
+    response = client.get(
+        "/api/contacts/changes",
+        params={"since": data["cursor"]},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    data = response.json()
+
+    # the deletion is within the overlap window and is sent again
+    assert response.status_code == 200
+    assert data["changed"] == []
+    assert data["deleted"] == [1]
+    assert data["full_sync"] is False
@@ -0,0 +1,136 @@
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import event
+
+from main import app
+from src.database.model import User
+from src.services.storage import LocalStorage, get_avatar_storage
+
+
+AVATAR = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+@pytest.fixture()
+def token(client, user, session, monkeypatch: pytest.MonkeyPatch):
+    mock_send_email = MagicMock()
+    monkeypatch.setattr("src.routes.auth.send_email", mock_send_email)
+    client.post("/api/auth/signup", json=user)
+    current_user: User = (
+        session.query(User).filter(User.email == user.get("email")).first()
+    )
+    current_user.confirmed = True
+    session.commit()
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get("email"), "password": user.get("password")},
+    )
+    data = response.json()
+    return data["access_token"]
+
+
+@pytest.fixture(scope="module")
+def local_storage(tmp_path_factory):
+    storage = LocalStorage(tmp_path_factory.mktemp("avatars"))
+    app.dependency_overrides[get_avatar_storage] = lambda: storage
+    yield storage
+    del app.dependency_overrides[get_avatar_storage]
+
+
+def test_update_avatar_local(client, token, local_storage):
+    response = client.patch(
+        "/api/users/avatar",
+        files={"file": ("avatar.png", AVATAR, "image/png")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["avatar"].startswith("/api/users/1/avatar")
+    assert local_storage.get_path(1).read_bytes() == AVATAR
+
+
+def test_update_avatar_rejects_html(client, token, local_storage):
+    response = client.patch(
+        "/api/users/avatar",
+        files={"file": ("avatar.html", b"<script>alert(1)</script>", "image/png")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 415, response.text
+    assert local_storage.get_path(1).read_bytes() == AVATAR
+
+
+def test_read_avatar(client, local_storage):
+    response = client.get("/api/users/1/avatar")
+
+    assert response.status_code == 200
+    assert response.content == AVATAR
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["x-content-type-options"] == "nosniff"
+    assert "max-age" in response.headers["cache-control"]
+
+    response = client.get(
+        "/api/users/1/avatar", headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+
+def test_read_avatar_range(client, local_storage):
+    response = client.get("/api/users/1/avatar", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == AVATAR[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(AVATAR)}"
+
+    response = client.get("/api/users/1/avatar", headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.content == AVATAR[-5:]
+
+    response = client.get(
+        "/api/users/1/avatar", headers={"Range": f"bytes={len(AVATAR)}-"}
+    )
+    assert response.status_code == 416
+
+
+def test_update_avatar_other_format(client, token, local_storage):
+    jpeg = b"\xff\xd8\xff\xe0" + AVATAR
+    response = client.patch(
+        "/api/users/avatar",
+        files={"file": ("avatar.svg", jpeg, "image/svg+xml")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 200, response.text
+    assert local_storage.get_path(1).name == "1.jpg"
+    assert [p.name for p in local_storage.directory.glob("1.*")] == ["1.jpg"]
+    response = client.get("/api/users/1/avatar")
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_read_avatar_not_found(client, local_storage):
+    response = client.get("/api/users/2/avatar")
+    assert response.status_code == 404
+
+
+def test_signup_existing_email_single_insert(client, user, token, session):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/auth/signup", json=user)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code == 409
+    assert statements == ["INSERT"]
+
+
+def test_logout_revokes_token(client, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/users/me/", headers=headers).status_code == 200
+
+    response = client.post("/api/auth/logout", headers=headers)
+
+    assert response.status_code == 200
+    assert client.get("/api/users/me/", headers=headers).status_code == 401
@@ -0,0 +1,55 @@
+import unittest
+
+from datetime import date, datetime, timedelta
+
+from src.services.added_features import get_id_birthday_upcoming
+from src.services.birthdays import (
+    days_until_birthday,
+    days_until_birthdays,
+    upcoming_birthdays,
+)
+
+
+class TestBirthdays(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # every day of a leap year as birth dates
+        cls.born_dates = [date(2000, 1, 1) + timedelta(days=i) for i in range(366)]
+        cls.months = [born_date.month for born_date in cls.born_dates]
+        cls.days = [born_date.day for born_date in cls.born_dates]
+
+    def test_days_until_birthday_leap_day(self):
+        born_date = date(2000, 2, 29)
+        self.assertEqual(days_until_birthday(born_date, date(2023, 2, 27)), 1)
+        self.assertEqual(days_until_birthday(born_date, date(2023, 2, 28)), 0)
+        self.assertEqual(days_until_birthday(born_date, date(2023, 3, 1)), 365)
+        self.assertEqual(days_until_birthday(born_date, date(2024, 2, 28)), 1)
+
+    def test_vectorized_matches_scalar(self):
+        for today in [
+            date(2023, 1, 1),
+            date(2023, 2, 28),
+            date(2023, 12, 30),
+            date(2024, 2, 29),
+            date(2024, 3, 1),
+        ]:
+            expected = [days_until_birthday(d, today) for d in self.born_dates]
+            result = days_until_birthdays(self.months, self.days, today)
+            self.assertEqual(result.tolist(), expected, today)
+
+    def test_upcoming_birthdays_sorted(self):
+        ids = list(range(len(self.born_dates)))
+        today = date(2023, 12, 30)
+        result_ids, result_days = upcoming_birthdays(
+            ids, self.months, self.days, window=3, today=today
+        )
+        self.assertEqual(result_days.tolist(), [0, 1, 2, 3])
+        self.assertEqual(
+            [self.born_dates[i].strftime("%m-%d") for i in result_ids],
+            ["12-30", "12-31", "01-01", "01-02"],
+        )
+
+    def test_get_id_birthday_upcoming_leap_day(self):
+        result = get_id_birthday_upcoming([(datetime(2000, 2, 29), 1)], window=366)
+        self.assertEqual(result, [1])
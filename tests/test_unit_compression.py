@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.conf.config import get_settings
+from src.services.compression import CompressionMiddleware, choose_encoding, is_available
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.patches = [
+            patch.object(get_settings(), "compression_minimum_size", 100),
+            patch.object(get_settings(), "compression_threadpool_size", 1000),
+        ]
+        for p in self.patches:
+            p.start()
+
+        app = FastAPI()
+        self.text = "contact " * 1000
+
+        @app.get("/small")
+        async def small():
+            return PlainTextResponse("ok")
+
+        @app.get("/large")
+        async def large():
+            return PlainTextResponse(self.text, headers={"ETag": '"contacts-1"'})
+
+        @app.get("/stream")
+        async def stream():
+            chunks = (self.text[i : i + 500] for i in range(0, len(self.text), 500))
+            return StreamingResponse(chunks, media_type="text/plain")
+
+        @app.get("/events")
+        async def events():
+            return StreamingResponse(iter(["data: 1\n\n"]), media_type="text/event-stream")
+
+        self.client = TestClient(CompressionMiddleware(app))
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(choose_encoding("identity"), None)
+        self.assertEqual(choose_encoding("gzip;q=0"), None)
+        if is_available("zstd"):
+            self.assertEqual(choose_encoding("gzip, br, zstd"), "zstd")
+            self.assertEqual(choose_encoding("*"), "zstd")
+        if is_available("br"):
+            self.assertEqual(choose_encoding("gzip, br;q=0.9"), "gzip")
+
+    def test_small_body_not_compressed(self):
+        response = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.text, "ok")
+
+    def test_large_body_compressed(self):
+        for encoding in ["gzip"] + [e for e in ("br",) if is_available(e)]:
+            response = self.client.get("/large", headers={"Accept-Encoding": encoding})
+            self.assertEqual(response.headers["content-encoding"], encoding)
+            self.assertLess(int(response.headers["content-length"]), len(self.text))
+            self.assertEqual(response.text, self.text)
+
+    @unittest.skipUnless(is_available("zstd"), "zstandard is not installed")
+    def test_large_body_zstd(self):
+        import zstandard
+
+        response = self.client.get("/large", headers={"Accept-Encoding": "zstd"})
+        self.assertEqual(response.headers["content-encoding"], "zstd")
+        # httpx does not decode zstd
+        body = zstandard.ZstdDecompressor().decompress(response.content)
+        self.assertEqual(body.decode(), self.text)
+
+    def test_stream_compressed(self):
+        response = self.client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(response.text, self.text)
+
+    def test_event_stream_not_compressed(self):
+        response = self.client.get("/events", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.text, "data: 1\n\n")
+
+    def test_etag_weakened(self):
+        response = self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["etag"], 'W/"contacts-1"')
+
+        response = self.client.get("/large", headers={"Accept-Encoding": "identity"})
+        self.assertEqual(response.headers["etag"], '"contacts-1"')
+
+    def test_pathsend_sent_after_start(self):
+        async def file_app(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/plain")],
+                }
+            )
+            await send({"type": "http.response.pathsend", "path": "/tmp/contacts.txt"})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(CompressionMiddleware(file_app)(scope, None, send))
+        self.assertEqual(
+            [message["type"] for message in sent],
+            ["http.response.start", "http.response.pathsend"],
+        )
+        self.assertNotIn(b"content-encoding", dict(sent[0]["headers"]))
@@ -0,0 +1,183 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import MagicMock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.database.model import Base, Contact, ContactStat, ContactTombstone, User
+from src.repository.contact_stats import (
+    INCREMENT,
+    SHARE_USER_STATS,
+    apply_deltas,
+    contact_buckets,
+    get_stats,
+    rebuild_stats,
+    stat_deltas,
+)
+from src.repository.contacts import create_new_contact, remove_contact, update_contact
+from src.schemas import ContactBase
+
+
+class TestContactStats(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        # a file shared by the sessions of concurrent requests
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{self.directory.name}/stats.db")
+        Base.metadata.create_all(bind=self.engine)
+        self.sessions = sessionmaker(bind=self.engine, autoflush=False)
+        self.session = self.sessions()
+        self.user = User(email="owner@example.com", password="secret")
+        self.session.add(self.user)
+        self.session.commit()
+
+    def tearDown(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def body(self, email: str, born_date: date) -> ContactBase:
+        return ContactBase(
+            first_name="jan",
+            last_name="kowalski",
+            email=email,
+            phone="600100200",
+            born_date=born_date,
+            additional="",
+        )
+
+    def stored(self) -> list[tuple]:
+        return sorted(
+            (stat.kind, stat.bucket, stat.count)
+            for stat in self.session.query(ContactStat)
+            if stat.count
+        )
+
+    def test_contact_buckets(self):
+        buckets = contact_buckets(
+            "Jan@Example.COM", date(1990, 3, 5), datetime(2024, 3, 11, 8)
+        )
+        self.assertEqual(
+            buckets,
+            [
+                ("total", ""),
+                ("domain", "example.com"),
+                ("birth_month", "03"),
+                ("added_week", "2024-W11"),
+            ],
+        )
+        self.assertEqual(contact_buckets("no domain", None, None), [("total", "")])
+
+    def test_stat_deltas_skip_unchanged(self):
+        before = contact_buckets("a@one.pl", date(1990, 3, 5), None)
+        after = contact_buckets("a@two.pl", date(1990, 3, 9), None)
+        self.assertEqual(
+            stat_deltas(before, after),
+            {("domain", "one.pl"): -1, ("domain", "two.pl"): 1},
+        )
+
+    def test_deltas_applied_in_bucket_order(self):
+        db = MagicMock(spec=Session)
+        db.get_bind.return_value.dialect.name = "postgresql"
+        deltas = stat_deltas(
+            contact_buckets("a@two.pl", date(1990, 3, 5), None),
+            contact_buckets("a@one.pl", date(1990, 1, 5), None),
+        )
+        apply_deltas(db, 7, deltas)
+
+        (share, _), (increment, params) = [c.args for c in db.execute.call_args_list]
+        self.assertIs(share, SHARE_USER_STATS)
+        self.assertIs(increment, INCREMENT)
+        self.assertEqual(
+            [(p["kind"], p["bucket"], p["delta"]) for p in params],
+            [
+                ("birth_month", "01", 1),
+                ("birth_month", "03", -1),
+                ("domain", "one.pl", 1),
+                ("domain", "two.pl", -1),
+            ],
+        )
+
+    async def test_writes_update_counters(self):
+        first = await create_new_contact(
+            self.body("a@one.pl", date(1990, 3, 5)), self.session, self.user
+        )
+        await create_new_contact(
+            self.body("b@one.pl", date(1991, 7, 1)), self.session, self.user
+        )
+        await update_contact(
+            first, self.body("a@two.pl", date(1990, 12, 5)), self.session
+        )
+
+        stats = await get_stats(self.session, self.user)
+        self.assertEqual(stats["total"], 2)
+        self.assertEqual(stats["by_domain"], {"one.pl": 1, "two.pl": 1})
+        self.assertEqual(stats["birthdays_by_month"], {"07": 1, "12": 1})
+        self.assertEqual(sum(stats["added_by_week"].values()), 2)
+
+        await remove_contact(first, self.session)
+        stats = await get_stats(self.session, self.user)
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(stats["by_domain"], {"one.pl": 1})
+        self.assertEqual(stats["birthdays_by_month"], {"07": 1})
+
+    async def test_rebuild_matches_incremental_counters(self):
+        for email, born_date in [
+            ("a@one.pl", date(1990, 3, 5)),
+            ("b@two.pl", date(1985, 3, 1)),
+            ("c@one.pl", date(2000, 11, 20)),
+        ]:
+            await create_new_contact(
+                self.body(email, born_date), self.session, self.user
+            )
+        incremental = self.stored()
+
+        # a bulk insert bypassing the repository leaves the counters behind
+        self.session.add(
+            Contact(
+                first_name="x",
+                last_name="y",
+                email="d@one.pl",
+                phone="600100201",
+                user_id=self.user.id,
+                created_at=datetime(2024, 3, 11),
+            )
+        )
+        self.session.commit()
+
+        self.assertEqual(rebuild_stats(self.session), 4)
+        rebuilt = self.stored()
+        self.assertIn(("domain", "one.pl", 3), rebuilt)
+        self.assertIn(("total", "", 4), rebuilt)
+        self.assertIn(("added_week", "2024-W11", 1), rebuilt)
+        self.assertNotEqual(incremental, rebuilt)
+
+        self.session.query(Contact).filter(Contact.email == "d@one.pl").delete()
+        self.session.commit()
+        rebuild_stats(self.session, self.user.id)
+        self.assertEqual(self.stored(), incremental)
+
+    async def test_stale_writes_leave_counters_unchanged(self):
+        contact = await create_new_contact(
+            self.body("a@one.pl", date(1990, 3, 5)), self.session, self.user
+        )
+        # a second request loaded the contact before the first one wrote it
+        other = self.sessions()
+        self.addCleanup(other.close)
+        stale = other.query(Contact).filter(Contact.id == contact.id).one()
+
+        moved = self.body("a@two.pl", date(1990, 3, 5))
+        await update_contact(contact, moved, self.session)
+        counted = self.stored()
+        await update_contact(stale, moved, other)
+        self.assertEqual(self.stored(), counted)
+        self.assertIn(("domain", "two.pl", 1), counted)
+
+        await remove_contact(contact, self.session)
+        counted = self.stored()
+        self.assertIsNone(await remove_contact(stale, other))
+        self.assertEqual(self.stored(), counted)
+        self.assertNotIn(("total", "", 1), counted)
+        self.assertEqual(self.session.query(ContactTombstone).count(), 1)
@@ -0,0 +1,97 @@
+import unittest
+
+from datetime import datetime
+
+from src.database.model import Contact
+from src.services.duplicates import (
+    MAX_BLOCK_SIZE,
+    find_duplicates,
+    normalize_email,
+    normalize_phone,
+    soundex,
+)
+
+
+def make_contact(first_name, last_name, email, phone, born_date=None, id=None):
+    return Contact(
+        id=id,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        phone=phone,
+        born_date=born_date,
+    )
+
+
+class TestDuplicates(unittest.TestCase):
+
+    def test_normalize_email(self):
+        self.assertEqual(normalize_email(" John.Doe+work@GMail.com"), "johndoe@gmail.com")
+        self.assertEqual(normalize_email("john.doe+x@example.com"), "john.doe@example.com")
+
+    def test_normalize_phone(self):
+        self.assertEqual(normalize_phone("+48 600-100-200"), "600100200")
+        self.assertEqual(normalize_phone("600 100 200"), "600100200")
+        self.assertEqual(normalize_phone("??-???"), "")
+
+    def test_soundex(self):
+        self.assertEqual(soundex("Robert"), "R163")
+        self.assertEqual(soundex("Rupert"), "R163")
+        self.assertEqual(soundex("Ashcraft"), "A261")
+        self.assertEqual(soundex("Tymczak"), "T522")
+
+    def test_find_duplicates(self):
+        born_date = datetime(1990, 5, 17)
+        contacts = [
+            make_contact("john", "smith", "john.smith@gmail.com", "600100200", id=1),
+            make_contact("jon", "smith", "johnsmith+a@gmail.com", "+48 600 100 200", id=2),
+            make_contact("smith", "john", "js@example.com", "111", born_date, id=3),
+            make_contact("john", "smith", "other@example.com", "222", born_date, id=4),
+            make_contact("anna", "nowak", "anna@example.com", "700800900", id=5),
+        ]
+        groups = find_duplicates(contacts)
+
+        self.assertEqual(len(groups), 2)
+        self.assertEqual([c.id for c in groups[0][1]], [1, 2])
+        self.assertEqual([c.id for c in groups[1][1]], [3, 4])
+        self.assertGreaterEqual(groups[0][0], groups[1][0])
+
+    def test_find_duplicates_none(self):
+        contacts = [
+            make_contact("john", "smith", "a@example.com", "600100200"),
+            make_contact("anna", "nowak", "b@example.com", "700800900"),
+        ]
+        self.assertEqual(find_duplicates(contacts), [])
+
+    def test_find_duplicates_in_large_block(self):
+        # one block by the phonetic name, too large to compare all its pairs
+        contacts = [
+            make_contact(
+                "john",
+                "smith",
+                f"john{i}@example.com",
+                f"600{i:06d}",
+                datetime(1950 + i % 50, 1 + i % 12, 1 + i % 28),
+                id=i,
+            )
+            for i in range(MAX_BLOCK_SIZE + 50)
+        ]
+        born_date = datetime(1990, 5, 17)
+        contacts.append(
+            make_contact("john", "smith", "js@example.com", "111", born_date, id=1000)
+        )
+        contacts.append(
+            make_contact("john", "smith", "j@example.com", "222", born_date, id=1001)
+        )
+        groups = find_duplicates(contacts)
+
+        self.assertEqual([[c.id for c in group] for _, group in groups], [[1000, 1001]])
+
+    def test_find_duplicates_logs_skipped_blocks(self):
+        contacts = [
+            make_contact("anna", "nowak", f"anna{i}@example.com", f"700{i:06d}")
+            for i in range(MAX_BLOCK_SIZE + 1)
+        ]
+        with self.assertLogs(level="WARNING") as logs:
+            self.assertEqual(find_duplicates(contacts), [])
+        self.assertIn("the largest has 101", logs.output[0])
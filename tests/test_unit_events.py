@@ -0,0 +1,82 @@
+import unittest
+
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.orm import Session
+
+from src.database.model import Contact, User
+from src.repository.contacts import create_new_contact, remove_contact
+from src.schemas import ContactBase
+from src.services.events import (
+    QUEUE_SIZE,
+    ContactEventBroker,
+    contact_event,
+    contact_events,
+    format_sse,
+)
+
+
+class TestContactEvents(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.broker = ContactEventBroker()
+        self.contact = Contact(
+            id=1,
+            first_name="john",
+            last_name="smith",
+            email="john@example.com",
+            phone="600100200",
+            born_date=datetime(1990, 5, 17),
+            additional="",
+            user_id=1,
+        )
+
+    def test_contact_event(self):
+        event = contact_event("updated", self.contact)
+        self.assertEqual(event["contact"]["born_date"], "1990-05-17T00:00:00")
+        self.assertEqual(
+            format_sse(contact_event("deleted", self.contact)),
+            'event: deleted\ndata: {"id": 1}\n\n',
+        )
+
+    async def test_publish_local(self):
+        async with self.broker.subscribe(1) as queue:
+            await self.broker.publish(1, {"type": "created"})
+            await self.broker.publish(2, {"type": "created"})
+            self.assertEqual(queue.get_nowait(), {"type": "created"})
+            self.assertTrue(queue.empty())
+        self.assertNotIn(1, self.broker.queues)
+
+    async def test_publish_redis(self):
+        self.broker.redis = AsyncMock()
+        async with self.broker.subscribe(1) as queue:
+            await self.broker.publish(1, {"type": "created"})
+            self.assertTrue(queue.empty())
+        self.broker.redis.publish.assert_awaited_once_with(
+            "contacts:1", '{"type": "created"}'
+        )
+
+    async def test_slow_stream_drops_oldest(self):
+        async with self.broker.subscribe(1) as queue:
+            for i in range(QUEUE_SIZE + 1):
+                self.broker.dispatch(1, {"id": i})
+            self.assertEqual(queue.qsize(), QUEUE_SIZE)
+            self.assertEqual(queue.get_nowait(), {"id": 1})
+
+    async def test_repository_publishes(self):
+        session = MagicMock(spec=Session)
+        user = User(id=1)
+        body = ContactBase(
+            first_name="john",
+            last_name="smith",
+            email="john@example.com",
+            phone="600100200",
+            born_date=datetime(1990, 5, 17),
+            additional="",
+        )
+        async with contact_events.subscribe(1) as queue:
+            contact = await create_new_contact(body=body, db=session, user=user)
+            await remove_contact(contact=contact, db=session)
+            events = [queue.get_nowait()["type"] for _ in range(queue.qsize())]
+        self.assertEqual(events, ["created", "deleted"])
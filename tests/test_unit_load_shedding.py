@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from main import app
+from src.conf.config import get_settings
+from src.services.load_shedding import ConcurrencyLimiter
+
+
+class TestConcurrencyLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.registered_limiters = ConcurrencyLimiter.limiters
+        ConcurrencyLimiter.limiters = []
+        self.limiter = ConcurrencyLimiter("test", limit=1, queue=1, timeout=0.5)
+
+    def tearDown(self) -> None:
+        ConcurrencyLimiter.limiters = self.registered_limiters
+
+    async def test_queued_request_gets_released_slot(self):
+        await self.limiter.acquire()
+        waiting = asyncio.create_task(self.limiter.acquire())
+        await asyncio.sleep(0)
+        self.assertEqual(len(self.limiter.waiters), 1)
+
+        self.limiter.release()
+        await waiting
+        self.assertEqual(self.limiter.active, 1)
+        self.limiter.release()
+        self.assertEqual(self.limiter.active, 0)
+        stats = self.limiter.stats()
+        self.assertEqual((stats["admitted"], stats["queued"], stats["shed"]), (2, 1, 0))
+
+    async def test_shed_when_queue_full(self):
+        await self.limiter.acquire()
+        waiting = asyncio.create_task(self.limiter.acquire())
+        await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as cm:
+            await self.limiter.acquire()
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(cm.exception.headers["Retry-After"], "1")
+        self.assertEqual(self.limiter.shed, 1)
+
+        self.limiter.release()
+        await waiting
+
+    async def test_shed_after_timeout(self):
+        self.limiter.timeout = 0.01
+        await self.limiter.acquire()
+        with self.assertRaises(HTTPException):
+            await self.limiter.acquire()
+        self.assertFalse(self.limiter.waiters)
+
+        self.limiter.release()
+        self.assertEqual(self.limiter.active, 0)
+        self.assertEqual(self.limiter.shed, 1)
+
+    def test_stats_require_admin(self):
+        client = TestClient(app)
+        with patch.object(get_settings(), "admin_token", "secret"):
+            response = client.get("/api/metrics/load_shedding")
+            self.assertEqual(response.status_code, 403)
+            response = client.get(
+                "/api/metrics/load_shedding", headers={"X-Admin-Token": "secret"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "test")
@@ -0,0 +1,39 @@
+import unittest
+
+from src.services.negotiation import (
+    CBOR,
+    JSON,
+    MSGPACK,
+    NegotiatedResponse,
+    is_available,
+    negotiate,
+)
+
+
+class TestNegotiation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.content = [{"id": 1, "first_name": "anna", "born_date": "1990-05-01"}]
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate(None), JSON)
+        self.assertEqual(negotiate("*/*"), JSON)
+        self.assertEqual(negotiate("application/msgpack"), MSGPACK)
+        self.assertEqual(negotiate("application/x-msgpack, */*;q=0.1"), MSGPACK)
+        self.assertEqual(negotiate("application/json, application/msgpack;q=0.5"), JSON)
+
+    def test_msgpack_response(self):
+        import msgpack
+
+        response = NegotiatedResponse(self.content, media_type=MSGPACK)
+        self.assertEqual(response.headers["content-type"], MSGPACK)
+        self.assertEqual(msgpack.unpackb(response.body), self.content)
+        self.assertEqual(NegotiatedResponse(self.content).media_type, JSON)
+
+    @unittest.skipUnless(is_available(CBOR), "cbor2 is not installed")
+    def test_cbor_response(self):
+        import cbor2
+
+        self.assertEqual(negotiate("application/cbor, application/msgpack;q=0.9"), CBOR)
+        response = NegotiatedResponse(self.content, media_type=CBOR)
+        self.assertEqual(cbor2.loads(response.body), self.content)
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from calibrate_bcrypt import calibrate, write_setting
+from src.conf.config import get_settings
+from src.services.auth import Auth
+
+
+class TestPasswordCost(unittest.IsolatedAsyncioTestCase):
+
+    def test_calibrate(self):
+        # 60 ms at cost 10, doubling with every round
+        measure = lambda rounds: 60 * 2 ** (rounds - 10)
+        self.assertEqual(calibrate(250, measure=measure), (12, 240))
+        self.assertEqual(calibrate(30, measure=measure), (10, 60))
+        self.assertEqual(calibrate(10**6, max_rounds=14, measure=measure), (14, 960))
+
+    def test_write_setting(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / ".env"
+            path.write_text("SECRET_KEY=abc\nBCRYPT_ROUNDS=12\n")
+            write_setting(path, "BCRYPT_ROUNDS", 11)
+            self.assertEqual(path.read_text(), "SECRET_KEY=abc\nBCRYPT_ROUNDS=11\n")
+            new_path = Path(tmp_dir) / "new.env"
+            write_setting(new_path, "BCRYPT_ROUNDS", 13)
+            self.assertEqual(new_path.read_text(), "BCRYPT_ROUNDS=13\n")
+
+    async def test_rehash_to_configured_cost(self):
+        with patch.object(get_settings(), "bcrypt_rounds", 4):
+            old_hash = Auth().get_password_hash("secret")
+        with patch.object(get_settings(), "bcrypt_rounds", 5):
+            auth = Auth()
+            self.assertTrue(auth.needs_rehash(old_hash))
+            with patch("src.services.auth.SessionLocal"), patch(
+                "src.services.auth.repository_users.update_password", new=AsyncMock()
+            ) as update_password:
+                await auth.rehash_password(1, old_hash, "secret")
+
+        _, hashed, new_hash, _ = update_password.await_args.args
+        self.assertEqual(hashed, old_hash)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertTrue(auth.verify_password("secret", new_hash))
+        self.assertFalse(auth.needs_rehash(new_hash))
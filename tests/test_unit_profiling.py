@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from main import app as main_app
+from src.conf.config import get_settings
+from src.services.profiling import ProfilingMiddleware, artifact_path
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.patches = [
+            patch.object(get_settings(), "admin_token", "secret"),
+            patch.object(get_settings(), "profiling_dir", self.tmp_dir.name),
+            patch.object(get_settings(), "profiling_sample_rate", 0.0),
+        ]
+        for p in self.patches:
+            p.start()
+
+        app = FastAPI()
+
+        @app.get("/work")
+        async def work():
+            return {"total": sum(range(10000))}
+
+        self.client = TestClient(ProfilingMiddleware(app))
+
+    def tearDown(self) -> None:
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def test_not_profiled_without_header(self):
+        response = self.client.get("/work")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("x-profile-id", response.headers)
+        self.assertEqual(list(Path(self.tmp_dir.name).iterdir()), [])
+
+    def test_not_profiled_with_wrong_token(self):
+        response = self.client.get("/work", headers={"X-Profile": "wrong"})
+        self.assertNotIn("x-profile-id", response.headers)
+
+    def test_profiled_with_header(self):
+        response = self.client.get("/work", headers={"X-Profile": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(artifact_path(response.headers["x-profile-id"]))
+
+    def test_request_id_does_not_name_profile(self):
+        headers = {"X-Profile": "secret", "X-Request-ID": "req-1"}
+        first = self.client.get("/work", headers=headers).headers["x-profile-id"]
+        second = self.client.get("/work", headers=headers).headers["x-profile-id"]
+        self.assertNotEqual(first, second)
+        self.assertIsNotNone(artifact_path(first))
+        self.assertIsNotNone(artifact_path(second))
+        self.assertIsNone(artifact_path("req-1"))
+        self.assertIsNone(artifact_path("../../etc"))
+
+    def test_read_profile_requires_admin(self):
+        client = TestClient(main_app)
+        response = client.get(f"/api/metrics/profiles/{'0' * 32}")
+        self.assertEqual(response.status_code, 403)
+        response = client.get(
+            "/api/metrics/profiles/missing", headers={"X-Admin-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 404)
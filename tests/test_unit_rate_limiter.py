@@ -0,0 +1,63 @@
+import unittest
+
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+
+from src.services.rate_limiter import TokenBucketLimiter
+
+
+class TestTokenBucketLimiter(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.request = MagicMock()
+        self.request.method = "GET"
+        self.request.scope = {"route": MagicMock(path="/api/contacts/")}
+        self.registered_limiters = TokenBucketLimiter.limiters
+        TokenBucketLimiter.limiters = []
+        TokenBucketLimiter._last_prune = 0.0
+        self.limiter = TokenBucketLimiter(times=3, seconds=60)
+
+    def tearDown(self) -> None:
+        TokenBucketLimiter.limiters = self.registered_limiters
+        TokenBucketLimiter.init(None)
+
+    async def test_local_limit(self):
+        for _ in range(3):
+            await self.limiter.check(self.request, "user:1")
+        with self.assertRaises(HTTPException) as cm:
+            await self.limiter.check(self.request, "user:1")
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertIn("Retry-After", cm.exception.headers)
+        await self.limiter.check(self.request, "user:2")
+
+    async def test_sync_applies_global_state(self):
+        redis = MagicMock()
+        script = AsyncMock(return_value=["0.0"])
+        redis.register_script.return_value = script
+        TokenBucketLimiter.init(redis)
+
+        await self.limiter.check(self.request, "user:1")
+        await TokenBucketLimiter.sync()
+
+        key = "rate_limit:GET:/api/contacts/:user:1"
+        script.assert_awaited_once_with(keys=[key], args=[3.0, 0.05, 1])
+        bucket = self.limiter.buckets[key]
+        self.assertEqual(bucket.consumed, 0)
+        with self.assertRaises(HTTPException):
+            await self.limiter.check(self.request, "user:1")
+
+    async def test_idle_buckets_dropped_without_redis(self):
+        with patch("src.services.rate_limiter.monotonic") as clock:
+            clock.return_value = 1000.0
+            await self.limiter.check(self.request, "user:1")
+            clock.return_value = 1030.0
+            await self.limiter.check(self.request, "user:2")
+            self.assertEqual(len(self.limiter.buckets), 2)
+
+            # user:1 took no token for the 60 s its bucket needs to refill
+            clock.return_value = 1065.0
+            await self.limiter.check(self.request, "user:2")
+
+        self.assertEqual(
+            list(self.limiter.buckets), ["rate_limit:GET:/api/contacts/:user:2"]
+        )
@@ -1,6 +1,6 @@
 import unittest
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from sqlalchemy.orm import Session
 from random import randint
 from datetime import datetime
@@ -15,30 +15,47 @@ class TestUsers(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
         self.session = MagicMock(spec=Session)
         self.user = User()
+        # the baked queries never see the mocked session, it would end up in their cache
+        self.query = MagicMock()
+        for name in ["user_by_email", "user_by_id"]:
+            patcher = patch(f"src.repository.auth.{name}")
+            patcher.start().return_value.params.return_value = self.query
+            self.addCleanup(patcher.stop)
 
     async def test_get_user_by_email(self):
-        self.session.query().filter().first.return_value = self.user
+        self.query.first.return_value = self.user
         result = await get_user_by_email(email="text", db=self.session)
         self.assertEqual(result, self.user)
 
     async def test_create_user(self):
+        self.session.get_bind().dialect.name = "sqlite"
+        self.session.execute().rowcount = 1
+        self.session.execute().lastrowid = 7
         body = UserModel(email="text", password="text")
         result = await create_user(body=body, db=self.session)
-        self.assertTrue(hasattr(result, "id"))
+        self.assertEqual(result.id, 7)
         self.assertEqual(result.email, body.email)
 
+    async def test_create_user_conflict(self):
+        self.session.get_bind().dialect.name = "sqlite"
+        self.session.execute().rowcount = 0
+        body = UserModel(email="text", password="text")
+        result = await create_user(body=body, db=self.session)
+        self.assertIsNone(result)
+
     async def test_update_token(self):
         token = "token"
         await update_token(self.user, token=token, db=self.session)
         self.assertEqual(self.user.refresh_token, token)
 
     async def test_confirm_email(self):
-        self.session.query().filter().first.return_value = self.user
-        await confirm_email(email="text", db=self.session)
-        self.assertTrue(self.user.confirmed)
+        self.session.query().filter().update.return_value = 1
+        self.assertTrue(await confirm_email(email="text", db=self.session))
+        self.session.query().filter().update.return_value = 0
+        self.assertFalse(await confirm_email(email="text", db=self.session))
 
     async def test_update_avatar(self):
-        self.session.query().filter().first.return_value = self.user
+        self.query.first.return_value = self.user
         avatar = "avatar"
         result = await update_avatar(email="text", url=avatar, db=self.session)
         self.assertEqual(self.user, result)
@@ -1,11 +1,11 @@
 import unittest
 
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 from sqlalchemy.orm import Session
 from random import randint
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from src.database.model import Contact, User
+from src.database.model import Contact, ContactTombstone, User
 from src.schemas import ContactBase
 from src.repository.contacts import *
 
@@ -20,9 +20,10 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             get_contacts_by_first_name,
             get_contacts_by_last_name,
             get_contact_by_email,
+            get_contacts_by_phone,
         ]
-        cls.existing_fields = ["id", "first_name", "last_name", "email"]
-        cls.valid_values = ["1", "aaa", "bbb", "aaabbb@ccc.com"]
+        cls.existing_fields = ["id", "first_name", "last_name", "email", "phone"]
+        cls.valid_values = ["1", "aaa", "bbb", "aaabbb@ccc.com", "600 100 200"]
 
         cls.contact_base = {
             "first_name": "text",
@@ -35,13 +36,27 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self) -> None:
         self.session = MagicMock(spec=Session)
+        # the baked queries never see the mocked session, it would end up in their cache
+        self.query = MagicMock()
+        for name in [
+            "contacts_of_user",
+            "contact_by_id",
+            "contact_rows_by_id",
+            "contacts_by_first_name",
+            "contacts_by_last_name",
+            "contacts_by_email",
+            "contacts_by_phone",
+        ]:
+            patcher = patch(f"src.repository.contacts.{name}")
+            patcher.start().return_value.params.return_value = self.query
+            self.addCleanup(patcher.stop)
         self.user = User()
         self.contact = Contact()
         self.list_of_contact = [Contact()]
         self.list_of_contacts = [Contact() for _ in range(randint(1, 5))]
 
     async def auxiliary_fun_get_contacts(self, expected_result):
-        self.session.query().filter().all.return_value = expected_result
+        self.query.all.return_value = expected_result
         result = await get_contacts(db=self.session, user=self.user)
         self.assertEqual(result, expected_result)
 
@@ -52,7 +67,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         await self.auxiliary_fun_get_contacts([])
 
     async def auxiliary_fun_get_contact(self, expected_result):
-        self.session.query().filter().first.return_value = expected_result
+        self.query.first.return_value = expected_result
         result = await get_contact(contact_id=1, db=self.session, user=self.user)
         self.assertEqual(result, expected_result)
 
@@ -63,7 +78,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         await self.auxiliary_fun_get_contact(expected_result=None)
 
     async def auxiliary_fun_get_contact_by_field(self, expected_result):
-        self.session.query().filter().all.return_value = expected_result
+        self.query.all.return_value = expected_result
         for arg, func in list(zip(self.valid_values, self.funcs_by_field)):
             result = await func(arg, db=self.session, user=self.user)
             self.assertEqual(result, expected_result)
@@ -81,7 +96,7 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         self.assertRaises(Exception)
 
     async def auxiliary_fun_get_contacts_by(self, expected_result):
-        self.session.query().filter().all.return_value = expected_result
+        self.query.all.return_value = expected_result
         for existing_field, valid_value in list(
             zip(self.existing_fields, self.valid_values)
         ):
@@ -96,6 +111,16 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
     async def test_get_contacts_by_not_existing_field(self):
         await self.auxiliary_fun_get_contacts_by(expected_result=[])
 
+    async def test_get_contacts_by_phone_invalid(self):
+        self.query.all.return_value = self.list_of_contact
+        result = await get_contacts_by_phone("??-???", db=self.session, user=self.user)
+        self.assertEqual(result, [])
+
+    async def test_create_new_contact_phone_e164(self):
+        body = ContactBase(**{**self.contact_base, "phone": "(600) 100-200"})
+        result = await create_new_contact(body=body, db=self.session, user=self.user)
+        self.assertEqual(result.phone_e164, "+48600100200")
+
     def auxiliary_fun_to_compare(self, body: ContactBase, result: Contact):
         self.assertEqual(result.first_name, body.first_name.lower())
         self.assertEqual(result.last_name, body.last_name.lower())
@@ -122,6 +147,52 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         result = await remove_contact(contact=self.contact, db=self.session)
         self.assertEqual(result, self.contact)
 
+    async def test_get_changes(self):
+        since = datetime.utcnow() - timedelta(hours=1)
+        contact = Contact(id=1, updated_at=since + timedelta(minutes=2))
+        tombstones = [
+            ContactTombstone(contact_id=1, deleted_at=since + timedelta(minutes=1)),
+            ContactTombstone(contact_id=2, deleted_at=since - timedelta(seconds=30)),
+        ]
+        self.session.query().filter().filter().all.side_effect = [
+            [contact],
+            tombstones,
+        ]
+        changed, deleted, cursor, full_sync = await get_changes(
+            since=since, db=self.session, user=self.user
+        )
+        self.assertEqual(changed, [contact])
+        self.assertEqual(deleted, [2])
+        self.assertEqual(cursor, since + timedelta(minutes=2))
+        self.assertFalse(full_sync)
+
+    async def test_get_changes_empty(self):
+        self.session.query().filter().filter().all.return_value = []
+        since = datetime.utcnow() - timedelta(hours=1)
+        result = await get_changes(since=since, db=self.session, user=self.user)
+        self.assertEqual(result, ([], [], since, False))
+
+    async def test_get_changes_overlap_keeps_cursor(self):
+        since = datetime.utcnow() - timedelta(hours=1)
+        # committed after the previous sync, with an earlier timestamp
+        late = Contact(id=3, updated_at=since - timedelta(seconds=10))
+        self.session.query().filter().filter().all.side_effect = [[late], []]
+        changed, _, cursor, _ = await get_changes(
+            since=since, db=self.session, user=self.user
+        )
+        self.assertEqual(changed, [late])
+        self.assertEqual(cursor, since)
+
+    async def test_get_changes_expired_cursor(self):
+        contact = Contact(id=1, updated_at=datetime.utcnow())
+        self.session.query().filter().all.side_effect = [[contact], []]
+        changed, deleted, cursor, full_sync = await get_changes(
+            since=datetime(2024, 3, 1), db=self.session, user=self.user
+        )
+        self.assertEqual((changed, deleted), ([contact], []))
+        self.assertEqual(cursor, contact.updated_at)
+        self.assertTrue(full_sync)
+
     async def test_birthady(self):
         self.session.query().values().return_value = []
         self.session.query().filter().all.return_value = self.list_of_contacts
@@ -129,3 +200,46 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             db=self.session, user=self.user
         )
         self.assertEqual(result, self.list_of_contacts)
+
+    async def test_birthday_materialized(self):
+        r = AsyncMock()
+        r.zrange.return_value = ["built", "2", "1"]
+        self.session.query().filter().all.return_value = self.list_of_contacts
+        result = await get_contacts_with_upcoming_birtday(
+            db=self.session, user=self.user, r=r
+        )
+        self.assertEqual(result, self.list_of_contacts)
+        r.zrange.assert_awaited_once()
+
+    async def test_birthday_redis_error_falls_back(self):
+        r = AsyncMock()
+        r.zrange.side_effect = ConnectionError("redis is down")
+        self.session.query().values().return_value = []
+        self.session.query().filter().all.return_value = self.list_of_contacts
+        result = await get_contacts_with_upcoming_birtday(
+            db=self.session, user=self.user, r=r
+        )
+        self.assertEqual(result, self.list_of_contacts)
+
+    async def test_create_new_contact_redis_error(self):
+        r = AsyncMock()
+        r.eval.side_effect = ConnectionError("redis is down")
+        body = ContactBase(**self.contact_base)
+        self.session.refresh.side_effect = lambda contact: setattr(
+            contact, "born_date", self.contact_base["born_date"]
+        )
+        result = await create_new_contact(
+            body=body, db=self.session, user=self.user, r=r
+        )
+        self.session.commit.assert_called_once()
+        r.eval.assert_awaited_once()
+        self.assertEqual(result.email, body.email.lower())
+
+    async def test_create_new_contact_refreshes_birthdays(self):
+        r = AsyncMock()
+        body = ContactBase(**self.contact_base)
+        self.session.refresh.side_effect = lambda contact: setattr(
+            contact, "born_date", self.contact_base["born_date"]
+        )
+        await create_new_contact(body=body, db=self.session, user=self.user, r=r)
+        r.eval.assert_awaited_once()
@@ -0,0 +1,75 @@
+import time
+import unittest
+
+from unittest.mock import AsyncMock, MagicMock
+
+from src.services.revocation import INDEX_KEY, BloomFilter, TokenRevocations
+
+
+class TestTokenRevocations(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.revocations = TokenRevocations()
+        self.expires_at = time.time() + 900
+
+    def redis_mock(self, revoked: list[str], exists: int = 1) -> MagicMock:
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=[0, revoked])
+        redis = MagicMock()
+        redis.pipeline.return_value.__aenter__.return_value = pipe
+        redis.exists = AsyncMock(return_value=exists)
+        return redis
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000)
+        items = [f"token{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f"other{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    async def test_local_revocation(self):
+        self.assertFalse(await self.revocations.is_revoked("abc"))
+        await self.revocations.revoke("abc", self.expires_at)
+        self.assertTrue(await self.revocations.is_revoked("abc"))
+        await self.revocations.revoke("expired", time.time() - 1)
+        self.assertFalse(await self.revocations.is_revoked("expired"))
+
+    async def test_only_filter_hits_reach_redis(self):
+        redis = self.redis_mock(revoked=["abc"])
+        self.revocations.redis = redis
+        await self.revocations.sync()
+
+        self.assertFalse(await self.revocations.is_revoked("other"))
+        redis.exists.assert_not_awaited()
+        self.assertTrue(await self.revocations.is_revoked("abc"))
+        redis.exists.assert_awaited_once_with("revoked:abc")
+
+    async def test_revoke_stores_in_redis(self):
+        redis = self.redis_mock(revoked=[])
+        self.revocations.redis = redis
+        await self.revocations.revoke("abc", self.expires_at)
+
+        pipe = redis.pipeline.return_value.__aenter__.return_value
+        pipe.set.assert_called_once()
+        pipe.zadd.assert_called_once_with(INDEX_KEY, {"abc": self.expires_at})
+        # kept in the filter across a sync which does not see it yet
+        await self.revocations.sync()
+        self.assertIn("abc", self.revocations.filter)
+
+    async def test_redis_error_keeps_revocation_locally(self):
+        redis = self.redis_mock(revoked=[], exists=0)
+        pipe = redis.pipeline.return_value.__aenter__.return_value
+        pipe.execute.side_effect = ConnectionError("redis is down")
+        self.revocations.redis = redis
+        await self.revocations.revoke("abc", self.expires_at)
+        self.assertTrue(await self.revocations.is_revoked("abc"))
+        redis.exists.assert_not_awaited()
+
+        # stored by the next sync once Redis is back
+        pipe.execute.side_effect = None
+        await self.revocations.sync()
+        self.assertEqual(self.revocations.local, {})
+        self.assertIn("abc", self.revocations.filter)
+        self.assertEqual(pipe.zadd.call_count, 2)
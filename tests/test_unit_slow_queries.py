@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from main import app
+from src.conf.config import get_settings
+from src.database import slow_queries
+from src.database.model import Base, User
+from src.repository.auth import get_user_by_email, get_user_by_id
+
+
+class TestSlowQueries(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.patches = [
+            patch.object(get_settings(), "slow_query_ms", 0.0),
+            patch.object(get_settings(), "admin_token", "secret"),
+            patch.object(slow_queries, "slow_query_log", slow_queries.SlowQueryLog()),
+            patch.object(slow_queries, "configure_logger", lambda: None),
+            patch.object(slow_queries, "logger", MagicMock()),
+        ]
+        for p in self.patches:
+            p.start()
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=self.engine)
+        slow_queries.install(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self) -> None:
+        self.session.close()
+        for p in self.patches:
+            p.stop()
+
+    async def test_records_caller_and_plan(self):
+        slow_queries.logger.warning.reset_mock()
+        await get_user_by_id(1, self.session)
+        await get_user_by_id(2, self.session)
+
+        entries = [
+            entry
+            for entry in slow_queries.slow_query_log.top()
+            if entry["caller"] == "src.repository.auth.get_user_by_id"
+        ]
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["count"], 2)
+        self.assertIn("users", entries[0]["statement"])
+        self.assertIn("USING INTEGER PRIMARY KEY", entries[0]["plan"])
+        self.assertTrue(slow_queries.logger.warning.called)
+
+    async def test_params_are_redacted(self):
+        await get_user_by_email("secret.person@example.com", self.session)
+        entries = [
+            entry
+            for entry in slow_queries.slow_query_log.top()
+            if entry["caller"] == "src.repository.auth.get_user_by_email"
+        ]
+        self.assertNotIn("secret.person", entries[0]["params"])
+        self.assertIn("str(25)", entries[0]["params"])
+
+    def postgres_connection(self, failing: str | None = None):
+        conn = MagicMock()
+        conn.dialect.name = "postgresql"
+        cursor = conn.connection.cursor.return_value
+        cursor.fetchall.return_value = [("Seq Scan on users",)]
+
+        def execute(sql, parameters=None):
+            if failing is not None and sql.startswith(failing):
+                raise RuntimeError("explain failed")
+
+        cursor.execute.side_effect = execute
+        return conn, cursor
+
+    def test_explain_in_savepoint(self):
+        conn, cursor = self.postgres_connection()
+        plan = slow_queries.explain(conn, "SELECT * FROM users", (), False)
+        self.assertEqual(plan, "Seq Scan on users")
+        executed = [c.args[0] for c in cursor.execute.call_args_list]
+        self.assertEqual(executed[0], "SAVEPOINT slow_query_explain")
+        self.assertTrue(executed[1].startswith("EXPLAIN (ANALYZE, BUFFERS) SELECT"))
+        self.assertEqual(executed[2], "RELEASE SAVEPOINT slow_query_explain")
+
+    def test_failed_explain_rolls_back_to_savepoint(self):
+        conn, cursor = self.postgres_connection(failing="EXPLAIN")
+        plan = slow_queries.explain(conn, "SELECT * FROM users", (), False)
+        self.assertIn("plan not captured", plan)
+        cursor.execute.assert_called_with("ROLLBACK TO SAVEPOINT slow_query_explain")
+
+    def test_with_query_is_not_analyzed(self):
+        conn, cursor = self.postgres_connection()
+        statement = "WITH d AS (DELETE FROM users RETURNING id) SELECT * FROM d"
+        slow_queries.explain(conn, statement, (), False)
+        self.assertEqual(
+            cursor.execute.call_args_list[1].args[0], "EXPLAIN " + statement
+        )
+
+    def test_failed_statement(self):
+        with self.assertRaises(Exception):
+            self.engine.execute("SELECT * FROM missing")
+        self.session.query(User).all()
+
+    def test_top_requires_admin(self):
+        client = TestClient(app)
+        response = client.get("/api/metrics/slow_queries")
+        self.assertEqual(response.status_code, 403)
+        response = client.get(
+            "/api/metrics/slow_queries", headers={"X-Admin-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), list)
@@ -1,6 +1,18 @@
 import unittest
 from tests.test_unit_repository_contacts import TestContacts
 from tests.test_unit_repository_auth import TestUsers
+from tests.test_unit_rate_limiter import TestTokenBucketLimiter
+from tests.test_unit_birthdays import TestBirthdays
+from tests.test_unit_duplicates import TestDuplicates
+from tests.test_unit_events import TestContactEvents
+from tests.test_unit_profiling import TestProfiling
+from tests.test_unit_slow_queries import TestSlowQueries
+from tests.test_unit_load_shedding import TestConcurrencyLimiter
+from tests.test_unit_negotiation import TestNegotiation
+from tests.test_unit_compression import TestCompression
+from tests.test_unit_revocation import TestTokenRevocations
+from tests.test_unit_password_cost import TestPasswordCost
+from tests.test_unit_contact_stats import TestContactStats
 
 
 if __name__ == "__main__":